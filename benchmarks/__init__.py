@@ -0,0 +1,6 @@
+"""
+Microbenchmarks of the pure-Python hot paths, compared with the committed baselines.
+
+    python -m benchmarks.run                # fails if a benchmark is slower than its baseline over the threshold
+    python -m benchmarks.run --update       # measures and saves new baselines
+"""
@@ -0,0 +1,104 @@
+import os
+import random
+import tempfile
+from typing import Callable
+
+from config import CONFIG
+from harness.synthetic import generate_feed_items, DESCRIPTION_PARTS
+from helpers.csv_helper import get_data_from_csv, push_data_to_csv
+from helpers.data_helper import get_listing_from_feed_item
+from helpers.group_helper import parse_group_names
+from helpers.listing_helper import XPATH, normalize_text_for_compare, compare_title
+from helpers.model import VehicleType, VehicleCondition, BodyType, BaseColor, FuelType, Transmission
+
+FEED_SIZE = 500
+
+# Files of the benchmarks, the folder is removed on exit
+TEMP_FOLDER = tempfile.TemporaryDirectory(prefix='benchmarks_')
+
+# Name of the benchmark -> function which prepares the data and returns the measured call
+BENCHMARKS: dict[str, Callable[[], Callable[[], object]]] = {}
+
+
+def benchmark(name: str):
+    def decorator(func: Callable[[], Callable[[], object]]):
+        BENCHMARKS[name] = func
+        return func
+
+    return decorator
+
+
+def get_feed_listings(count: int = FEED_SIZE):
+    return [get_listing_from_feed_item(item) for item in generate_feed_items(count)]
+
+
+def get_titles(count: int = FEED_SIZE) -> list[str]:
+    # Titles of the feed and names of the groups, which are in Cyrillic
+    group_names = list(parse_group_names(CONFIG['listing']['public_groups'])) or ['Українці Торонто']
+    titles = [listing.title for listing in get_feed_listings(count)]
+    return [title if i % 4 else f'{group_names[i % len(group_names)]} {title}' for i, title in enumerate(titles)]
+
+
+@benchmark('csv.get_data_from_csv')
+def bench_get_data_from_csv():
+    file_path = os.path.join(TEMP_FOLDER.name, 'read.csv')
+    push_data_to_csv(get_feed_listings(), file_path, upload_limit=FEED_SIZE)
+    return lambda: get_data_from_csv(file_path)
+
+
+@benchmark('csv.push_data_to_csv')
+def bench_push_data_to_csv():
+    file_path = os.path.join(TEMP_FOLDER.name, 'write.csv')
+    listings = get_feed_listings()
+    return lambda: push_data_to_csv(listings, file_path, upload_limit=FEED_SIZE)
+
+
+@benchmark('model.from_str')
+def bench_from_str():
+    # Values as they come from the feed and the CSV: exact, other case, unknown and empty
+    rnd = random.Random(0)
+    enums = [VehicleType, VehicleCondition, BodyType, BaseColor, FuelType, Transmission]
+    values = []
+    for _ in range(1000):
+        enum = rnd.choice(enums)
+        value = str(rnd.choice(list(enum)))
+        values.append((enum, rnd.choice([value, value.upper(), value.lower(), 'unknown ' + value, 'gas', 'manual',
+                                         ''])))
+    return lambda: [enum.from_str(value) for enum, value in values]
+
+
+@benchmark('listing.normalize_text_for_compare')
+def bench_normalize_text_for_compare():
+    rnd = random.Random(0)
+    descriptions = ['\n'.join(rnd.choice(DESCRIPTION_PARTS) for _ in range(12)).replace('. ', '.\xa0 ')
+                    for _ in range(200)]
+    return lambda: [normalize_text_for_compare(description) for description in descriptions]
+
+
+@benchmark('listing.compare_title')
+def bench_compare_title():
+    # Titles as they are read from the page: other case, non-breaking spaces and line breaks
+    titles = get_titles()
+    pairs = [(title, title.upper().replace(' ', '\xa0', 2).replace(' ', '\n', 1)) for title in titles]
+    return lambda: [compare_title(title, page_title) for title, page_title in pairs]
+
+
+@benchmark('data.get_listing_from_feed_item')
+def bench_get_listing_from_feed_item():
+    items = generate_feed_items(FEED_SIZE)
+    return lambda: [get_listing_from_feed_item(item) for item in items]
+
+
+@benchmark('listing.XPATH')
+def bench_xpath():
+    titles = get_titles()
+    group_names = list(parse_group_names(CONFIG['listing']['public_groups']))
+
+    def render():
+        for title in titles:
+            XPATH.selling_listing_container(title)
+            XPATH.translate_cont_expr(title, '@aria-label')
+            XPATH.group_entry(title)
+        return f'//span[{" or ".join(XPATH.translate_cont_expr(g, "text()") for g in group_names)}]'
+
+    return render
@@ -0,0 +1,89 @@
+import argparse
+import json
+import logging
+import os
+import platform
+import sys
+import timeit
+
+from benchmarks.cases import BENCHMARKS
+
+BASELINES_FILE_PATH = os.path.join(os.path.dirname(__file__), 'baselines.json')
+# Allowed slowdown relative to the baseline, 0.5 - 50% slower
+DEFAULT_THRESHOLD = 0.5
+
+
+def measure(func, repeat: int = 5, min_time: float = 0.2) -> float:
+    """
+    :return: Seconds of one call, the best of the repeats
+    """
+    timer = timeit.Timer(func)
+    number, _ = timer.autorange()
+    # autorange stops at 0.2 seconds, the count is scaled up for a longer minimal time
+    number = max(1, int(number * min_time / 0.2))
+    return min(timer.repeat(repeat=repeat, number=number)) / number
+
+
+def load_baselines(file_path: str = BASELINES_FILE_PATH) -> dict:
+    try:
+        with open(file_path, encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {'threshold': DEFAULT_THRESHOLD, 'benchmarks': {}}
+
+
+def save_baselines(baselines: dict, file_path: str = BASELINES_FILE_PATH) -> None:
+    tmp_file_path = f'{file_path}.part'
+    with open(tmp_file_path, 'w', encoding='utf-8') as f:
+        json.dump(baselines, f, indent=2, sort_keys=True)
+        f.write('\n')
+    os.replace(tmp_file_path, file_path)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description='Run the microbenchmarks and compare them with the baselines')
+    parser.add_argument('--update', action='store_true', help='Save the results as the new baselines')
+    parser.add_argument('--filter', default='', help='Run only the benchmarks whose name contains the text')
+    parser.add_argument('--threshold', type=float, default=None, help='Allowed slowdown, overrides the baselines')
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    baselines = load_baselines()
+    # The measured functions log every row, records would go to the log files of the bot
+    logging.disable(logging.CRITICAL)
+
+    regressions = []
+    for name, setup in BENCHMARKS.items():
+        if args.filter not in name:
+            continue
+        seconds = measure(setup(), repeat=args.repeat)
+        baseline = baselines['benchmarks'].get(name)
+
+        if args.update or not baseline:
+            baselines['benchmarks'][name] = {**(baseline or {}), 'seconds': seconds}
+            print(f'{name:40} {seconds * 1000:10.3f} ms  {"saved" if args.update else "no baseline"}')
+            continue
+
+        threshold = args.threshold if args.threshold is not None else (
+            baseline.get('threshold', baselines.get('threshold', DEFAULT_THRESHOLD)))
+        ratio = seconds / baseline['seconds']
+        status = 'ok'
+        if ratio > 1 + threshold:
+            status = f'REGRESSION (over {threshold:.0%})'
+            regressions.append(name)
+        print(f'{name:40} {seconds * 1000:10.3f} ms  baseline {baseline["seconds"] * 1000:10.3f} ms  '
+              f'{ratio:5.2f}x  {status}')
+
+    if args.update:
+        baselines['machine'] = f'{platform.python_implementation()} {platform.python_version()}, {platform.machine()}'
+        baselines.setdefault('threshold', DEFAULT_THRESHOLD)
+        save_baselines(baselines)
+
+    if regressions:
+        print(f'{len(regressions)} benchmarks are slower than their baselines: {", ".join(regressions)}')
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,19 @@
+"""
+Local stand-ins for the services the bot works with, for measuring and regression runs without Facebook and the dealer site.
+
+Run a publish cycle against the fake Marketplace under headless Chrome:
+
+    python -m harness.run_publish --listings 5 --published 3
+
+Measure the crawl of the selling page with a growing count of listings:
+
+    python -m harness.bench_selling_page --sizes 10,100,500 --batch-size 50
+
+Load test the import against a local stand-in of the dealer feed:
+
+    python -m harness.run_import --vehicles 1000 --photos 0-60 --latency 0.05 --error-rate 0.01
+
+or serve the stand-in and point dealer.url of config.yaml at it:
+
+    python -m harness.fake_dealer --vehicles 50000 --photos 0-60 --port 8081
+"""
@@ -0,0 +1,108 @@
+import argparse
+import functools
+import json
+import time
+from collections import Counter
+
+from selenium.webdriver.common.by import By
+
+from harness.fake_marketplace import FakeMarketplace, FakeMarketplaceOptions, FakeMarketplaceServer
+from harness.run_publish import HarnessScraper, create_driver
+from helpers import listing_helper
+from helpers.listing_helper import XPATH
+from helpers.scraper import ScraperDriverManager, ScraperMemoryWatchdog, ScraperSessionSupervisor
+
+
+def count_commands(driver) -> Counter[str]:
+    # Every command of the driver and its elements goes through driver.execute
+    commands: Counter[str] = Counter()
+    execute = driver.execute
+
+    @functools.wraps(execute)
+    def counting_execute(driver_command, params=None):
+        commands[driver_command] += 1
+        return execute(driver_command, params)
+
+    driver.execute = counting_execute
+    return commands
+
+
+def bench_selling_page(sizes: list[int], batch_size: int | None = 50, load_delay: float = 0.2,
+                       headless: bool = True, seed: int = 0) -> list[dict]:
+    """
+    Crawl of the selling page with N published listings: time, WebDriver commands and memory of the browser.
+    Every size is measured in a fresh browser, so the memory isn't left from the previous size.
+    """
+    HarnessScraper.delay_scale = 0
+    results = []
+    for size in sizes:
+        marketplace = FakeMarketplace(FakeMarketplaceOptions(batch_size=batch_size, load_delay=load_delay,
+                                                             seed=seed))
+        listings = marketplace.add_synthetic_listings(size)
+        server = FakeMarketplaceServer(marketplace).start()
+        driver = create_driver(headless=headless)
+        original_pages = dict(listing_helper.PAGES)
+        listing_helper.PAGES.update(server.pages)
+        try:
+            memory_watchdog = ScraperMemoryWatchdog(ScraperSessionSupervisor(
+                ScraperDriverManager(driver=driver, tabs={'harness': driver.current_window_handle})))
+            scraper = HarnessScraper(url=server.pages['selling'], driver=driver)
+            commands = count_commands(driver)
+            memory_before = memory_watchdog.sample()
+
+            started_at = time.perf_counter()
+            elements = listing_helper.find_all_published_listing_elements(scraper=scraper)
+            scroll_time = time.perf_counter() - started_at
+            scroll_commands = sum(commands.values())
+
+            started_at = time.perf_counter()
+            published_listings = listing_helper.get_all_published_listings(scraper=scraper,
+                                                                           published_listing_elements=elements)
+            read_time = time.perf_counter() - started_at
+            read_commands = sum(commands.values()) - scroll_commands
+
+            # The oldest listing is the last in the list, its title XPath searches the whole loaded page
+            started_at = time.perf_counter()
+            scraper.find_element(selector=XPATH.selling_listing_container(listings[0].title), by=By.XPATH,
+                                 exit_on_missing_element=False, wait_element_time=1)
+            title_xpath_time = time.perf_counter() - started_at
+
+            memory_after = memory_watchdog.sample()
+            results.append({
+                'listings': size,
+                'found': len(published_listings),
+                'scroll_seconds': round(scroll_time, 3),
+                'read_seconds': round(read_time, 3),
+                'crawl_seconds': round(scroll_time + read_time, 3),
+                'title_xpath_seconds': round(title_xpath_time, 3),
+                'scroll_commands': scroll_commands,
+                'read_commands': read_commands,
+                'commands_per_listing': round((scroll_commands + read_commands) / max(size, 1), 1),
+                'commands': dict(commands.most_common()),
+                'memory_before': memory_before,
+                'memory_after': memory_after,
+            })
+        finally:
+            driver.quit()
+            server.stop()
+            listing_helper.PAGES.update(original_pages)
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Measure the crawl of the selling page as it grows')
+    parser.add_argument('--sizes', type=lambda value: [int(size) for size in value.split(',')],
+                        default=[10, 50, 100, 250, 500], help='Comma separated counts of listings')
+    parser.add_argument('--batch-size', type=int, default=50, help='Cards loaded by one scroll, 0 - all at once')
+    parser.add_argument('--load-delay', type=float, default=0.2, help='Seconds of loading of the next batch')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--headed', action='store_true', help='Show the browser')
+    args = parser.parse_args()
+
+    results = bench_selling_page(sizes=args.sizes, batch_size=args.batch_size or None, load_delay=args.load_delay,
+                                 headless=not args.headed, seed=args.seed)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,232 @@
+import argparse
+import dataclasses
+import functools
+import json
+import random
+import re
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs, unquote
+
+from harness.synthetic import generate_feed_items, make_noise_png
+
+# Queries of data_helper, the stand-in only understands these
+VEHICLES_QUERY = re.compile(r'select \* from vehicles_for_sale where license = (\w+)', re.IGNORECASE)
+PHOTOS_QUERY = re.compile(r"select url from photo_url where stockno = '([^']*)' and license = (\w+)", re.IGNORECASE)
+
+
+@dataclasses.dataclass
+class FakeDealerOptions:
+    vehicles: int = 100
+    # Photos of a vehicle, the count is random in the range
+    photos_min: int = 0
+    photos_max: int = 20
+    # Approximate size of a photo, photos of the dealer are JPEGs of 100-300 KB
+    photo_size_kb: int = 150
+    # Seconds before every response
+    latency: float = 0.0
+    # Share of the requests which fail with HTTP 500
+    error_rate: float = 0.0
+    # Requests over the rate are answered with HTTP 429, None - no limit
+    requests_per_second: float | None = None
+    # Speed of sending of the responses, None - no limit
+    bandwidth_kbps: float | None = None
+    seed: int = 0
+
+
+class FakeDealer:
+    """
+    Synthetic inventory of the dealer: vehicles in the feed format and their photos, which are generated on request.
+    """
+
+    def __init__(self, options: FakeDealerOptions | None = None):
+        self.options = options or FakeDealerOptions()
+        self.vehicles = generate_feed_items(self.options.vehicles, seed=self.options.seed)
+        self.vehicles_by_stockno = {vehicle['stockno']: vehicle for vehicle in self.vehicles}
+        self.random = random.Random(self.options.seed)
+        self.stats: Counter[str] = Counter()
+        self._lock = threading.Lock()
+        self._allowance = self.options.requests_per_second or 0
+        self._allowance_at = time.monotonic()
+
+    def get_vehicles(self, license_id: str) -> list[dict]:
+        return [{**vehicle, 'license': license_id} for vehicle in self.vehicles]
+
+    def get_photo_urls(self, stockno: str) -> list[dict]:
+        if stockno not in self.vehicles_by_stockno:
+            return []
+        # The count only depends on the vehicle, so every import sees the same photos
+        count = random.Random(f'{self.options.seed}:{stockno}').randint(self.options.photos_min,
+                                                                          self.options.photos_max)
+        return [{'url': f'{stockno}/{stockno}_{i + 1}.png', 'sequence_id': i + 1} for i in range(count)]
+
+    def get_photo(self, rel_url: str) -> bytes | None:
+        match = re.fullmatch(r'([^/]+)/[^/]+_(\d+)\.png', rel_url)
+        if not match or match.group(1) not in self.vehicles_by_stockno:
+            return None
+        if int(match.group(2)) > len(self.get_photo_urls(match.group(1))):
+            return None
+        return get_photo_bytes(rel_url, self.options.photo_size_kb)
+
+    def should_fail(self) -> bool:
+        with self._lock:
+            return self.random.random() < self.options.error_rate
+
+    def is_throttled(self) -> bool:
+        # Token bucket of requests_per_second with one second of burst
+        rate = self.options.requests_per_second
+        if not rate:
+            return False
+        with self._lock:
+            now = time.monotonic()
+            self._allowance = min(rate, self._allowance + (now - self._allowance_at) * rate)
+            self._allowance_at = now
+            if self._allowance < 1:
+                return True
+            self._allowance -= 1
+            return False
+
+    def count(self, name: str, value: int = 1) -> None:
+        with self._lock:
+            self.stats[name] += value
+
+
+@functools.lru_cache(maxsize=256)
+def get_photo_bytes(rel_url: str, size_kb: int) -> bytes:
+    # Noise doesn't compress, so the PNG is about as large as its pixels
+    side = max(int((size_kb * 1024 / 3) ** 0.5), 1)
+    return make_noise_png(side, side, seed=rel_url)
+
+
+class FakeDealerServer(ThreadingHTTPServer):
+    """
+    Stand-in of the dealer site with /php/get_list.php and /uploads/..., CONFIG dealer.url can point at it.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, dealer: FakeDealer, host: str = '127.0.0.1', port: int = 0):
+        self.dealer = dealer
+        super().__init__((host, port), FakeDealerHandler)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def start(self) -> 'FakeDealerServer':
+        threading.Thread(target=self.serve_forever, name='fake dealer', daemon=True).start()
+        return self
+
+    def stop(self) -> None:
+        self.shutdown()
+        self.server_close()
+
+
+class FakeDealerHandler(BaseHTTPRequestHandler):
+    server: FakeDealerServer
+
+    def log_message(self, format, *args):
+        pass
+
+    @property
+    def dealer(self) -> FakeDealer:
+        return self.server.dealer
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        route = 'uploads' if url.path.startswith('/uploads/') else url.path
+        self.dealer.count(f'GET {route}')
+        time.sleep(self.dealer.options.latency)
+
+        if route == '/stats':
+            return self.send_body(json.dumps(dict(self.dealer.stats)).encode(), 'application/json')
+        if self.dealer.is_throttled():
+            self.dealer.count('throttled')
+            return self.send_body(b'Too Many Requests', 'text/plain', status=429, headers={'Retry-After': '1'})
+        if self.dealer.should_fail():
+            self.dealer.count('errors')
+            return self.send_body(b'Internal Server Error', 'text/plain', status=500)
+
+        if route == '/php/get_list.php':
+            sql = ' '.join(parse_qs(url.query).get('sql', [''])[0].split())
+            match = VEHICLES_QUERY.match(sql)
+            if match:
+                return self.send_json(self.dealer.get_vehicles(match.group(1)))
+            match = PHOTOS_QUERY.match(sql)
+            if match:
+                return self.send_json(self.dealer.get_photo_urls(match.group(1)))
+            return self.send_body(b'Unknown query', 'text/plain', status=400)
+
+        if route == 'uploads':
+            # /uploads/<license>/<stockno>/<name>
+            parts = unquote(url.path).split('/', 3)
+            photo = self.dealer.get_photo(parts[3]) if len(parts) == 4 else None
+            if photo is None:
+                return self.send_body(b'Not Found', 'text/plain', status=404)
+            return self.send_body(photo, 'image/png')
+
+        self.send_body(b'Not Found', 'text/plain', status=404)
+
+    def send_json(self, data) -> None:
+        self.send_body(json.dumps(data).encode('utf-8'), 'application/json')
+
+    def send_body(self, body: bytes, content_type: str, status: int = 200, headers: dict | None = None) -> None:
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+
+        bandwidth = self.dealer.options.bandwidth_kbps
+        if not bandwidth:
+            self.wfile.write(body)
+        else:
+            # Chunks of 0.1 second
+            chunk_size = max(int(bandwidth * 1024 / 10), 1)
+            for i in range(0, len(body), chunk_size):
+                self.wfile.write(body[i:i + chunk_size])
+                time.sleep(0.1)
+        self.dealer.count('bytes', len(body))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Serve a synthetic dealer inventory for the import')
+    parser.add_argument('--vehicles', type=int, default=100, help='Vehicles in the inventory')
+    parser.add_argument('--photos', default='0-20', help='Range of the photos of a vehicle, e.g. 0-60')
+    parser.add_argument('--photo-size-kb', type=int, default=150)
+    parser.add_argument('--latency', type=float, default=0.0, help='Seconds before every response')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Share of the requests which fail with 500')
+    parser.add_argument('--requests-per-second', type=float, default=None, help='Requests over it get 429')
+    parser.add_argument('--bandwidth-kbps', type=float, default=None, help='Speed of the responses')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8081)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    photos_min, _, photos_max = args.photos.partition('-')
+    dealer = FakeDealer(FakeDealerOptions(vehicles=args.vehicles,
+                                          photos_min=int(photos_min),
+                                          photos_max=int(photos_max or photos_min),
+                                          photo_size_kb=args.photo_size_kb,
+                                          latency=args.latency,
+                                          error_rate=args.error_rate,
+                                          requests_per_second=args.requests_per_second,
+                                          bandwidth_kbps=args.bandwidth_kbps,
+                                          seed=args.seed))
+    server = FakeDealerServer(dealer, host=args.host, port=args.port)
+    print(f'Dealer feed with {args.vehicles} vehicles is served at {server.base_url}, '
+          f'set dealer.url of config.yaml to it')
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
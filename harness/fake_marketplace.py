@@ -0,0 +1,663 @@
+import dataclasses
+import datetime
+import html
+import json
+import random
+import re
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+
+from harness.synthetic import MAKES
+from helpers.model import VehicleType, VehicleCondition, BodyType, BaseColor, FuelType, Transmission
+
+PLACEHOLDER_IMAGE = 'data:image/svg+xml,%3Csvg xmlns=%22http://www.w3.org/2000/svg%22/%3E'
+
+SELLING_PATH = '/marketplace/you/selling'
+CREATE_PATH = '/marketplace/create'
+CREATE_VEHICLE_PATH = '/marketplace/create/vehicle'
+
+
+@dataclasses.dataclass
+class FakeMarketplaceOptions:
+    # Seconds before every page and API response
+    page_latency: float = 0.0
+    api_latency: float = 0.0
+    # Seconds of uploading of one photo in the create form
+    photo_upload_time: float = 0.3
+    # Share of photos which are rejected by the create form
+    photo_reject_rate: float = 0.0
+    # Share of publishings which end with the error dialog instead of the groups step
+    publish_failure_rate: float = 0.0
+    groups: list[str] = dataclasses.field(default_factory=lambda: ['Toronto Cars', 'GTA Auto Market'])
+    # Cards of the selling page which are loaded at once, the rest are loaded by scrolling. None - all at once
+    batch_size: int | None = None
+    # Seconds of loading of the next batch of cards
+    load_delay: float = 0.0
+    seed: int = 0
+
+
+@dataclasses.dataclass
+class FakeListing:
+    id: int
+    title: str
+    price: float
+    description: str = ''
+    mileage: int = 0
+    fuel_type: str = ''
+    published_date: datetime.date = dataclasses.field(default_factory=datetime.date.today)
+
+    def to_json(self) -> dict:
+        return {**dataclasses.asdict(self), 'published_date': self.published_date.isoformat()}
+
+
+class FakeMarketplace:
+    """
+    State of the fake Marketplace: published listings and shares to groups, and counters of the requests.
+    """
+
+    def __init__(self, options: FakeMarketplaceOptions | None = None):
+        self.options = options or FakeMarketplaceOptions()
+        self.random = random.Random(self.options.seed)
+        self.listings: dict[int, FakeListing] = {}
+        self.shares: list[dict] = []
+        self.stats: Counter[str] = Counter()
+        self._ids = iter(range(1, 10 ** 9))
+        self._lock = threading.Lock()
+
+    def add_listing(self, title: str, price: float, description: str = '', mileage: int = 0,
+                    fuel_type: str = '', published_date: datetime.date | None = None) -> FakeListing:
+        with self._lock:
+            listing = FakeListing(id=next(self._ids), title=title, price=price, description=description,
+                                  mileage=mileage, fuel_type=fuel_type,
+                                  published_date=published_date or datetime.date.today())
+            self.listings[listing.id] = listing
+            return listing
+
+    def delete_listing(self, listing_id: int) -> bool:
+        with self._lock:
+            return self.listings.pop(listing_id, None) is not None
+
+    def add_synthetic_listings(self, count: int) -> list[FakeListing]:
+        # Published listings with unique titles, prices and dates of the last month
+        rnd = random.Random(self.options.seed)
+        today = datetime.date.today()
+        result = []
+        for i in range(count):
+            make = rnd.choice(list(MAKES))
+            result.append(self.add_listing(
+                title=f'{rnd.randint(2008, today.year)} {make} {rnd.choice(MAKES[make])} P{i + 1:05d}',
+                price=float(rnd.randint(50, 600) * 100),
+                description=f'Synthetic listing {i + 1}',
+                mileage=rnd.randint(5, 250) * 1000,
+                fuel_type='Gasoline',
+                published_date=today - datetime.timedelta(days=rnd.randint(0, 30))))
+        return result
+
+    def get_listings(self, query: str = '') -> list[FakeListing]:
+        query = ' '.join(query.lower().split())
+        with self._lock:
+            # The newest first, like the selling page
+            listings = sorted(self.listings.values(), key=lambda listing: -listing.id)
+        if query:
+            listings = [listing for listing in listings if query in ' '.join(listing.title.lower().split())]
+        return listings
+
+    def get_cards_batch(self, offset: int = 0, query: str = '') -> tuple[list[FakeListing], int | None]:
+        """
+        :return: Listings of the batch and the offset of the next batch, None if the batch is the last
+        """
+        listings = self.get_listings(query)
+        batch_size = self.options.batch_size or len(listings)
+        next_offset = offset + batch_size
+        return listings[offset:next_offset], next_offset if next_offset < len(listings) else None
+
+    def add_share(self, listing_id: int, group: str, text: str) -> None:
+        with self._lock:
+            self.shares.append({'listing_id': listing_id, 'group': group, 'text': text})
+
+    def should_fail(self, rate: float) -> bool:
+        with self._lock:
+            return self.random.random() < rate
+
+    def count(self, name: str) -> None:
+        with self._lock:
+            self.stats[name] += 1
+
+
+class FakeMarketplaceServer(ThreadingHTTPServer):
+    """
+    Local web app which reproduces the structure of the selling page, the listing viewer, the share dialog
+    and the create-vehicle form closely enough for the selectors of listing_helper.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, marketplace: FakeMarketplace, host: str = '127.0.0.1', port: int = 0):
+        self.marketplace = marketplace
+        self._thread: threading.Thread | None = None
+        super().__init__((host, port), FakeMarketplaceHandler)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f'http://{host}:{port}'
+
+    @property
+    def pages(self) -> dict[str, str]:
+        # Replacement for listing_helper.PAGES
+        return {
+            'selling': self.base_url + SELLING_PATH,
+            'create_new_listing': self.base_url + CREATE_PATH,
+            'create_new_listing_vehicle': self.base_url + CREATE_VEHICLE_PATH,
+        }
+
+    def start(self) -> 'FakeMarketplaceServer':
+        self._thread = threading.Thread(target=self.serve_forever, name='fake marketplace', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.shutdown()
+        self.server_close()
+
+
+class FakeMarketplaceHandler(BaseHTTPRequestHandler):
+    server: FakeMarketplaceServer
+
+    def log_message(self, format, *args):
+        pass
+
+    @property
+    def marketplace(self) -> FakeMarketplace:
+        return self.server.marketplace
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        path = url.path.rstrip('/')
+        self.marketplace.count('GET ' + (get_route(path) or '/'))
+
+        if path.startswith('/api/'):
+            time.sleep(self.marketplace.options.api_latency)
+            match = re.fullmatch(r'/api/listings/(\d+)', path)
+            if match:
+                listing = self.marketplace.listings.get(int(match.group(1)))
+                return self.send_json(listing.to_json() if listing else None, status=200 if listing else 404)
+            if path == '/api/cards':
+                # Next batch of the selling page, it is loaded by scrolling or searching
+                query = parse_qs(url.query)
+                time.sleep(self.marketplace.options.load_delay)
+                listings, next_offset = self.marketplace.get_cards_batch(
+                    offset=int(query.get('offset', ['0'])[0]), query=query.get('query', [''])[0])
+                return self.send_json({'html': render_cards(listings), 'next_offset': next_offset})
+            if path == '/api/state':
+                return self.send_json({'listings': [listing.to_json() for listing in self.marketplace.get_listings()],
+                                       'shares': self.marketplace.shares,
+                                       'stats': dict(self.marketplace.stats)})
+            return self.send_json(None, status=404)
+
+        time.sleep(self.marketplace.options.page_latency)
+        if path in ('', SELLING_PATH):
+            return self.send_html(render_selling_page(self.marketplace))
+        if path == CREATE_PATH:
+            return self.send_html(render_create_page())
+        if path == CREATE_VEHICLE_PATH:
+            return self.send_html(render_create_vehicle_page(self.marketplace))
+        if re.fullmatch(r'/marketplace/item/\d+', path):
+            return self.send_html(render_selling_page(self.marketplace))
+        self.send_error(404)
+
+    def do_POST(self):
+        path = urlsplit(self.path).path.rstrip('/')
+        self.marketplace.count('POST ' + get_route(path))
+        time.sleep(self.marketplace.options.api_latency)
+
+        length = int(self.headers.get('Content-Length') or 0)
+        data = json.loads(self.rfile.read(length) or b'{}')
+
+        if path == '/api/listings':
+            listing = self.marketplace.add_listing(
+                title=str(data.get('title', '')).strip(),
+                price=float(re.sub(r'[^\d.]', '', str(data.get('price', ''))) or 0),
+                description=data.get('description', ''),
+                mileage=int(re.sub(r'\D', '', str(data.get('mileage', ''))) or 0),
+                fuel_type=data.get('fuel_type', ''))
+            return self.send_json(listing.to_json())
+
+        match = re.fullmatch(r'/api/listings/(\d+)/delete', path)
+        if match:
+            return self.send_json({'deleted': self.marketplace.delete_listing(int(match.group(1)))})
+
+        if path == '/api/shares':
+            self.marketplace.add_share(listing_id=int(data.get('listing_id', 0)),
+                                       group=data.get('group', ''),
+                                       text=data.get('text', ''))
+            return self.send_json({'shared': True})
+
+        self.send_json(None, status=404)
+
+    def send_html(self, body: str) -> None:
+        self.send_body(body.encode('utf-8'), 'text/html; charset=utf-8')
+
+    def send_json(self, data, status: int = 200) -> None:
+        self.send_body(json.dumps(data, ensure_ascii=False).encode('utf-8'), 'application/json', status)
+
+    def send_body(self, body: bytes, content_type: str, status: int = 200) -> None:
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('Cache-Control', 'no-store')
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def get_route(path: str) -> str:
+    # Requests are counted per route, not per listing
+    return re.sub(r'/\d+', '/<id>', path)
+
+
+def el(tag: str, *children: str, **attributes) -> str:
+    # attributes: aria_label -> aria-label, class_ -> class
+    attrs = ''.join(f' {name.rstrip("_").replace("_", "-")}="{html.escape(str(value))}"'
+                    for name, value in attributes.items() if value is not None)
+    return f'<{tag}{attrs}>{"".join(children)}</{tag}>'
+
+
+def div(*children: str, **attributes) -> str:
+    return el('div', *children, **attributes)
+
+
+def span(*children: str, **attributes) -> str:
+    return el('span', *children, **attributes)
+
+
+def format_price(price: float) -> str:
+    return f'CA${int(price):,}'
+
+
+def render_card(listing: FakeListing) -> str:
+    """
+    Card of the selling list, nesting of the divs is the one the XPaths of listing_helper expect.
+    """
+    title = html.escape(listing.title)
+    date = listing.published_date
+    info = div(                                                     # div[2]/div
+        div(span(span(span(title)))),                               # div[1], title
+        div(span(format_price(listing.price))))                     # div[2], price
+    listed = div(                                                   # div[3]
+        div(span(span(span(f'Listed on {date.month}/{date.day}')))),
+        div(span('Share', role='button', class_='share-button', data_id=listing.id)))
+    clickable = div(
+        div(div(el('img', src=PLACEHOLDER_IMAGE, width='80')),     # div[1]
+            div(info),                                              # div[2]
+            listed),
+        aria_label=listing.title, role='button', tabindex='0', class_='listing', data_id=listing.id)
+    return div(div(div(div(div('&nbsp;'), div(div(clickable))))),
+               class_='card', data_title=' '.join(listing.title.lower().split()))
+
+
+def render_cards(listings: list[FakeListing]) -> str:
+    return ''.join(render_card(listing) for listing in listings)
+
+
+def render_sidebar() -> str:
+    return div(el('a', 'Create new listing', href=CREATE_PATH, aria_label='Create new listing'),
+               el('a', 'Your listings', href=SELLING_PATH),
+               aria_label='Marketplace sidebar', class_='sidebar')
+
+
+def render_page(title: str, body: str, script: str = '') -> str:
+    return f"""<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>{html.escape(title)}</title>
+<style>
+body {{ font-family: sans-serif; margin: 0; display: flex; }}
+.sidebar {{ width: 220px; padding: 16px; display: flex; flex-direction: column; gap: 8px; }}
+.main {{ flex: 1; padding: 16px; max-width: 700px; }}
+.card {{ border: 1px solid #ddd; margin: 8px 0; padding: 8px; }}
+.listing {{ cursor: pointer; }}
+.panel {{ position: fixed; top: 0; right: 0; width: 40%; height: 100%; overflow: auto; background: #fff;
+          border-left: 1px solid #999; padding: 16px; box-sizing: border-box; }}
+.hidden {{ display: none !important; }}
+[role=button] {{ cursor: pointer; padding: 4px; display: inline-block; }}
+.field {{ margin: 8px 0; }}
+.field input, .field textarea {{ display: block; width: 100%; }}
+.toast {{ position: fixed; bottom: 16px; left: 16px; background: #333; color: #fff; padding: 8px; }}
+</style>
+</head>
+<body>
+{body}
+<script>
+function show(element) {{ element.classList.remove('hidden'); }}
+function hide(element) {{ element.classList.add('hidden'); }}
+function closeOverlays() {{ document.querySelectorAll('.overlay').forEach(hide); }}
+async function post(url, data) {{
+  const response = await fetch(url, {{method: 'POST', headers: {{'Content-Type': 'application/json'}},
+                                      body: JSON.stringify(data || {{}})}});
+  return response.json();
+}}
+document.addEventListener('keydown', event => {{ if (event.key === 'Escape') closeOverlays(); }});
+{script}
+</script>
+</body>
+</html>"""
+
+
+def render_selling_page(marketplace: FakeMarketplace) -> str:
+    groups = ''.join(div(span(html.escape(group)), role='button', class_='group', data_group=group)
+                     for group in marketplace.options.groups)
+
+    listings, next_offset = marketplace.get_cards_batch()
+    body = render_sidebar() + div(
+        el('input', type='text', placeholder='Search your listings', id='search'),
+        # Nesting of the list is the same as find_all_published_listing_elements expects
+        div(div(div(div('&nbsp;'),
+                    div(div(div(div('&nbsp;'),
+                                div(div(div(span(div(div(render_cards(listings), id='cards'))))))))))),
+            aria_label='Collection of your Marketplace items'),
+        class_='main', role='main')
+
+    # "Your Listing" window of the selected listing
+    body += div(
+        div('✕', aria_label='Close', tabindex='0', role='button', class_='close-listing'),
+        el('a', span('', id='listing-title'), href='#', id='listing-link'),
+        div(div('Delete', aria_label='Delete', tabindex='0', role='button', id='delete-button')),
+        div(div('Delete', aria_label='Delete', tabindex='0', role='button', id='confirm-delete-button'),
+            aria_label='Delete listing', role='dialog', class_='overlay hidden', id='confirm-delete'),
+        aria_label='Your Listing', role='dialog', class_='panel overlay hidden', id='your-listing')
+
+    # Listing viewer, its info is at the path which get_published_listing expects
+    body += div(
+        div(div('✕', aria_label='Close', aria_hidden='false', role='button', tabindex='-1', class_='close-viewer')),
+        div(div(div(div('&nbsp;'),
+                    div(div(div('Photos'),
+                            div(div(div(span('', id='viewer-price'))),
+                                div(div(), div(span('', id='viewer-mileage'))),
+                                div(div(), div(span('', id='viewer-fuel-type'))),
+                                # Text of the description is followed by the "See more" button in one span
+                                div(span(span(span('See more'), role='button', id='viewer-see-more'),
+                                         id='viewer-description')))))))),
+        aria_label='Marketplace Listing Viewer', role='dialog', class_='panel overlay hidden', id='viewer')
+
+    # Share dialog
+    body += div(
+        div(div(span('Group'), role='button', id='share-to-group'), id='share-options'),
+        div(el('input', type='text', aria_label='Search for groups', id='group-search'),
+            div(groups, id='groups'),
+            class_='hidden', id='group-picker'),
+        div(div('', contenteditable='true', role='textbox', aria_placeholder='Create a public post...',
+                id='post-text'),
+            div('Post', aria_label='Post', role='button', id='post-button'),
+            class_='hidden', id='composer'),
+        aria_label='Share', role='dialog', class_='panel overlay hidden', id='share-dialog')
+    body += div(span(''), class_='toast hidden', id='toast')
+
+    script = f'const FIRST_NEXT_OFFSET = {json.dumps(next_offset)};\n' + """
+let selectedId = null;
+let shareId = null;
+let selectedGroup = null;
+const $ = id => document.getElementById(id);
+
+document.addEventListener('click', async event => {
+  const share = event.target.closest('.share-button');
+  if (share) {
+    event.stopPropagation();
+    shareId = share.dataset.id;
+    show($('share-options')); hide($('group-picker')); hide($('composer'));
+    $('group-search').value = ''; filterGroups();
+    show($('share-dialog'));
+    return;
+  }
+  const listing = event.target.closest('.listing');
+  if (listing) {
+    selectedId = listing.dataset.id;
+    $('listing-title').textContent = listing.getAttribute('aria-label');
+    $('listing-link').setAttribute('href', '/marketplace/item/' + selectedId);
+    hide($('confirm-delete'));
+    show($('your-listing'));
+  }
+});
+document.querySelector('.close-listing').addEventListener('click', () => hide($('your-listing')));
+document.querySelector('.close-viewer').addEventListener('click', () => hide($('viewer')));
+
+$('listing-link').addEventListener('click', async event => {
+  event.preventDefault();
+  const listing = await (await fetch('/api/listings/' + selectedId)).json();
+  $('viewer-price').textContent = 'CA$' + Math.round(listing.price).toLocaleString('en-US');
+  $('viewer-mileage').textContent = 'Driven ' + listing.mileage.toLocaleString('en-US') + ' km';
+  $('viewer-fuel-type').textContent = 'Fuel type: ' + listing.fuel_type;
+  $('viewer-description').dataset.full = listing.description;
+  setDescription(false);
+  show($('viewer'));
+});
+function setDescription(expanded) {
+  const description = $('viewer-description');
+  description.firstChild.nodeType === Node.TEXT_NODE && description.firstChild.remove();
+  const text = expanded ? description.dataset.full : description.dataset.full.slice(0, 80);
+  description.insertBefore(document.createTextNode(text), $('viewer-see-more'));
+  $('viewer-see-more').firstChild.textContent = expanded ? 'See less' : 'See more';
+}
+$('viewer-see-more').addEventListener('click', () =>
+  setDescription($('viewer-see-more').firstChild.textContent === 'See more'));
+
+$('delete-button').addEventListener('click', () => show($('confirm-delete')));
+$('confirm-delete-button').addEventListener('click', async () => {
+  await post('/api/listings/' + selectedId + '/delete');
+  document.querySelectorAll('.listing[data-id="' + selectedId + '"]').forEach(l => l.closest('.card').remove());
+  hide($('confirm-delete'));
+  hide($('your-listing'));
+});
+
+function filterGroups() {
+  const text = $('group-search').value.toLowerCase();
+  document.querySelectorAll('.group').forEach(group =>
+    group.dataset.group.toLowerCase().includes(text) ? show(group) : hide(group));
+}
+$('group-search').addEventListener('input', filterGroups);
+$('share-to-group').addEventListener('click', () => { hide($('share-options')); show($('group-picker')); });
+document.querySelectorAll('.group').forEach(group => group.addEventListener('click', () => {
+  selectedGroup = group.dataset.group;
+  hide($('group-picker')); $('post-text').textContent = ''; show($('composer'));
+}));
+$('post-button').addEventListener('click', async () => {
+  await post('/api/shares', {listing_id: shareId, group: selectedGroup, text: $('post-text').innerText});
+  closeOverlays();
+  $('toast').firstChild.textContent = 'Shared to your group.';
+  show($('toast'));
+  setTimeout(() => hide($('toast')), 5000);
+});
+
+// Cards are loaded by batches while the page is scrolled to the end, search reloads them from the server
+let nextOffset = FIRST_NEXT_OFFSET;
+let query = '';
+let loading = false;
+let generation = 0;
+async function loadCards(reset) {
+  const current = reset ? ++generation : generation;
+  loading = true;
+  try {
+    const offset = reset ? 0 : nextOffset;
+    const response = await fetch('/api/cards?offset=' + offset + '&query=' + encodeURIComponent(query));
+    const batch = await response.json();
+    // Results of an outdated search are dropped
+    if (current !== generation) return;
+    if (reset) $('cards').innerHTML = '';
+    $('cards').insertAdjacentHTML('beforeend', batch.html);
+    nextOffset = batch.next_offset;
+  } finally {
+    if (current === generation) loading = false;
+  }
+  loadIfAtEnd();
+}
+function loadIfAtEnd() {
+  // The page which isn't filled by the cards can't be scrolled, then the next batch is loaded at once
+  if (loading || nextOffset === null) return;
+  if (window.innerHeight + window.scrollY < document.body.scrollHeight - 200) return;
+  loadCards(false);
+}
+window.addEventListener('scroll', loadIfAtEnd);
+loadIfAtEnd();
+$('search').addEventListener('input', () => {
+  query = $('search').value;
+  loadCards(true);
+});
+"""
+    return render_page('Selling', body, script)
+
+
+def render_create_page() -> str:
+    body = render_sidebar() + div(
+        el('h2', 'Choose listing type'),
+        el('a', span('Vehicle for sale'), href=CREATE_VEHICLE_PATH),
+        class_='main', role='main')
+    return render_page('Create listing', body)
+
+
+def render_create_vehicle_page(marketplace: FakeMarketplace) -> str:
+    options = marketplace.options
+    years = [str(year) for year in range(datetime.date.today().year + 1, 1979, -1)]
+    dropdowns = {
+        'Vehicle type': [str(item) for item in VehicleType],
+        'Year': years,
+        'Make': list(MAKES),
+        'Body style': [str(item) for item in BodyType],
+        'Exterior color': [str(item) for item in BaseColor],
+        'Interior color': [str(item) for item in BaseColor],
+        'Vehicle condition': [str(item) for item in VehicleCondition],
+        'Fuel type': [str(item) for item in FuelType],
+        'Transmission': [str(item) for item in Transmission],
+    }
+
+    def dropdown(label: str) -> str:
+        # The chosen value isn't in a span, else the option XPaths would find it instead of the option
+        return div(div(span(label), ' ', el('b', '', class_='value'), role='button', class_='dropdown',
+                       data_field=label),
+                   class_='field')
+
+    def text_field(label: str, name: str) -> str:
+        return div(el('label', span(label), el('input', type='text', name=name)), class_='field')
+
+    groups = ''.join(div(div(span(html.escape(group)), role='checkbox', class_='group', data_group=group))
+                     for group in options.groups)
+    form = div(
+        el('input', type='file', multiple='multiple', accept='image/*,image/heif,image/heic', id='photos'),
+        div('', id='thumbnails'),
+        dropdown('Vehicle type'), dropdown('Year'), dropdown('Make'),
+        text_field('Model', 'model'), text_field('Mileage', 'mileage'),
+        dropdown('Body style'), dropdown('Exterior color'), dropdown('Interior color'),
+        dropdown('Vehicle condition'), dropdown('Fuel type'), dropdown('Transmission'),
+        text_field('Price', 'price'),
+        div(el('label', span('Description'), div(el('textarea', '', name='description', rows='6'))), class_='field'),
+        div(el('label', span('Location'), el('input', type='text', name='location', id='location')),
+            el('ul', el('li', div('', id='location-suggestion')), role='listbox', class_='hidden', id='suggestions'),
+            class_='field'),
+        div(div(div('Next'), aria_label='Next', role='button', id='next-button')),
+        id='form')
+    groups_step = div(el('h3', 'List in more places'), groups,
+                      div('Publish', aria_label='Publish', role='button', id='publish-button'),
+                      class_='hidden', id='groups-step')
+    options_panel = div(div('', id='options-list'), class_='panel overlay hidden', id='options-panel')
+
+    body = render_sidebar() + div(el('h2', 'Vehicle for sale'), form, groups_step, class_='main', role='main')
+    body += options_panel
+
+    script = f"""
+const $ = id => document.getElementById(id);
+const DROPDOWNS = {json.dumps(dropdowns)};
+const PHOTO_UPLOAD_TIME = {options.photo_upload_time * 1000};
+const PHOTO_REJECT_RATE = {options.photo_reject_rate};
+const PUBLISH_FAILURE_RATE = {options.publish_failure_rate};
+const values = {{}};
+let uploading = 0;
+let openField = null;
+
+function updatePublishButton() {{
+  if (uploading) $('publish-button').setAttribute('aria-disabled', 'true');
+  else $('publish-button').removeAttribute('aria-disabled');
+}}
+
+$('photos').addEventListener('change', () => {{
+  Array.from($('photos').files).forEach((file, index) => {{
+    const progress = document.createElement('div');
+    progress.setAttribute('role', 'progressbar');
+    progress.textContent = 'Uploading ' + file.name;
+    $('thumbnails').appendChild(progress);
+    uploading++;
+    updatePublishButton();
+    setTimeout(() => {{
+      progress.remove();
+      uploading--;
+      if (Math.random() >= PHOTO_REJECT_RATE) {{
+        const image = document.createElement('img');
+        image.src = URL.createObjectURL(file);
+        image.width = 60;
+        $('thumbnails').appendChild(image);
+      }}
+      updatePublishButton();
+    }}, PHOTO_UPLOAD_TIME * (index + 1));
+  }});
+}});
+
+// Options of one dropdown are in the document only while it is open, like in the real form
+document.querySelectorAll('.dropdown').forEach(dropdown => dropdown.addEventListener('click', () => {{
+  openField = dropdown.dataset.field;
+  $('options-list').innerHTML = '';
+  DROPDOWNS[openField].forEach(option => {{
+    const item = document.createElement('div');
+    item.innerHTML = '<div><div><div><div><span></span></div></div></div></div>';
+    item.querySelector('span').textContent = option;
+    item.querySelector('span').setAttribute('role', 'option');
+    item.addEventListener('click', () => {{
+      values[openField] = option;
+      dropdown.querySelector('.value').textContent = option;
+      $('options-list').innerHTML = '';
+      hide($('options-panel'));
+    }});
+    $('options-list').appendChild(item);
+  }});
+  show($('options-panel'));
+}}));
+
+$('location').addEventListener('input', () => {{
+  $('location-suggestion').textContent = $('location').value;
+  show($('suggestions'));
+}});
+$('location-suggestion').addEventListener('click', () => hide($('suggestions')));
+
+$('next-button').addEventListener('click', () => {{
+  if (Math.random() < PUBLISH_FAILURE_RATE) {{
+    // The error dialog is only added on the failure, the bot checks the "Close" button to detect it
+    const dialog = document.createElement('div');
+    dialog.setAttribute('role', 'dialog');
+    dialog.className = 'panel';
+    dialog.innerHTML = '<span>Something went wrong. Please try again.</span>'
+                     + '<div role="button"><span>Close</span></div>';
+    dialog.querySelector('[role=button]').addEventListener('click', () => dialog.remove());
+    document.body.appendChild(dialog);
+    return;
+  }}
+  hide($('form'));
+  show($('groups-step'));
+}});
+document.querySelectorAll('.group').forEach(group => group.addEventListener('click', () =>
+  group.setAttribute('aria-checked', group.getAttribute('aria-checked') === 'true' ? 'false' : 'true')));
+
+$('publish-button').addEventListener('click', () => {{
+  if ($('publish-button').hasAttribute('aria-disabled')) return;
+  const field = name => document.querySelector('[name="' + name + '"]').value;
+  // The beacon is delivered even when the bot navigates away before the redirect
+  navigator.sendBeacon('/api/listings', JSON.stringify({{
+    title: [values['Year'], values['Make'], field('model')].filter(Boolean).join(' '),
+    price: field('price'),
+    mileage: field('mileage'),
+    description: field('description'),
+    fuel_type: values['Fuel type'] || '',
+  }}));
+  window.location.href = '{SELLING_PATH}';
+}});
+"""
+    return render_page('Vehicle for sale', body, script)
@@ -0,0 +1,102 @@
+import argparse
+import json
+import logging
+import tempfile
+import time
+import tracemalloc
+
+import psutil
+
+from config import CONFIG
+from harness.fake_dealer import FakeDealer, FakeDealerOptions, FakeDealerServer
+from helpers import data_helper
+
+
+def run_import(options: FakeDealerOptions, upload_limit: int | None = None, runs: int = 1) -> list[dict]:
+    """
+    Import of the synthetic inventory from the local dealer stand-in into a temporary photos folder.
+
+    :param runs: Imports one after another, the next ones show the import over the photos which are already saved
+    :return: Report of every import: time, memory, requests to the dealer.
+             The stand-in runs in the same process, its photos are a part of the Python memory peak.
+    """
+    dealer = FakeDealer(options)
+    server = FakeDealerServer(dealer).start()
+    process = psutil.Process()
+    reports = []
+
+    with tempfile.TemporaryDirectory(prefix='harness_import_') as folder:
+        # Module level settings of the import are pointed to the stand-in and the temporary folder
+        original = (data_helper.CONFIG_DEALER_URL, data_helper.CONFIG_PHOTOS_BASE_FOLDER,
+                    CONFIG['photos']['base_folder'])
+        data_helper.CONFIG_DEALER_URL = server.base_url
+        data_helper.CONFIG_PHOTOS_BASE_FOLDER = CONFIG['photos']['base_folder'] = folder
+        try:
+            for run in range(runs):
+                stats_before = dict(dealer.stats)
+                rss_before = process.memory_info().rss
+                tracemalloc.start()
+                started_at = time.perf_counter()
+
+                listings = data_helper.import_data_from_website_cams(
+                    license_id='1', upload_limit=upload_limit or options.vehicles)
+
+                elapsed = time.perf_counter() - started_at
+                _, peak = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+                requests = {name: value - stats_before.get(name, 0) for name, value in dealer.stats.items()}
+                photos = sum(len(listing.photos_names or []) for listing in listings)
+                reports.append({
+                    'run': run + 1,
+                    'vehicles': options.vehicles,
+                    'imported': len(listings),
+                    'photos': photos,
+                    'expected_photos': sum(len(dealer.get_photo_urls(listing.stockno)) for listing in listings),
+                    'seconds': round(elapsed, 3),
+                    'listings_per_second': round(len(listings) / elapsed, 1) if elapsed else None,
+                    'megabytes_per_second': round(requests.get('bytes', 0) / 1024 / 1024 / elapsed, 2)
+                    if elapsed else None,
+                    'python_peak_mb': round(peak / 1024 / 1024, 1),
+                    'rss_growth_mb': round((process.memory_info().rss - rss_before) / 1024 / 1024, 1),
+                    'requests': requests,
+                })
+        finally:
+            (data_helper.CONFIG_DEALER_URL, data_helper.CONFIG_PHOTOS_BASE_FOLDER,
+             CONFIG['photos']['base_folder']) = original
+            server.stop()
+    return reports
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Load test of the import against the local dealer stand-in')
+    parser.add_argument('--vehicles', type=int, default=100, help='Vehicles in the inventory')
+    parser.add_argument('--photos', default='0-20', help='Range of the photos of a vehicle, e.g. 0-60')
+    parser.add_argument('--photo-size-kb', type=int, default=150)
+    parser.add_argument('--upload-limit', type=int, default=None, help='Vehicles to import, all by default')
+    parser.add_argument('--latency', type=float, default=0.0, help='Seconds before every response')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Share of the requests which fail with 500')
+    parser.add_argument('--requests-per-second', type=float, default=None, help='Requests over it get 429')
+    parser.add_argument('--bandwidth-kbps', type=float, default=None, help='Speed of the responses')
+    parser.add_argument('--runs', type=int, default=1, help='Imports one after another')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    # The import logs every vehicle and photo, records would go to the log files of the bot
+    logging.disable(logging.CRITICAL)
+
+    photos_min, _, photos_max = args.photos.partition('-')
+    reports = run_import(FakeDealerOptions(vehicles=args.vehicles,
+                                           photos_min=int(photos_min),
+                                           photos_max=int(photos_max or photos_min),
+                                           photo_size_kb=args.photo_size_kb,
+                                           latency=args.latency,
+                                           error_rate=args.error_rate,
+                                           requests_per_second=args.requests_per_second,
+                                           bandwidth_kbps=args.bandwidth_kbps,
+                                           seed=args.seed),
+                         upload_limit=args.upload_limit,
+                         runs=args.runs)
+    print(json.dumps(reports, indent=2))
+
+
+if __name__ == '__main__':
+    main()
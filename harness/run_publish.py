@@ -0,0 +1,159 @@
+import argparse
+import datetime
+import json
+import os
+import random
+import tempfile
+import time
+
+from selenium import webdriver
+from selenium.webdriver.chrome.options import Options as ChromeOptions
+from selenium.webdriver.chrome.service import Service as ChromeService
+
+from config import CONFIG
+from harness.fake_marketplace import FakeMarketplace, FakeMarketplaceOptions, FakeMarketplaceServer
+from harness.synthetic import generate_listings
+from helpers import listing_helper
+from helpers.driver_helper import resolve_chromedriver_path
+from helpers.group_helper import group_cache, parse_group_names
+from helpers.ledger_helper import PublicationLedger
+from helpers.publish_queue import PublishQueue
+from helpers.scraper import Scraper
+
+
+class HarnessScraper(Scraper):
+    """
+    Scraper with the random delays of the bot scaled down, the delays aren't what the harness measures.
+    """
+
+    delay_scale = 1.0
+
+    @classmethod
+    def get_random_delay(cls, min_delay: int, max_delay: int) -> float:
+        return random.uniform(min_delay, max_delay) * cls.delay_scale
+
+
+def create_driver(headless: bool = True) -> webdriver.Chrome:
+    options = ChromeOptions()
+    if headless:
+        options.add_argument('--headless=new')
+    options.add_argument('--window-size=1400,1000')
+    options.add_argument('--no-sandbox')
+    options.add_argument('--disable-dev-shm-usage')
+    return webdriver.Chrome(service=ChromeService(resolve_chromedriver_path()), options=options)
+
+
+def run_publish(listings_count: int, published_count: int = 0, stale_count: int = 0,
+                options: FakeMarketplaceOptions | None = None, delay_scale: float = 0.01,
+                headless: bool = True, photos_per_listing: int = 3) -> dict:
+    """
+    One publish cycle against the fake Marketplace: removal of the stale listings, then publishing and sharing.
+
+    :param published_count: Listings of the feed which are already published
+    :param stale_count: Of the published listings, those whose price is changed since, they are republished
+    :return: Report with the timings and the state of the fake Marketplace
+    """
+    options = options or FakeMarketplaceOptions()
+    options.groups = list(parse_group_names(CONFIG['listing']['public_groups'])) or options.groups
+
+    with tempfile.TemporaryDirectory(prefix='harness_') as folder:
+        listings = generate_listings(listings_count, photos_folder=os.path.join(folder, 'photos'),
+                                     photos_per_listing=photos_per_listing, seed=options.seed)
+
+        marketplace = FakeMarketplace(options)
+        for i, listing in enumerate(listings[:published_count]):
+            marketplace.add_listing(title=listing.title,
+                                    price=listing.price + (1000 if i < stale_count else 0),
+                                    description=listing.description,
+                                    mileage=listing.mileage,
+                                    fuel_type=str(listing.fuel_type),
+                                    published_date=datetime.date.today() - datetime.timedelta(days=1))
+
+        server = FakeMarketplaceServer(marketplace).start()
+        # Module level state of the bot is pointed to the fake Marketplace and the temporary folder
+        original_pages = dict(listing_helper.PAGES)
+        original_group_cache_path = group_cache.file_path
+        listing_helper.PAGES.update(server.pages)
+        group_cache.file_path = os.path.join(folder, 'groups.json')
+        group_cache._groups = None
+
+        HarnessScraper.delay_scale = delay_scale
+        ledger = PublicationLedger(file_path=os.path.join(folder, 'ledger.sqlite3'))
+        publish_queue = PublishQueue(file_path=os.path.join(folder, 'publish_queue.sqlite3'))
+        driver = create_driver(headless=headless)
+        timings = {}
+        result = []
+        failures = {}
+        try:
+            started_at = time.perf_counter()
+            scraper = HarnessScraper(url=server.pages['selling'], driver=driver)
+            timings['open'] = time.perf_counter() - started_at
+
+            publish_queue.begin_run(listings)
+            started_at = time.perf_counter()
+            plan = listing_helper.check_and_remove_listings(scraper=scraper, listings=listings, ledger=ledger,
+                                                            publish_queue=publish_queue)
+            timings['remove'] = time.perf_counter() - started_at
+
+            started_at = time.perf_counter()
+            listing_helper.check_and_update_listings(scraper=scraper, listings=listings, plan=plan,
+                                                     total=len(listings), result=result, failures=failures,
+                                                     ledger=ledger, publish_queue=publish_queue)
+            timings['update'] = time.perf_counter() - started_at
+            publish_queue.finish_run()
+        finally:
+            driver.quit()
+            server.stop()
+            listing_helper.PAGES.update(original_pages)
+            group_cache.file_path = original_group_cache_path
+            group_cache._groups = None
+
+        published_titles = {listing.title for listing in marketplace.get_listings()}
+        return {
+            'listings': listings_count,
+            'published_before': published_count,
+            'stale': stale_count,
+            'timings': {name: round(value, 3) for name, value in timings.items()},
+            'seconds_per_listing': round(timings.get('update', 0) / max(len(result), 1), 3),
+            'published': len(result),
+            'missing': sorted(listing.title for listing in listings if listing.title not in published_titles),
+            'failures': failures,
+            'removals': len(plan.removals),
+            'shares': len(marketplace.shares),
+            'requests': dict(marketplace.stats),
+        }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Run a publish cycle against the local fake Marketplace')
+    parser.add_argument('--listings', type=int, default=5, help='Listings in the feed')
+    parser.add_argument('--published', type=int, default=0, help='Listings which are already published')
+    parser.add_argument('--stale', type=int, default=0, help='Published listings with a changed price')
+    parser.add_argument('--photos', type=int, default=3, help='Photos per listing')
+    parser.add_argument('--page-latency', type=float, default=0.0, help='Seconds before every page')
+    parser.add_argument('--api-latency', type=float, default=0.0, help='Seconds before every API response')
+    parser.add_argument('--photo-upload-time', type=float, default=0.3, help='Seconds of uploading of one photo')
+    parser.add_argument('--photo-reject-rate', type=float, default=0.0, help='Share of rejected photos')
+    parser.add_argument('--publish-failure-rate', type=float, default=0.0, help='Share of failed publishings')
+    parser.add_argument('--delay-scale', type=float, default=0.01, help='Scale of the random delays of the bot')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--headed', action='store_true', help='Show the browser')
+    args = parser.parse_args()
+
+    report = run_publish(listings_count=args.listings,
+                         published_count=args.published,
+                         stale_count=args.stale,
+                         photos_per_listing=args.photos,
+                         delay_scale=args.delay_scale,
+                         headless=not args.headed,
+                         options=FakeMarketplaceOptions(page_latency=args.page_latency,
+                                                        api_latency=args.api_latency,
+                                                        photo_upload_time=args.photo_upload_time,
+                                                        photo_reject_rate=args.photo_reject_rate,
+                                                        publish_failure_rate=args.publish_failure_rate,
+                                                        seed=args.seed))
+    print(json.dumps(report, indent=2, ensure_ascii=False))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,144 @@
+import datetime
+import os
+import random
+import struct
+import zlib
+
+from helpers.model import Listing, VehicleType, VehicleCondition, BodyType, BaseColor, FuelType, Transmission
+
+MAKES = {
+    'Toyota': ['Camry', 'Corolla', 'RAV4', 'Highlander', 'Tacoma'],
+    'Honda': ['Civic', 'Accord', 'CR-V', 'Pilot', 'Odyssey'],
+    'Ford': ['F-150', 'Escape', 'Explorer', 'Mustang', 'Edge'],
+    'Chevrolet': ['Silverado', 'Equinox', 'Malibu', 'Traverse', 'Cruze'],
+    'Hyundai': ['Elantra', 'Tucson', 'Santa Fe', 'Sonata', 'Kona'],
+    'Nissan': ['Rogue', 'Altima', 'Sentra', 'Pathfinder', 'Murano'],
+    'Volkswagen': ['Jetta', 'Golf', 'Tiguan', 'Passat', 'Atlas'],
+    'BMW': ['X3', 'X5', '330i', '530i', 'X1'],
+}
+
+DESCRIPTION_PARTS = [
+    'Clean title, one owner, no accidents.',
+    'Safety certified, ready to go!',
+    'Heated seats, backup camera, Apple CarPlay & Android Auto.',
+    'Winter tires included ❄️ Financing available for all credit types.',
+    'Чудовий стан, один власник, без ДТП.',
+    'Сертифікат безпеки, фінансування для всіх 🚗',
+    'Говоримо українською та англійською. Телефонуйте!',
+    'Trade-ins welcome. Call or text for a test drive 📞',
+]
+
+# Values of the dealer feed are free text, some of them are not known to the enums of the model
+FEED_BODY_TYPES = ['Sedan', 'SUV', 'suv', 'Truck', 'Hatchback', 'Coupe', 'Crew Cab Pickup', '']
+FEED_COLOURS = ['Black', 'WHITE', 'Gray', 'Silver', 'red', 'Pearl White', 'Blue', '']
+FEED_FUEL_TYPES = ['Gasoline', 'GASOLINE', 'Diesel', 'Hybrid', 'Electric', 'Flex Fuel', '']
+FEED_TRANSMISSIONS = ['Automatic', 'automatic', 'Manual', 'CVT', None]
+FEED_CITIES = [('Toronto', 'Ontario'), ('Mississauga', 'Ontario'), ('Hamilton', 'Ontario'), ('Ottawa', 'Ontario')]
+
+
+def generate_listings(count: int, photos_folder: str, photos_per_listing: int = 3,
+                      seed: int = 0, description_parts: int = 6) -> list[Listing]:
+    """
+    Listings with realistic fields and small valid photos, like the import makes them from the dealer feed.
+    """
+    rnd = random.Random(seed)
+    listings = []
+    for i in range(count):
+        make = rnd.choice(list(MAKES))
+        model = rnd.choice(MAKES[make])
+        year = rnd.randint(2008, datetime.date.today().year)
+        stockno = f'S{i + 1:05d}'
+
+        listing_photos_folder = os.path.join(photos_folder, stockno)
+        photos_names = write_photos(listing_photos_folder, photos_per_listing, seed=seed + i)
+
+        listings.append(Listing(
+            photos_folder=listing_photos_folder,
+            photos_names=photos_names,
+            vehicle_type=VehicleType.CAR_TRUCK,
+            vehicle_condition=VehicleCondition.GOOD,
+            body_type=rnd.choice([BodyType.SEDAN, BodyType.SUV, BodyType.TRUCK, BodyType.HATCHBACK]),
+            year=year,
+            make=make,
+            model=model,
+            exterior_color=rnd.choice([BaseColor.BLACK, BaseColor.WHITE, BaseColor.GRAY, BaseColor.RED]),
+            interior_color=rnd.choice([BaseColor.BLACK, BaseColor.BEIGE, BaseColor.GRAY]),
+            mileage=rnd.randint(5, 250) * 1000,
+            fuel_type=rnd.choice([FuelType.GASOLINE, FuelType.DIESEL, FuelType.HYBRID]),
+            transmission=Transmission.AUTOMATIC,
+            price=float(rnd.randint(50, 600) * 100),
+            # Stock number keeps titles unique
+            title=f'{year} {make} {model} {stockno}',
+            description=' '.join(rnd.choice(DESCRIPTION_PARTS) for _ in range(description_parts)),
+            location='Toronto, Ontario',
+            groups=[],
+            stockno=stockno,
+            vin=f'VIN{i + 1:014d}',
+        ))
+    return listings
+
+
+def generate_feed_items(count: int, seed: int = 0, description_parts: int = 6) -> list[dict]:
+    """
+    Vehicles in the format of the dealer feed (vehicles_for_sale rows of get_list.php), all values are strings.
+    """
+    rnd = random.Random(seed)
+    today = datetime.date.today()
+    items = []
+    for i in range(count):
+        make = rnd.choice(list(MAKES))
+        city, province = rnd.choice(FEED_CITIES)
+        items.append({
+            'stockno': f'S{i + 1:05d}',
+            'vin': f'VIN{i + 1:014d}',
+            'year': str(rnd.randint(2008, today.year)),
+            'make': make,
+            'model': rnd.choice(MAKES[make]),
+            'mileage': str(rnd.randint(5, 250) * 1000),
+            'sale_price_sel': f'{rnd.randint(50, 600) * 100}.00',
+            'body_type': rnd.choice(FEED_BODY_TYPES),
+            'product': 'Used Vehicle',
+            'colour': rnd.choice(FEED_COLOURS),
+            'interior': rnd.choice(FEED_COLOURS),
+            'fuel_type': rnd.choice(FEED_FUEL_TYPES),
+            'transmission_description': rnd.choice(FEED_TRANSMISSIONS),
+            'online_description': ' '.join(rnd.choice(DESCRIPTION_PARTS) for _ in range(description_parts)),
+            'city': city,
+            'province': province,
+            'online_posted': (today - datetime.timedelta(days=rnd.randint(0, 90))).isoformat(),
+        })
+    return items
+
+
+def write_photos(folder: str, count: int, seed: int = 0, size: int = 64) -> list[str]:
+    os.makedirs(folder, exist_ok=True)
+    names = []
+    for i in range(count):
+        name = f'photo_{i + 1}.png'
+        with open(os.path.join(folder, name), 'wb') as f:
+            f.write(make_png(size, size, color=((seed * 37 + i * 91) % 256, (seed * 11) % 256, (i * 53) % 256)))
+        names.append(name)
+    return names
+
+
+def make_png(width: int, height: int, color: tuple[int, int, int] = (128, 128, 128)) -> bytes:
+    # Solid color RGB image, it is enough for the browser to decode and preview
+    row = b'\x00' + bytes(color) * width
+    return build_png(width, height, row * height)
+
+
+def make_noise_png(width: int, height: int, seed: int | str = 0) -> bytes:
+    # Random pixels don't compress, so the file is about as large as a photo of the same size
+    rnd = random.Random(seed)
+    rows = b''.join(b'\x00' + rnd.randbytes(width * 3) for _ in range(height))
+    return build_png(width, height, rows, compress_level=1)
+
+
+def build_png(width: int, height: int, rows: bytes, compress_level: int = 6) -> bytes:
+    def chunk(kind: bytes, data: bytes) -> bytes:
+        return struct.pack('>I', len(data)) + kind + data + struct.pack('>I', zlib.crc32(kind + data))
+
+    return (b'\x89PNG\r\n\x1a\n'
+            + chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0))
+            + chunk(b'IDAT', zlib.compress(rows, compress_level))
+            + chunk(b'IEND', b''))
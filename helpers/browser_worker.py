@@ -0,0 +1,138 @@
+import dataclasses
+import queue
+import threading
+from concurrent.futures import Future
+from enum import StrEnum
+from typing import Any, Callable
+
+from helpers.scraper import JobCancelled
+from logger import system_logger
+
+
+class JobState(StrEnum):
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    CANCELLING = 'cancelling'
+    DONE = 'done'
+    CANCELLED = 'cancelled'
+    FAILED = 'failed'
+
+
+@dataclasses.dataclass
+class BrowserJob:
+    name: str
+    func: Callable[..., Any]
+    args: tuple = ()
+    kwargs: dict = dataclasses.field(default_factory=dict)
+    state: JobState = JobState.QUEUED
+    cancel_event: threading.Event = dataclasses.field(default_factory=threading.Event)
+    future: Future = dataclasses.field(default_factory=Future)
+
+    @property
+    def is_active(self) -> bool:
+        return self.state in (JobState.QUEUED, JobState.RUNNING, JobState.CANCELLING)
+
+
+class BrowserWorker(threading.Thread):
+    """
+    The only thread which drives the browser.
+
+    Jobs are executed one by one in the order of submitting. A job function gets the job as the first argument
+    and should pass job.cancel_event to the scraper, so all its waits are interrupted when the job is cancelled.
+    """
+
+    def __init__(self, on_state_change: Callable[[BrowserJob], None] | None = None):
+        super().__init__(name='browser-worker', daemon=True)
+        self.on_state_change = on_state_change
+        self.current_job: BrowserJob | None = None
+
+        self._queue: queue.Queue[BrowserJob | None] = queue.Queue()
+        self._queued_jobs: list[BrowserJob] = []
+        self._lock = threading.Lock()
+
+    def submit(self, name: str, func: Callable[..., Any], *args, **kwargs) -> BrowserJob:
+        job = BrowserJob(name=name, func=func, args=args, kwargs=kwargs)
+        with self._lock:
+            self._queued_jobs.append(job)
+        self._set_state(job, JobState.QUEUED)
+        self._queue.put(job)
+        return job
+
+    def get_active_jobs(self) -> list[BrowserJob]:
+        with self._lock:
+            jobs = list(self._queued_jobs)
+            if self.current_job:
+                jobs.insert(0, self.current_job)
+        return [job for job in jobs if job.is_active]
+
+    def cancel(self, job: BrowserJob) -> None:
+        if not job.is_active:
+            return
+
+        # The state is changed before the event is set, so the worker can't finish the job before it
+        self._set_state(job, JobState.CANCELLING)
+        job.cancel_event.set()
+
+    def cancel_all(self, name: str | None = None) -> None:
+        for job in self.get_active_jobs():
+            if name is None or job.name == name:
+                self.cancel(job)
+
+    def stop(self) -> None:
+        self.cancel_all()
+        self._queue.put(None)
+
+    def run(self) -> None:
+        while True:
+            job = self._queue.get()
+            if job is None:
+                return
+
+            with self._lock:
+                self._queued_jobs.remove(job)
+                self.current_job = job
+
+            try:
+                self._run_job(job)
+            finally:
+                with self._lock:
+                    self.current_job = None
+
+    def _run_job(self, job: BrowserJob) -> None:
+        # The future is cancelled when the awaiting coroutine is cancelled
+        if job.cancel_event.is_set() or not job.future.set_running_or_notify_cancel():
+            self._set_state(job, JobState.CANCELLED)
+            if not job.future.cancelled():
+                job.future.set_exception(JobCancelled(f'Job "{job.name}" is cancelled before start'))
+            return
+
+        self._set_state(job, JobState.RUNNING)
+        system_logger.info(f'Job "{job.name}" is started')
+
+        try:
+            result = job.func(job, *job.args, **job.kwargs)
+        except JobCancelled as e:
+            system_logger.info(f'Job "{job.name}" is cancelled')
+            self._set_state(job, JobState.CANCELLED)
+            job.future.set_exception(e)
+        except BaseException as e:
+            # SystemExit of the job is passed to the caller too, the worker thread stays alive for the next jobs
+            system_logger.error(f'Job "{job.name}" is failed: {e!r}', exc_info=True)
+            self._set_state(job, JobState.FAILED)
+            job.future.set_exception(e)
+        else:
+            system_logger.info(f'Job "{job.name}" is done')
+            self._set_state(job, JobState.DONE)
+            job.future.set_result(result)
+
+    def _set_state(self, job: BrowserJob, state: JobState) -> None:
+        with self._lock:
+            if not job.is_active:
+                return
+            # A job which is cancelled before start is still shown as cancelling until it stops
+            if job.state == JobState.CANCELLING and state == JobState.RUNNING:
+                return
+            job.state = state
+
+        if self.on_state_change:
+            self.on_state_change(job)
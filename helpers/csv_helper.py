@@ -1,5 +1,6 @@
 import csv
 import dataclasses
+import os
 from dataclasses import asdict
 from enum import Enum
 
@@ -51,7 +52,9 @@ def push_data_to_csv(rows: list[Listing],
 
     fieldnames = [f.name for f in dataclasses.fields(rows[0])]
 
-    with open(file_path, mode="w", newline="", encoding="utf-8") as file:
+    # File is replaced atomically, so publishing never reads a partially written file
+    tmp_file_path = f'{file_path}.part'
+    with open(tmp_file_path, mode="w", newline="", encoding="utf-8") as file:
         writer = csv.DictWriter(file, fieldnames=fieldnames)
         writer.writeheader()
         i = 0
@@ -70,6 +73,7 @@ def push_data_to_csv(rows: list[Listing],
             i += 1
             user_logger.info(f'Successfully pushed inventory to csv file: '
                              f'{row.year} {row.make} {row.model} (stock #{row.stockno})')
+    os.replace(tmp_file_path, file_path)
 
     user_logger.info(f'Successfully pushed inventory to csv file {i} inventories')
     return i
@@ -1,3 +1,5 @@
+import hashlib
+import json
 import os
 import shutil
 from urllib.parse import urljoin
@@ -6,93 +8,138 @@ import requests
 
 from config import CONFIG_DEALER_LICENSE_ID, CONFIG_DEALER_URL, CONFIG_PHOTOS_BASE_FOLDER, CONFIG
 from helpers.csv_helper import push_data_to_csv
+from helpers.job_coordinator import PhotoFolderLeases, ListingPipeline
 from helpers.model import BodyType, BaseColor, FuelType, Transmission, Listing
 from logger import user_logger
 
 
 def import_data_to_csv(csv_file_name: str = CONFIG['data']['path'],
-                       upload_limit: int = CONFIG['data']['upload_limit']) -> int | None:
+                       upload_limit: int = CONFIG['data']['upload_limit'],
+                       pipeline: ListingPipeline | None = None) -> int | None:
+    """
+    :param pipeline: If set, imported listings are also passed to publishing as soon as their photos are saved
+    """
     user_logger.info('Uploading data from resource - start')
-    data = import_data_from_website_cams(CONFIG_DEALER_LICENSE_ID, upload_limit)
+    try:
+        data = import_data_from_website_cams(CONFIG_DEALER_LICENSE_ID, upload_limit, pipeline)
+    finally:
+        if pipeline:
+            pipeline.close()
     user_logger.info(f'Pushing data to csv({csv_file_name}) file')
     return push_data_to_csv(data, csv_file_name, upload_limit)
 
 
 def import_data_from_website_cams(license_id: str,
-                                  upload_limit: int = CONFIG['data']['upload_limit']) -> list[Listing]:
+                                  upload_limit: int = CONFIG['data']['upload_limit'],
+                                  pipeline: ListingPipeline | None = None) -> list[Listing]:
     result = []
 
-    url = urljoin(CONFIG_DEALER_URL, '/php/get_list.php')
-    params = {
-        "sql": f"select * from vehicles_for_sale where license = {license_id} order by online_posted desc"
-    }
-    headers = {"User-Agent": "Mozilla/5.0"}
-
-    response = requests.get(url, params=params, headers=headers)
-    response.raise_for_status()
+    vehicles = get_vehicles_for_sale(license_id)
 
     clear_photos_base_folder(CONFIG_PHOTOS_BASE_FOLDER)
 
-    vehicles = response.json()
     i = 0
     for item in vehicles:
         if i >= upload_limit:
             break
         try:
-
-            year = int(item['year']) if item.get('year') and str(item['year']).isdigit() else None
-            make = str(item.get('make', '')).strip()
-            model = str(item.get('model', '')).strip()
-
-            mileage = int(item['mileage']) if item.get('mileage') and str(item['mileage']).isdigit() else 0
-
-            price = float(item['sale_price_sel']) if item.get('sale_price_sel') and str(item['sale_price_sel']).replace(
-                '.', '', 1).isdigit() else 0.0
-
-            stockno = item.get('stockno', '').strip()
-
-            photos_folder = CONFIG['photos']['base_folder']
-            if stockno:
-                photos_folder = os.path.join(photos_folder, stockno)
-
-            row = Listing(
-                body_type=BodyType.from_str(str(item.get('body_type') or item.get('product', '')).strip()),
-                year=year,
-                make=make,
-                model=model,
-                exterior_color=BaseColor.from_str(str(item.get('colour', '')).strip()),
-                interior_color=BaseColor.from_str(str(item.get('interior', '')).strip()),
-                mileage=mileage,
-                fuel_type=FuelType.from_str(str(item.get('fuel_type', '')).strip()),
-                transmission=Transmission.from_str(str(item.get('transmission_description')).strip()),
-                price=price,
-                title=f"{year or ''} {make} {model}".strip(),
-                description=str(item.get('online_description', '')).strip(),
-                location=f"{item.get('city', '').strip()}, {item.get('province', '').strip()}",
-                groups=[],
-                stockno=stockno,
-                vin=item.get('vin', '').strip(),
-                photos_folder=photos_folder
-            )
-
-            if stockno:
-                row.photos_names = get_and_save_photos(stockno=stockno,
-                                                       photos_folder=row.photos_folder,
-                                                       license_id=license_id)
-
+            row = get_listing_from_feed_item(item)
         except Exception as e:
             user_logger.error(f'Error to processing inventory (stockno #{item.get("stockno")}): {e}')
         else:
             result.append(row)
             i += 1
 
-            user_logger.info(f'Successfully upload inventory: '
-                             f'{row.year} {row.make} {row.model} (stock #{row.stockno})')
+    # Publishing can check already published listings while photos are being downloaded,
+    # photos of the listings which are published first are downloaded first
+    rows = pipeline.set_feed(result) if pipeline else result
+
+    for row in rows:
+        if row.stockno:
+            row.photos_names = get_and_save_photos(stockno=row.stockno,
+                                                   photos_folder=row.photos_folder,
+                                                   license_id=license_id)
+
+        user_logger.info(f'Successfully upload inventory: '
+                         f'{row.year} {row.make} {row.model} (stock #{row.stockno})')
+        if pipeline:
+            pipeline.put(row)
 
     user_logger.info(f'Successfully uploaded from resource {i} inventories')
     return result
 
 
+def get_listing_from_feed_item(item: dict) -> Listing:
+    """
+    Map a vehicle of the dealer feed to a listing, photos are not downloaded.
+    """
+    year = int(item['year']) if item.get('year') and str(item['year']).isdigit() else None
+    make = str(item.get('make', '')).strip()
+    model = str(item.get('model', '')).strip()
+
+    mileage = int(item['mileage']) if item.get('mileage') and str(item['mileage']).isdigit() else 0
+
+    price = float(item['sale_price_sel']) if item.get('sale_price_sel') and str(item['sale_price_sel']).replace(
+        '.', '', 1).isdigit() else 0.0
+
+    stockno = item.get('stockno', '').strip()
+
+    photos_folder = CONFIG['photos']['base_folder']
+    if stockno:
+        photos_folder = os.path.join(photos_folder, stockno)
+
+    return Listing(
+        body_type=BodyType.from_str(str(item.get('body_type') or item.get('product', '')).strip()),
+        year=year,
+        make=make,
+        model=model,
+        exterior_color=BaseColor.from_str(str(item.get('colour', '')).strip()),
+        interior_color=BaseColor.from_str(str(item.get('interior', '')).strip()),
+        mileage=mileage,
+        fuel_type=FuelType.from_str(str(item.get('fuel_type', '')).strip()),
+        transmission=Transmission.from_str(str(item.get('transmission_description')).strip()),
+        price=price,
+        title=get_vehicle_title(item),
+        description=str(item.get('online_description', '')).strip(),
+        location=f"{item.get('city', '').strip()}, {item.get('province', '').strip()}",
+        groups=[],
+        stockno=stockno,
+        vin=item.get('vin', '').strip(),
+        photos_folder=photos_folder
+    )
+
+
+def get_vehicles_for_sale(license_id: str) -> list[dict]:
+    url = urljoin(CONFIG_DEALER_URL, '/php/get_list.php')
+    params = {
+        "sql": f"select * from vehicles_for_sale where license = {license_id} order by online_posted desc"
+    }
+    headers = {"User-Agent": "Mozilla/5.0"}
+
+    response = requests.get(url, params=params, headers=headers)
+    response.raise_for_status()
+    return response.json()
+
+
+def get_vehicle_title(item: dict) -> str:
+    year = int(item['year']) if item.get('year') and str(item['year']).isdigit() else None
+    make = str(item.get('make', '')).strip()
+    model = str(item.get('model', '')).strip()
+    return f"{year or ''} {make} {model}".strip()
+
+
+def get_feed_summary(license_id: str = CONFIG_DEALER_LICENSE_ID,
+                     upload_limit: int = CONFIG['data']['upload_limit']) -> tuple[str, list[str]]:
+    """
+    Cheap check of the feed without downloading photos.
+
+    :return: Hash of the feed data and titles of the listings in it
+    """
+    vehicles = get_vehicles_for_sale(license_id)[:int(upload_limit)]
+    feed_hash = hashlib.sha256(json.dumps(vehicles, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+    return feed_hash, [get_vehicle_title(item) for item in vehicles]
+
+
 def get_and_save_photos(stockno: str,
                         photos_folder: str,
                         license_id: str) -> list[str]:
@@ -128,8 +175,11 @@ def get_and_save_photos(stockno: str,
         try:
             photo_resp = requests.get(photo_url, headers=headers)
             photo_resp.raise_for_status()
-            with open(save_path, "wb") as f:
+            # Photo is replaced atomically, so publishing never reads a partially written file
+            tmp_save_path = f'{save_path}.part'
+            with open(tmp_save_path, "wb") as f:
                 f.write(photo_resp.content)
+            os.replace(tmp_save_path, save_path)
             photo_names.append(filename)
         except Exception as e:
             print(f"[WARNING] Could not download photo {photo_url}: {e}")
@@ -143,6 +193,9 @@ def clear_photos_base_folder(photos_folder: str):
 
     for entry in os.listdir(photos_folder):
         entry_path = os.path.join(photos_folder, entry)
+        if PhotoFolderLeases.is_leased(entry_path):
+            user_logger.info(f'Photos folder {entry_path} is used by publishing, skip removing')
+            continue
         try:
             if os.path.isfile(entry_path) or os.path.islink(entry_path):
                 os.remove(entry_path)
@@ -0,0 +1,100 @@
+import json
+import os
+import re
+import subprocess
+
+from webdriver_manager.chrome import ChromeDriverManager
+from webdriver_manager.core.os_manager import OperationSystemManager, ChromeType
+
+from config import CONFIG
+from logger import system_logger
+
+DRIVER_CACHE_FILE_PATH = os.path.join('drivers', 'chromedriver.json')
+
+
+def resolve_chromedriver_path(cache_file_path: str | None = None) -> str:
+    """
+    Return path to a chromedriver binary which matches the installed Chrome.
+
+    The resolved driver is remembered in a small json cache, so on the next launches the driver
+    is validated offline (driver file exists and its major version equals installed Chrome major version)
+    and the network check of ChromeDriverManager is skipped.
+
+    :param cache_file_path: Path to json file with the cached driver info
+    :return: Path to chromedriver binary
+    """
+
+    cache_file_path = cache_file_path or CONFIG['scraper'].get('driver', {}).get('cache_file', DRIVER_CACHE_FILE_PATH)
+
+    chrome_version = get_installed_chrome_version()
+    cache = load_driver_cache(cache_file_path)
+
+    if is_driver_cache_valid(cache, chrome_version):
+        system_logger.debug(f'Use cached chromedriver {cache["path"]} (Chrome {chrome_version})')
+        return cache['path']
+
+    system_logger.info(f'Cached chromedriver is missing or outdated (Chrome {chrome_version}), resolve it online')
+    driver_path = ChromeDriverManager().install()
+
+    save_driver_cache(cache_file_path, {
+        'path': driver_path,
+        'driver_version': get_chromedriver_version(driver_path),
+        'chrome_version': chrome_version,
+    })
+
+    return driver_path
+
+
+def is_driver_cache_valid(cache: dict, chrome_version: str | None) -> bool:
+    driver_path = cache.get('path')
+    if not driver_path or not os.path.isfile(driver_path):
+        return False
+
+    # Chrome version can't be detected, so trust to the cache and don't go to the network each launch
+    if not chrome_version:
+        return True
+
+    driver_version = cache.get('driver_version') or get_chromedriver_version(driver_path)
+    return get_major_version(driver_version) == get_major_version(chrome_version)
+
+
+def get_installed_chrome_version() -> str | None:
+    return OperationSystemManager().get_browser_version_from_os(ChromeType.GOOGLE)
+
+
+def get_chromedriver_version(driver_path: str) -> str | None:
+    try:
+        output = subprocess.run([driver_path, '--version'], capture_output=True, text=True, timeout=10).stdout
+    except (OSError, subprocess.SubprocessError) as e:
+        system_logger.warning(f'Cant get chromedriver version ({driver_path}): {e}')
+        return None
+
+    match = re.search(r'\d+(\.\d+)+', output or '')
+    return match.group() if match else None
+
+
+def get_major_version(version: str | None) -> str | None:
+    if not version:
+        return None
+    return version.split('.', 1)[0]
+
+
+def load_driver_cache(cache_file_path: str) -> dict:
+    if not os.path.exists(cache_file_path):
+        return {}
+
+    try:
+        with open(cache_file_path, 'r', encoding='utf-8') as f:
+            return json.load(f) or {}
+    except (OSError, ValueError) as e:
+        system_logger.warning(f'Cant read chromedriver cache ({cache_file_path}): {e}')
+        return {}
+
+
+def save_driver_cache(cache_file_path: str, cache: dict) -> None:
+    folder = os.path.dirname(cache_file_path)
+    if folder:
+        os.makedirs(folder, exist_ok=True)
+
+    with open(cache_file_path, 'w', encoding='utf-8') as f:
+        json.dump(cache, f, indent=2)
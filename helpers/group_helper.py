@@ -0,0 +1,140 @@
+import dataclasses
+import functools
+import json
+import os
+import re
+import threading
+import time
+
+from selenium.common.exceptions import WebDriverException
+from selenium.webdriver.common.by import By
+from selenium.webdriver.remote.webelement import WebElement
+
+from config import CONFIG
+from logger import system_logger
+
+
+@dataclasses.dataclass
+class ResolvedGroup:
+    # Name of the group exactly as Facebook shows it
+    label: str
+    # Id from the link of the group, if the entry has it
+    group_id: str | None = None
+    resolved_at: float = dataclasses.field(default_factory=time.time)
+
+
+class GroupCache:
+    """
+    Group names of the settings resolved to the groups as Facebook shows them.
+
+    A group is resolved once by searching it by the name, then its entry is found directly by the exact label.
+    The resolved group is invalidated after the TTL or when its entry isn't found by the label.
+    """
+
+    def __init__(self, file_path: str, ttl_hours: float):
+        self.file_path = file_path
+        self.ttl = ttl_hours * 3600
+        self._groups: dict[str, ResolvedGroup] | None = None
+        self._lock = threading.Lock()
+
+    def get(self, name: str) -> ResolvedGroup | None:
+        with self._lock:
+            group = self._get_groups().get(self._key(name))
+        if group and time.time() - group.resolved_at > self.ttl:
+            self.invalidate(name)
+            return None
+        return group
+
+    def put(self, name: str, label: str, group_id: str | None = None) -> None:
+        with self._lock:
+            groups = self._get_groups()
+            group = groups.get(self._key(name))
+            if group and group.label == label and group.group_id == group_id:
+                return
+            groups[self._key(name)] = ResolvedGroup(label=label, group_id=group_id)
+            self._save()
+        system_logger.info(f'Group "{name}" is resolved to "{label}" (id {group_id})')
+
+    def invalidate(self, name: str) -> None:
+        with self._lock:
+            if self._get_groups().pop(self._key(name), None):
+                self._save()
+                system_logger.info(f'Resolved group "{name}" is invalidated')
+
+    def _get_groups(self) -> dict[str, ResolvedGroup]:
+        if self._groups is None:
+            self._groups = {}
+            try:
+                with open(self.file_path, encoding='utf-8') as f:
+                    self._groups = {key: ResolvedGroup(**value) for key, value in json.load(f).items()}
+            except FileNotFoundError:
+                pass
+            except (ValueError, TypeError) as e:
+                system_logger.warning(f'Groups cache {self.file_path} is broken, it is reset: {e}')
+        return self._groups
+
+    def _save(self) -> None:
+        if os.path.dirname(self.file_path):
+            os.makedirs(os.path.dirname(self.file_path), exist_ok=True)
+        tmp_file_path = f'{self.file_path}.part'
+        with open(tmp_file_path, 'w', encoding='utf-8') as f:
+            json.dump({key: dataclasses.asdict(group) for key, group in self._groups.items()}, f,
+                      ensure_ascii=False, indent=2)
+        os.replace(tmp_file_path, self.file_path)
+
+    @staticmethod
+    def _key(name: str) -> str:
+        return ' '.join(name.split()).lower()
+
+
+group_cache = GroupCache(file_path=CONFIG['groups']['cache_path'], ttl_hours=CONFIG['groups']['cache_ttl_hours'])
+
+
+@functools.lru_cache(maxsize=8)
+def parse_group_names(value: str | None) -> tuple[str, ...]:
+    # Groups are separated by ";" in the settings
+    if not value:
+        return ()
+    return tuple(name.strip() for name in value.split(';') if name.strip())
+
+
+def get_group_id(element: WebElement) -> str | None:
+    try:
+        # Only the link around the entry, links of the neighbour entries belong to other groups
+        links = element.find_elements(By.XPATH, './ancestor-or-self::a[contains(@href, "/groups/")]')
+        for link in links:
+            match = re.search(r'/groups/([^/?#]+)', link.get_attribute('href') or '')
+            if match:
+                return match.group(1)
+    except WebDriverException:
+        pass
+    return None
+
+
+def match_group_element(group_name: str, elements: list[WebElement]) -> WebElement | None:
+    """
+    Find the entry of the group among the entries which are read from the page.
+    The exact label of the resolved group is tried first, then the group is searched by the name and resolved.
+    """
+    labels = []
+    for element in elements:
+        try:
+            labels.append((element, ' '.join(element.text.split())))
+        except WebDriverException:
+            continue
+
+    resolved = group_cache.get(group_name)
+    if resolved:
+        for element, label in labels:
+            if label == resolved.label:
+                return element
+
+    name = ' '.join(group_name.split()).lower()
+    for element, label in labels:
+        if name in label.lower():
+            group_cache.put(group_name, label=label, group_id=get_group_id(element))
+            return element
+
+    if resolved:
+        group_cache.invalidate(group_name)
+    return None
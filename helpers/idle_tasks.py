@@ -0,0 +1,93 @@
+import dataclasses
+import heapq
+import itertools
+import time
+from typing import Any, Callable
+
+from helpers.scraper import Scraper, Deadline, DeadlineExceeded, ScraperInterrupted, CircuitBreakerOpen
+from logger import system_logger
+
+
+@dataclasses.dataclass(order=True)
+class IdleTask:
+    priority: int
+    order: int
+    name: str = dataclasses.field(compare=False)
+    func: Callable[..., Any] = dataclasses.field(compare=False)
+    args: tuple = dataclasses.field(default=(), compare=False)
+    kwargs: dict = dataclasses.field(default_factory=dict, compare=False)
+    # Called after the task is interrupted by the end of the idle window, e.g. to close opened dialogs
+    on_interrupt: Callable[[], Any] | None = dataclasses.field(default=None, compare=False)
+
+
+class IdleTaskScheduler:
+    """
+    Runs low-priority tasks in the pause between listings.
+
+    Tasks are run by priority (lower value first) while the pause lasts, every task is limited by the time
+    which is left till the end of the pause, and the rest of the pause is slept.
+    So the pause has the same length as without tasks, the tasks only use it.
+    Time for on_interrupt of a task is reserved at the end of the pause.
+    """
+
+    def __init__(self, min_task_time: float = 30.0, interrupt_time: float = 15.0):
+        """
+        :param min_task_time: A task isn't started if less time than this is left in the pause
+        :param interrupt_time: Time which is reserved for on_interrupt of the task
+        """
+        self.min_task_time = min_task_time
+        self.interrupt_time = interrupt_time
+        self._tasks: list[IdleTask] = []
+        self._counter = itertools.count()
+
+    def add(self, name: str, func: Callable[..., Any], *args, priority: int = 0,
+            on_interrupt: Callable[[], Any] | None = None, **kwargs) -> None:
+        heapq.heappush(self._tasks, IdleTask(priority=priority, order=next(self._counter), name=name, func=func,
+                                             args=args, kwargs=kwargs, on_interrupt=on_interrupt))
+
+    def clear(self) -> None:
+        self._tasks.clear()
+
+    def __len__(self) -> int:
+        return len(self._tasks)
+
+    def run(self, scraper: Scraper, seconds: float) -> None:
+        """
+        Run tasks for the given seconds and sleep the rest of the time.
+        """
+        finish_at = time.monotonic() + seconds
+
+        while self._tasks:
+            reserved_time = self.interrupt_time if self._tasks[0].on_interrupt else 0.0
+            remaining = finish_at - time.monotonic() - reserved_time
+            if remaining < self.min_task_time:
+                break
+
+            task = heapq.heappop(self._tasks)
+            started_at = time.monotonic()
+            try:
+                with scraper.deadline_scope(Deadline(remaining, name=f'idle task {task.name}')):
+                    task.func(*task.args, **task.kwargs)
+            except DeadlineExceeded as e:
+                system_logger.info(f'Idle task "{task.name}" is interrupted by the end of the pause: {e}')
+                if task.on_interrupt:
+                    self._run_on_interrupt(scraper=scraper, task=task, seconds=finish_at - time.monotonic())
+                break
+            except (ScraperInterrupted, CircuitBreakerOpen):
+                # Cancellation of the job and changed markup of the site stop the whole run
+                raise
+            except Exception as e:
+                system_logger.warning(f'Idle task "{task.name}" is failed: {e}', exc_info=True)
+            else:
+                system_logger.debug('Idle task "%s" is done in %.1fs', task.name, time.monotonic() - started_at)
+
+        scraper.sleep(max(finish_at - time.monotonic(), 0))
+
+    @staticmethod
+    def _run_on_interrupt(scraper: Scraper, task: IdleTask, seconds: float) -> None:
+        # Deadline of 0 seconds is no deadline
+        with scraper.deadline_scope(Deadline(max(seconds, 0.001), name=f'interrupt of idle task {task.name}')):
+            try:
+                task.on_interrupt()
+            except DeadlineExceeded as e:
+                system_logger.warning(f'Idle task "{task.name}" is not cleaned up till the end of the pause: {e}')
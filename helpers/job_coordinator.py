@@ -0,0 +1,199 @@
+import asyncio
+import os
+import queue
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from typing import Any, Awaitable, Callable, Iterator
+
+from helpers.model import Listing
+from helpers.scraper import JobCancelled
+from logger import system_logger
+
+
+class PhotoFolderLeases:
+    """
+    Folders with photos which are used by the running publishing.
+    Import doesn't remove leased folders, so photos are never deleted while they are being uploaded.
+    """
+
+    _leases: Counter[str] = Counter()
+    _lock = threading.Lock()
+
+    @classmethod
+    @contextmanager
+    def lease(cls, *folders: str):
+        folders = cls.acquire(*folders)
+        try:
+            yield
+        finally:
+            cls.release(*folders)
+
+    @classmethod
+    def acquire(cls, *folders: str) -> list[str]:
+        folders = [cls._normalize(folder) for folder in folders if folder]
+        with cls._lock:
+            cls._leases.update(folders)
+        return folders
+
+    @classmethod
+    def release(cls, *folders: str) -> None:
+        folders = [cls._normalize(folder) for folder in folders if folder]
+        with cls._lock:
+            cls._leases.subtract(folders)
+            cls._leases += Counter()  # drop folders which are not leased anymore
+
+    @classmethod
+    def is_leased(cls, folder: str) -> bool:
+        with cls._lock:
+            return cls._leases[cls._normalize(folder)] > 0
+
+    @staticmethod
+    def _normalize(folder: str) -> str:
+        return os.path.normcase(os.path.abspath(folder))
+
+
+class ListingPipeline:
+    """
+    Queue of imported listings between the import (producer) and publishing (consumer).
+
+    The import sets the feed first - all listings without photos, so publishing can remove outdated listings
+    while photos are being downloaded. Then every listing is put to the queue as soon as its photos are saved.
+    Photo folders of the feed are leased till publishing releases the pipeline.
+    If the order is set, listings are imported and published by it, e.g. the most important first.
+
+    The queue isn't bounded: publishing pauses for up to an hour between listings, and the import
+    must not wait for it. Listings only hold the names of the photos which are already saved.
+    """
+
+    _END = object()
+    _POLL_INTERVAL = 0.5
+
+    def __init__(self, order: Callable[[list[Listing]], list[Listing]] | None = None):
+        self._order = order
+        self._queue: queue.Queue = queue.Queue()
+        self._feed: list[Listing] | None = None
+        self._leased_folders: list[str] = []
+        self._feed_ready = threading.Event()
+        self._closed = threading.Event()
+        self._released = threading.Event()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_listings(cls, listings: list[Listing],
+                      order: Callable[[list[Listing]], list[Listing]] | None = None) -> 'ListingPipeline':
+        pipeline = cls(order=order)
+        for listing in pipeline.set_feed(listings):
+            pipeline.put(listing)
+        pipeline.close()
+        return pipeline
+
+    def set_feed(self, listings: list[Listing]) -> list[Listing]:
+        """
+        :return: Listings in the order in which they should be put to the queue
+        """
+        listings = self._order(listings) if self._order else list(listings)
+        with self._lock:
+            if not self._released.is_set():
+                self._leased_folders = PhotoFolderLeases.acquire(*(listing.photos_folder for listing in listings))
+            self._feed = listings
+        self._feed_ready.set()
+        return listings
+
+    def put(self, listing: Listing) -> bool:
+        """
+        Put the listing to the queue, it never waits for publishing.
+
+        :return: False if publishing doesn't consume listings anymore
+        """
+        return self._put(listing)
+
+    def close(self) -> None:
+        self._closed.set()
+        self._put(self._END)
+
+    def get_feed(self, cancel_event: threading.Event | None = None) -> list[Listing]:
+        while not self._feed_ready.wait(self._POLL_INTERVAL):
+            self._check_cancelled(cancel_event)
+            if self._closed.is_set() and not self._feed_ready.is_set():
+                raise RuntimeError('Import is finished without data')
+        return self._feed
+
+    def iter_listings(self, cancel_event: threading.Event | None = None) -> Iterator[Listing]:
+        while True:
+            try:
+                listing = self._queue.get(timeout=self._POLL_INTERVAL)
+            except queue.Empty:
+                self._check_cancelled(cancel_event)
+                continue
+
+            if listing is self._END:
+                return
+            yield listing
+
+    def release(self) -> None:
+        with self._lock:
+            self._released.set()
+            leased_folders, self._leased_folders = self._leased_folders, []
+        PhotoFolderLeases.release(*leased_folders)
+
+    def _put(self, item: Any) -> bool:
+        if self._released.is_set():
+            return False
+        self._queue.put(item)
+        return True
+
+    @staticmethod
+    def _check_cancelled(cancel_event: threading.Event | None) -> None:
+        if cancel_event and cancel_event.is_set():
+            raise JobCancelled('Job is cancelled')
+
+
+class JobCoordinator:
+    """
+    Merges overlapping requests for import and publishing which come from the schedule and from the buttons.
+
+    A request while the same job is in progress joins it and gets its result instead of starting it again.
+    Publishing waits for the import in progress, so it always reads the complete data.
+    All methods should be called from the event loop.
+    """
+
+    def __init__(self):
+        self._tasks: dict[str, asyncio.Task] = {}
+
+    def is_running(self, name: str) -> bool:
+        task = self._tasks.get(name)
+        return task is not None and not task.done()
+
+    async def run_import(self, func: Callable[..., Any], *args) -> Any:
+        return await self._run_single_flight('import', lambda: asyncio.to_thread(func, *args))
+
+    async def run_publish(self, run: Callable[[], Awaitable[Any]], wait_for_import: bool = True) -> Any:
+        """
+        :param wait_for_import: False if publishing consumes the import in progress by ListingPipeline
+        """
+
+        async def wait_for_import_and_run():
+            import_task = self._tasks.get('import')
+            if wait_for_import and import_task and not import_task.done():
+                system_logger.info('Publishing waits for the import in progress')
+                await asyncio.wait([import_task])
+            return await run()
+
+        return await self._run_single_flight('publish', wait_for_import_and_run)
+
+    def cancel(self, name: str) -> None:
+        task = self._tasks.get(name)
+        if task and not task.done():
+            task.cancel()
+
+    async def _run_single_flight(self, name: str, run: Callable[[], Awaitable[Any]]) -> Any:
+        task = self._tasks.get(name)
+        if task and not task.done():
+            system_logger.info(f'Job "{name}" is already in progress, join it')
+        else:
+            task = asyncio.create_task(run())
+            self._tasks[name] = task
+
+        # Cancellation of one of the waiting callers doesn't cancel the job for the others
+        return await asyncio.shield(task)
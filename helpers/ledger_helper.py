@@ -0,0 +1,172 @@
+import datetime
+import os
+import sqlite3
+import threading
+import unicodedata
+from typing import Iterable
+
+from config import CONFIG
+
+LEDGER_SCHEMA = """
+CREATE TABLE IF NOT EXISTS publications (
+    title_key TEXT PRIMARY KEY,
+    title TEXT NOT NULL,
+    stockno TEXT,
+    price REAL,
+    mileage INTEGER,
+    published_date TEXT,
+    failed_at TEXT,
+    failure_reason TEXT,
+    updated_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS state (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+
+class PublicationLedger:
+    """
+    Local record of listings published on the marketplace: when each listing was published and when
+    publishing of it failed last time. Listings are identified by the title, as on the selling page.
+
+    It is used to decide when the next run is useful without opening the marketplace.
+    """
+
+    def __init__(self, file_path: str = CONFIG['ledger']['path']):
+        self.file_path = file_path
+        if os.path.dirname(file_path):
+            os.makedirs(os.path.dirname(file_path), exist_ok=True)
+
+        # The ledger is used by the browser worker and the event loop
+        self._connection = sqlite3.connect(file_path, check_same_thread=False)
+        self._connection.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        with self._lock, self._connection:
+            self._connection.executescript(LEDGER_SCHEMA)
+            self._migrate()
+
+    @staticmethod
+    def title_key(title: str) -> str:
+        # The same normalization as compare_title of listing_helper
+        return ''.join(unicodedata.normalize('NFKD', title or '').split()).lower()
+
+    def record_published(self, title: str, stockno: str = '', price: float | None = None,
+                         published_date: datetime.date | None = None, mileage: int | None = None) -> None:
+        published_date = published_date or datetime.date.today()
+        self._execute(
+            'INSERT INTO publications (title_key, title, stockno, price, mileage, published_date, updated_at) '
+            'VALUES (?, ?, ?, ?, ?, ?, ?) '
+            'ON CONFLICT(title_key) DO UPDATE SET title = excluded.title, stockno = excluded.stockno, '
+            'price = excluded.price, mileage = excluded.mileage, published_date = excluded.published_date, '
+            'failed_at = NULL, failure_reason = NULL, updated_at = excluded.updated_at',
+            (self.title_key(title), title, stockno, price, mileage, published_date.isoformat(), self._now()))
+
+    def record_seen(self, title: str, published_date: datetime.date, price: float | None = None) -> None:
+        """
+        Record the listing which is found on the selling page.
+        """
+        self._execute(
+            'INSERT INTO publications (title_key, title, price, published_date, updated_at) '
+            'VALUES (?, ?, ?, ?, ?) '
+            'ON CONFLICT(title_key) DO UPDATE SET price = excluded.price, '
+            'published_date = excluded.published_date, updated_at = excluded.updated_at',
+            (self.title_key(title), title, price, published_date.isoformat(), self._now()))
+
+    def record_failed(self, title: str, reason: str, stockno: str = '') -> None:
+        self._execute(
+            'INSERT INTO publications (title_key, title, stockno, failed_at, failure_reason, updated_at) '
+            'VALUES (?, ?, ?, ?, ?, ?) '
+            'ON CONFLICT(title_key) DO UPDATE SET failed_at = excluded.failed_at, '
+            'failure_reason = excluded.failure_reason, updated_at = excluded.updated_at',
+            (self.title_key(title), title, stockno, self._now(), reason, self._now()))
+
+    def record_removed(self, title: str) -> None:
+        self._execute('UPDATE publications SET published_date = NULL, updated_at = ? WHERE title_key = ?',
+                      (self._now(), self.title_key(title)))
+
+    def get_due_items(self, titles: Iterable[str], lifetime_days: float, retry_interval: datetime.timedelta,
+                      limit: int | None = None) -> list[tuple[str, datetime.datetime, str]]:
+        """
+        Return when every listing needs the next run, the earliest first.
+
+        - A listing of the feed which is published is due when it expires.
+        - A listing of the feed which isn't published is due now, or after the retry interval if it failed.
+        - A published listing which isn't in the feed anymore is due now, it should be removed.
+
+        :param titles: Titles of the listings in the feed
+        :return: (title, due time, reason)
+        """
+        now = datetime.datetime.now()
+        rows = {row['title_key']: row for row in self._query('SELECT * FROM publications')}
+
+        due_items = []
+        feed_keys = set()
+        for title in titles:
+            key = self.title_key(title)
+            feed_keys.add(key)
+            due_at, reason = self._get_due(rows.get(key), now, lifetime_days, retry_interval)
+            due_items.append((title, due_at, reason))
+
+        for key, row in rows.items():
+            if key not in feed_keys and row['published_date']:
+                due_items.append((row['title'], now, 'not in feed'))
+
+        due_items.sort(key=lambda item: item[1])
+        return due_items[:limit] if limit else due_items
+
+    def get_due(self, title: str, lifetime_days: float,
+                retry_interval: datetime.timedelta) -> tuple[datetime.datetime, str]:
+        """
+        Return when the listing of the feed needs the next run and why.
+        """
+        rows = self._query('SELECT * FROM publications WHERE title_key = ?', (self.title_key(title),))
+        return self._get_due(rows[0] if rows else None, datetime.datetime.now(), lifetime_days, retry_interval)
+
+    def get_price(self, title: str) -> float | None:
+        rows = self._query('SELECT price FROM publications WHERE title_key = ? AND published_date IS NOT NULL',
+                           (self.title_key(title),))
+        return rows[0]['price'] if rows else None
+
+    def get_record(self, title: str) -> sqlite3.Row | None:
+        rows = self._query('SELECT * FROM publications WHERE title_key = ?', (self.title_key(title),))
+        return rows[0] if rows else None
+
+    def get_state(self, key: str, default: str | None = None) -> str | None:
+        rows = self._query('SELECT value FROM state WHERE key = ?', (key,))
+        return rows[0]['value'] if rows else default
+
+    def set_state(self, key: str, value: str) -> None:
+        self._execute('INSERT INTO state (key, value) VALUES (?, ?) '
+                      'ON CONFLICT(key) DO UPDATE SET value = excluded.value', (key, value))
+
+    def _migrate(self) -> None:
+        # Columns which are added after the ledger was created
+        columns = {row['name'] for row in self._connection.execute('PRAGMA table_info(publications)')}
+        if 'mileage' not in columns:
+            self._connection.execute('ALTER TABLE publications ADD COLUMN mileage INTEGER')
+
+    def _execute(self, sql: str, parameters: tuple = ()) -> None:
+        with self._lock, self._connection:
+            self._connection.execute(sql, parameters)
+
+    def _query(self, sql: str, parameters: tuple = ()) -> list[sqlite3.Row]:
+        with self._lock:
+            return self._connection.execute(sql, parameters).fetchall()
+
+    @staticmethod
+    def _get_due(row: sqlite3.Row | None, now: datetime.datetime, lifetime_days: float,
+                 retry_interval: datetime.timedelta) -> tuple[datetime.datetime, str]:
+        if row and row['published_date']:
+            published_date = datetime.date.fromisoformat(row['published_date'])
+            due_at = datetime.datetime.combine(published_date, datetime.time()) + datetime.timedelta(days=lifetime_days)
+            return due_at, 'expires'
+        if row and row['failed_at']:
+            due_at = datetime.datetime.fromisoformat(row['failed_at']) + retry_interval
+            return due_at, f'retry after failure: {row["failure_reason"]}'
+        return now, 'not published'
+
+    @staticmethod
+    def _now() -> str:
+        return datetime.datetime.now().isoformat(timespec='seconds')
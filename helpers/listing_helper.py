@@ -1,7 +1,13 @@
+import dataclasses
+import functools
+import inspect
+import os
 import re
+import time
 import unicodedata
 from collections import deque
 from datetime import datetime
+from typing import Callable, Iterable
 
 from selenium.webdriver import Keys
 from selenium.webdriver.common.by import By
@@ -9,9 +15,15 @@ from selenium.webdriver.remote.webelement import WebElement
 from selenium.webdriver.support import expected_conditions as EC
 
 from config import CONFIG
+from helpers.group_helper import group_cache, match_group_element, parse_group_names
+from helpers.idle_tasks import IdleTaskScheduler
+from helpers.ledger_helper import PublicationLedger
 from helpers.model import Listing, PublishedListing, FuelType
-from helpers.scraper import Scraper
-from logger import system_logger
+from helpers.progress import RunProgress
+from helpers.publish_queue import PublishQueue, PublishState
+from helpers.tracing import tracer, SPAN_LISTING
+from helpers.scraper import Scraper, ScraperMemoryWatchdog, Deadline, DeadlineExceeded
+from logger import system_logger, user_logger
 
 PAGES = {
     'selling': 'https://facebook.com/marketplace/you/selling',
@@ -19,6 +31,56 @@ PAGES = {
     'create_new_listing_vehicle': 'https://www.facebook.com/marketplace/create/vehicle'
 }
 
+# Page types for counting of missed selectors by circuit breaker of the scraper
+PAGE_TYPE_SELLING = 'selling list'
+PAGE_TYPE_CREATE_FORM = 'create form'
+PAGE_TYPE_SHARE_DIALOG = 'share dialog'
+
+# Previews of the photos which are attached to the create form, and indicators of uploads in progress
+PHOTO_THUMBNAIL_SELECTOR = 'form img[src^="blob:"], div[role="main"] img[src^="blob:"]'
+PHOTO_UPLOAD_PROGRESS_SELECTOR = 'div[role="main"] [role="progressbar"]'
+
+# Signatures of image files which are accepted by the photos input of the listing form
+IMAGE_SIGNATURES = (b'\xff\xd8\xff', b'\x89PNG\r\n\x1a\n', b'GIF87a', b'GIF89a', b'BM')
+
+
+@dataclasses.dataclass
+class ListingsPlan:
+    """
+    Actions of a run which are planned by one scan of the selling page.
+    Removals are executed while the list is loaded, then only the listings which aren't actual are created.
+    """
+    # Published listings to remove and why
+    removals: list[tuple[PublishedListing, str]] = dataclasses.field(default_factory=list)
+    # Normalized titles of published listings which stay published, they are not opened again
+    actual_titles: set[str] = dataclasses.field(default_factory=set)
+    # Removals of listings which are published again, by normalized title.
+    # A limited run removes them right before publishing, so listings beyond the limit stay on the marketplace
+    deferred_removals: dict[str, tuple[PublishedListing, str]] = dataclasses.field(default_factory=dict)
+
+    def is_actual(self, listing: Listing) -> bool:
+        return normalize_title_for_compare(listing.title) in self.actual_titles
+
+
+def on_page_type(page_type: str):
+    """
+    Decorator for functions with 'scraper' argument.
+    Selector misses inside the function are counted by the scraper circuit breaker under the page type.
+    """
+
+    def decorator(func):
+        signature = inspect.signature(func)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            scraper = signature.bind_partial(*args, **kwargs).arguments['scraper']
+            with scraper.page_type_scope(page_type):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
 
 class XPATH:
 
@@ -35,6 +97,20 @@ class XPATH:
     def selling_search_input(cls):
         return f'//input[{cls.translate_eq_expr("search your listings", "@placeholder")}]'
 
+    @classmethod
+    def group_entry(cls, label: str) -> str:
+        # Entry of the group which is found by its exact label, without lowercasing the whole document
+        return f'//span[normalize-space(text()) = {cls.literal(label)}]'
+
+    @classmethod
+    def literal(cls, value: str) -> str:
+        if '"' not in value:
+            return f'"{value}"'
+        if "'" not in value:
+            return f"'{value}'"
+        parts = value.split('"')
+        return 'concat(' + ', \'"\', '.join(f'"{part}"' for part in parts) + ')'
+
     @classmethod
     def translate_expr(cls, str1: str, str2: str = '', str3: str = ''):
         return f'translate({str1}, "ABCDEFGHIJKLMNOPQRSTUVWXYZАБВГҐДЕЄЖЗИІЇЙКЛМНОПРСТУФХЦЧШЩЪЫЬЭЮЯ{str2}", "abcdefghijklmnopqrstuvwxyzабвгґдеєжзиіїйклмнопрстуфхцчшщъыьэюя{str3}")'
@@ -49,98 +125,479 @@ class XPATH:
 
 
 def check_and_update_listings(
-        scraper: Scraper, listings: list[Listing],
+        scraper: Scraper, listings: Iterable[Listing],
         published_listings: list[WebElement] | None = None,
         listings_limit: int | None = None,
-        result: list[Listing] | None = None
+        result: list[Listing] | None = None,
+        memory_watchdog: ScraperMemoryWatchdog | None = None,
+        listing_time_budget: float | None = CONFIG['listing'].get('time_budget'),
+        failures: dict[str, str] | None = None,
+        progress: RunProgress | None = None,
+        total: int | None = None,
+        idle_tasks: IdleTaskScheduler | None = None,
+        ledger: PublicationLedger | None = None,
+        plan: ListingsPlan | None = None,
+        publish_queue: PublishQueue | None = None
 ) -> None:
-    if not listings:
+    """
+    :param listings: Listings to publish, can be an iterator which gives listings while they are being imported
+    :param listings_limit: If set, the run is finished after this count of published listings,
+                           the rest of the listings are left for the next runs
+    :param total: Count of listings, required if listings is an iterator
+    :param idle_tasks: If set, the next listing is prepared in the pause before it
+    :param ledger: If set, published and failed listings are recorded to it
+    :param plan: If set, actual listings are skipped and the others are published without searching for them
+    :param publish_queue: If set, state of every listing is saved to it and listings done by the interrupted run
+                          are skipped
+    """
+    if total is None:
+        total = len(listings)
+    if not total:
         return
 
-    if not result:
+    if progress is None:
+        progress = RunProgress()
+    progress.start(total=total)
+
+    if result is None:
         result = []
 
+    if failures is None:
+        failures = {}
+
     listings_attempts_limit = 2
     listings_counter = 0
-    listings_queue = deque((listing, 0) for listing in listings)
-    while listings_queue:
-        listing, attempts = listings_queue.popleft()
+    listings_iterator = iter(listings)
+    retry_queue = deque()
+    previous_listing_finished_at = None
+    published_listings_cache: dict[str, PublishedListing | None] = {}
+    while True:
+        if listings_limit and listings_counter >= listings_limit:
+            system_logger.info(f'Limit of {listings_limit} published listings is reached, the run is finished')
+            break
+
+        if retry_queue:
+            listing, attempts = retry_queue.popleft()
+        else:
+            listing = next(listings_iterator, None)
+            if listing is None:
+                break
+            attempts = 0
 
         if not listing.price:
+            progress.advance()
             continue
 
-        # Check and remove listing
-        # if it should be removed - remove listing
-        # otherwise continue and don't post it second time
-        published_listing_element = (
-                scraper.find_element(selector=XPATH.selling_listing_container(listing.title),
-                                     by=By.XPATH,
-                                     exit_on_missing_element=False)
-                or find_listing_by_title(scraper=scraper,
-                                         title=listing.title)
-        )
+        deferred_removal = None
+        state = publish_queue.get_state(listing.title) if publish_queue and attempts == 0 else None
+        if state in PublishQueue.FINAL_STATES:
+            system_logger.info(f'Listing {listing.title} is already {state} by the interrupted run, skip it')
+            progress.advance(published=state == PublishState.SHARED, failed=state == PublishState.FAILED)
+            continue
 
-        if published_listing_element:
-            published_listing = get_published_listing(scraper=scraper,
-                                                      published_listing_element=published_listing_element,
-                                                      extended_info=True)
+        # Listing which was interrupted after its form was filled is searched on the selling page
+        if plan and attempts == 0 and state not in (PublishState.PHOTOS_UPLOADED, PublishState.PUBLISHED):
+            if plan.is_actual(listing):
+                progress.advance()
+                continue
+            # Outdated version of the listing is removed by the plan, now or right before publishing
+            deferred_removal = plan.deferred_removals.pop(normalize_title_for_compare(listing.title), None)
+            published_listings_cache[listing.title] = None
+
+        # Listing which can't be published is skipped before the pause and opening the form,
+        # the pause is left for the next listing
+        problems = preflight_listing(listing)
+        if problems:
+            record_listing_failure(listing=listing, reason='; '.join(problems), failures=failures, ledger=ledger,
+                                   publish_queue=publish_queue)
+            user_logger.warning(f'Listing {listing.title} (stock #{listing.stockno}) skipped: {failures[listing.title]}')
+            progress.advance(failed=True)
+            continue
 
-            if (listing.price != published_listing.price
-                    or listing.mileage != published_listing.mileage
-                    or listing.fuel_type != published_listing.fuel_type
-                    or not compare_text(listing.description, published_listing.description)):
-                remove_published_listing(scraper=scraper,
-                                         published_listing=published_listing)
-            else:
+        # Make pause, time of waiting for the next imported listing is a part of it
+        if previous_listing_finished_at is not None:
+            pause = scraper.get_listing_random_delay(elapsed=time.monotonic() - previous_listing_finished_at)
+            with tracer.span('pause before listing', title=listing.title):
+                if idle_tasks:
+                    add_listing_idle_tasks(idle_tasks=idle_tasks,
+                                           scraper=scraper,
+                                           listing=listing,
+                                           published_listings_cache=published_listings_cache)
+                    idle_tasks.run(scraper=scraper, seconds=pause)
+                    idle_tasks.clear()
+                else:
+                    scraper.sleep(pause)
+            previous_listing_finished_at = None
+
+        progress.set_current(listing.title)
+
+        # All waits for the listing are limited by its time budget,
+        # so one broken listing can't eat the entire run
+        deadline = Deadline(listing_time_budget, name=f'listing {listing.title}')
+        try:
+            with (scraper.deadline_scope(deadline),
+                  tracer.span(listing.title, kind=SPAN_LISTING, stockno=listing.stockno, attempt=attempts) as span):
+                if deferred_removal:
+                    published_listing, reason = deferred_removal
+                    remove_planned_listing(scraper=scraper, published_listing=published_listing, reason=reason,
+                                           ledger=ledger, publish_queue=publish_queue)
+                is_published = check_and_publish_listing(listing=listing,
+                                                         scraper=scraper,
+                                                         published_listings_cache=published_listings_cache,
+                                                         ledger=ledger,
+                                                         publish_queue=publish_queue)
+                span.outcome = 'actual' if is_published is None else 'published' if is_published else 'failed'
+        except DeadlineExceeded as e:
+            # Abandoned listing isn't re-queued, the next attempt would most likely take the same time
+            abandon_listing(listing=listing, scraper=scraper, reason=str(e), failures=failures, ledger=ledger,
+                            publish_queue=publish_queue)
+            progress.advance(failed=True)
+        else:
+            # Listing is already published and actual
+            if is_published is None:
+                progress.advance()
                 continue
 
-        # Publishing listing
-        is_published = publish_listing(data=listing, scraper=scraper)
-        if is_published:
-            listings_counter += 1
-            result.append(listing)
-            post_listing_to_groups(listing=listing, scraper=scraper)
+            if is_published:
+                listings_counter += 1
+                result.append(listing)
+                if ledger:
+                    ledger.record_published(title=listing.title, stockno=listing.stockno, price=listing.price,
+                                            mileage=listing.mileage)
+                progress.advance(published=True)
+            elif attempts < listings_attempts_limit:
+                retry_queue.append((listing, attempts + 1))
+            else:
+                record_listing_failure(listing=listing, reason='publishing failed', failures=failures, ledger=ledger,
+                                       publish_queue=publish_queue)
+                progress.advance(failed=True)
+
+        # Check memory of the browser and recycle the tab if it grew too much
+        if memory_watchdog and memory_watchdog.check(scraper=scraper):
+            scraper.go_to_page(PAGES['selling'], skip_if_current=True)
+
+        previous_listing_finished_at = time.monotonic()
+
+    progress.finish()
+
+
+@on_page_type(PAGE_TYPE_SELLING)
+def check_and_publish_listing(scraper: Scraper, listing: Listing,
+                              published_listings_cache: dict[str, PublishedListing | None] | None = None,
+                              ledger: PublicationLedger | None = None,
+                              publish_queue: PublishQueue | None = None) -> bool | None:
+    """
+    Remove outdated published listing and publish it again.
+
+    :param published_listings_cache: Published listings which are read in the pause before the listing
+    :param publish_queue: If set, progress of the listing is saved to it
+    :return: True if listing was published, False if publishing failed,
+             None if listing is already published and actual
+    """
+    state = publish_queue.get_state(listing.title) if publish_queue else None
+
+    # Listing is published by the interrupted run, only sharing to groups is left
+    if state == PublishState.PUBLISHED:
+        share_published_listing(scraper=scraper, listing=listing, publish_queue=publish_queue)
+        return True
+
+    # Check and remove listing
+    # if it should be removed - remove listing
+    # otherwise continue and don't post it second time
+    if published_listings_cache is not None and listing.title in published_listings_cache:
+        published_listing = published_listings_cache.pop(listing.title)
+    else:
+        with tracer.span('find published listing'):
+            published_listing = get_published_listing_by_title(scraper=scraper, title=listing.title)
+
+    if published_listing:
+        if not is_published_listing_actual(listing=listing, published_listing=published_listing):
+            with tracer.span('remove listing'):
+                remove_published_listing(scraper=scraper,
+                                         published_listing=published_listing)
+            if ledger:
+                ledger.record_removed(title=published_listing.title)
         else:
-            if attempts < listings_attempts_limit:
-                listings_queue.appendleft((listing, attempts + 1))
+            if ledger and published_listing.published_date:
+                ledger.record_seen(title=listing.title,
+                                   published_date=published_listing.published_date,
+                                   price=published_listing.price)
+            # The interrupted run published the listing after its form was filled, but didn't record it
+            if state == PublishState.PHOTOS_UPLOADED:
+                share_published_listing(scraper=scraper, listing=listing, publish_queue=publish_queue)
+                return True
+            return None
+
+    # Publishing listing
+    with tracer.span('publish listing') as span:
+        is_published = publish_listing(data=listing, scraper=scraper, publish_queue=publish_queue)
+        span.outcome = 'ok' if is_published else 'failed'
+    if is_published:
+        share_published_listing(scraper=scraper, listing=listing, publish_queue=publish_queue)
+
+    return is_published
+
+
+def share_published_listing(scraper: Scraper, listing: Listing, publish_queue: PublishQueue | None = None) -> None:
+    if publish_queue:
+        publish_queue.set_state(listing, PublishState.PUBLISHED)
+    with tracer.span('share listing'):
+        post_listing_to_groups(listing=listing, scraper=scraper)
+    if publish_queue:
+        publish_queue.set_state(listing, PublishState.SHARED)
+
+
+def is_published_listing_actual(listing: Listing, published_listing: PublishedListing) -> bool:
+    return (listing.price == published_listing.price
+            and listing.mileage == published_listing.mileage
+            and listing.fuel_type == published_listing.fuel_type
+            and compare_text(listing.description, published_listing.description))
+
+
+def abandon_listing(scraper: Scraper, listing: Listing, reason: str, failures: dict[str, str],
+                    ledger: PublicationLedger | None = None, publish_queue: PublishQueue | None = None) -> None:
+    record_listing_failure(listing=listing, reason=reason, failures=failures, ledger=ledger,
+                           publish_queue=publish_queue)
+    system_logger.warning(f'Listing: {listing.title}({listing.vin}) abandoned: {reason}')
+    user_logger.warning(f'Listing {listing.title} (stock #{listing.stockno}) skipped: {reason}')
+    return_to_selling_page(scraper=scraper)
+
+
+def record_listing_failure(listing: Listing, reason: str, failures: dict[str, str],
+                           ledger: PublicationLedger | None = None,
+                           publish_queue: PublishQueue | None = None) -> None:
+    failures[listing.title] = reason
+    if ledger:
+        ledger.record_failed(title=listing.title, reason=reason, stockno=listing.stockno)
+    if publish_queue:
+        publish_queue.set_state(listing, PublishState.FAILED, reason=reason)
+
+
+def return_to_selling_page(scraper: Scraper) -> None:
+    # Close opened dialogs or forms and return to the list of listings
+    scraper.send_key(Keys.ESCAPE)
+    scraper.go_to_page(PAGES['selling'])
+
+
+def add_listing_idle_tasks(idle_tasks: IdleTaskScheduler,
+                           scraper: Scraper,
+                           listing: Listing,
+                           published_listings_cache: dict[str, PublishedListing | None]) -> None:
+    """
+    Prepare the next listing in the pause before it: read its published version from the selling page.
+    """
+
+    def cache_published_listing():
+        published_listings_cache[listing.title] = get_published_listing_by_title(scraper=scraper,
+                                                                                 title=listing.title)
+
+    # Published version is already known if the run is planned
+    if listing.title not in published_listings_cache:
+        idle_tasks.add('published listing', cache_published_listing, priority=10,
+                       on_interrupt=lambda: return_to_selling_page(scraper=scraper))
+
+
+def preflight_listing(listing: Listing) -> list[str]:
+    """
+    Check the listing before opening the listing form. Photos which can't be uploaded are removed from the listing.
+
+    :return: Problems because of which the listing can't be published
+    """
+    problems = []
+
+    listing.photos_names = prepare_listing_photos(listing)
+    if not listing.photos_names:
+        problems.append('no valid photos')
+
+    for field_name in ('year', 'make', 'model'):
+        if not getattr(listing, field_name):
+            problems.append(f'{field_name} is empty')
+
+    return problems
 
-        # Make pause
-        if listings_queue or (listings_limit and listings_counter < listings_limit):
-            scraper.wait_listing_random_time()
+
+def prepare_listing_photos(listing: Listing) -> list[str]:
+    """
+    Return names of listing photos which exist and are images.
+    Photos are read fully, so they are in the OS cache when the browser uploads them.
+    """
+    photos_names = []
+    for photo_name in listing.photos_names or []:
+        photo_name = photo_name.strip()
+        if not photo_name:
+            continue
+
+        photo_path = os.path.join(listing.photos_folder, photo_name)
+        try:
+            with open(photo_path, 'rb') as f:
+                data = f.read()
+        except OSError as e:
+            system_logger.warning(f'Listing: {listing.title}({listing.vin}) photo is skipped: {e}')
+            continue
+
+        if not is_image_data(data):
+            system_logger.warning(f'Listing: {listing.title}({listing.vin}) photo is skipped, '
+                                  f'it is not an image: {photo_path}')
+            continue
+
+        photos_names.append(photo_name)
+
+    return photos_names
+
+
+def is_image_data(data: bytes) -> bool:
+    return (data.startswith(IMAGE_SIGNATURES)
+            or (data[:4] == b'RIFF' and data[8:12] == b'WEBP')
+            or data[4:8] == b'ftyp')  # HEIC/HEIF
 
 
 def check_and_remove_listings(scraper: Scraper,
                               listings: list[Listing],
-                              published_listings: list[PublishedListing] | None = None) -> None:
+                              published_listings: list[PublishedListing] | None = None,
+                              ledger: PublicationLedger | None = None,
+                              listing_filter: Callable[[Listing], bool] | None = None,
+                              publish_queue: PublishQueue | None = None,
+                              listings_limit: int | None = None) -> ListingsPlan:
+    """
+    Plan the run by one scan of the selling page and remove all outdated listings while the list is loaded.
+
+    :param listing_filter: Listings which are not selected for the run are not checked in detail
+    :param publish_queue: Listings which are shared by the interrupted run are not checked in detail
+    :param listings_limit: Limit of the run. If set, listings which are published again are removed
+                           right before publishing, the others stay on the marketplace till their run.
+                           Listings which are not in the feed are removed anyway.
+    :return: Plan for check_and_update_listings
+    """
     if published_listings is None:
-        published_listing_elements = find_all_published_listing_elements(scraper=scraper)
-        published_listings = get_all_published_listings(
-            scraper=scraper,
-            published_listing_elements=published_listing_elements
-        )
+        with tracer.span('scan selling page') as span:
+            published_listing_elements = find_all_published_listing_elements(scraper=scraper)
+            published_listings = get_all_published_listings(
+                scraper=scraper,
+                published_listing_elements=published_listing_elements
+            )
+            span.attributes['listings'] = len(published_listings)
+
+    with tracer.span('plan listings'):
+        plan = plan_listings(scraper=scraper,
+                             listings=listings,
+                             published_listings=published_listings,
+                             listing_filter=listing_filter,
+                             publish_queue=publish_queue)
+
+    if listings_limit:
+        feed_titles = {normalize_title_for_compare(listing.title) for listing in listings}
+        for published_listing, reason in plan.removals:
+            title = normalize_title_for_compare(published_listing.title)
+            if title in feed_titles:
+                plan.deferred_removals[title] = (published_listing, reason)
+        plan.removals = [(published_listing, reason) for published_listing, reason in plan.removals
+                         if normalize_title_for_compare(published_listing.title) not in plan.deferred_removals]
+        if plan.deferred_removals:
+            system_logger.info(f'{len(plan.deferred_removals)} listings are removed right before publishing them')
+
+    removed_listings = set()
+    for published_listing, reason in plan.removals:
+        remove_planned_listing(scraper=scraper, published_listing=published_listing, reason=reason, ledger=ledger,
+                               publish_queue=publish_queue)
+        removed_listings.add(normalize_title_for_compare(published_listing.title))
+
+    if ledger:
+        for published_listing in published_listings:
+            if (published_listing.title and published_listing.published_date
+                    and normalize_title_for_compare(published_listing.title) not in removed_listings):
+                ledger.record_seen(title=published_listing.title,
+                                   published_date=published_listing.published_date,
+                                   price=published_listing.price)
+
+    return plan
+
+
+@on_page_type(PAGE_TYPE_SELLING)
+def remove_planned_listing(scraper: Scraper, published_listing: PublishedListing, reason: str,
+                           ledger: PublicationLedger | None = None,
+                           publish_queue: PublishQueue | None = None) -> None:
+    system_logger.info(f'Remove published listing {published_listing.title}: {reason}')
+    with tracer.span('remove listing', title=published_listing.title):
+        remove_published_listing(scraper=scraper, published_listing=published_listing)
+    if ledger:
+        ledger.record_removed(title=published_listing.title)
+    if publish_queue:
+        publish_queue.reset(published_listing.title)
+
+
+@on_page_type(PAGE_TYPE_SELLING)
+def plan_listings(scraper: Scraper,
+                  listings: list[Listing],
+                  published_listings: list[PublishedListing],
+                  listing_filter: Callable[[Listing], bool] | None = None,
+                  publish_queue: PublishQueue | None = None) -> ListingsPlan:
+    plan = ListingsPlan()
+    listings_by_title = {normalize_title_for_compare(listing.title): listing for listing in listings}
 
     for published_listing in published_listings:
         if (not published_listing.title or
                 not published_listing.published_date):
             continue
 
-        # Check conditions when listing should be removed
+        title = normalize_title_for_compare(published_listing.title)
+        listing = listings_by_title.get(title)
+
+        # Listing isn't in the feed anymore
+        if listing is None:
+            plan.removals.append((published_listing, 'not in feed'))
+            continue
+
+        if (datetime.today().date() - published_listing.published_date).days >= CONFIG['listing']['lifetime']:
+            plan.removals.append((published_listing, 'expired'))
+            continue
 
-        # Try to find listing in database, if not present the listing should be removed
-        # because it is not actual anymore
-        is_not_present = not any(compare_title(published_listing.title, l.title) for l in listings)
+        # Listing isn't refreshed in this run
+        if listing_filter and not listing_filter(listing):
+            plan.actual_titles.add(title)
+            continue
 
-        # Published date condition
-        is_expired = (
-                published_listing.published_date is not None
-                and (datetime.today().date() - published_listing.published_date).days >= CONFIG['listing']['lifetime']
-        )
+        # Price is shown in the list, other fields are read from the listing details
+        if listing.price != published_listing.price:
+            plan.removals.append((published_listing, 'price changed'))
+            continue
+
+        # Listing is just published by the interrupted run
+        if publish_queue and publish_queue.get_state(listing.title) == PublishState.SHARED:
+            plan.actual_titles.add(title)
+            continue
+
+        detailed_listing = get_published_listing_by_title(scraper=scraper, title=published_listing.title)
+        if not detailed_listing:
+            continue
+        if is_published_listing_actual(listing=listing, published_listing=detailed_listing):
+            plan.actual_titles.add(title)
+        else:
+            plan.removals.append((detailed_listing, 'changed'))
+
+    system_logger.info(f'Run plan: {len(plan.removals)} listings to remove, '
+                       f'{len(plan.actual_titles)} listings are actual')
+    return plan
+
+
+@on_page_type(PAGE_TYPE_SELLING)
+def get_published_listing_by_title(scraper: Scraper, title: str) -> PublishedListing | None:
+    published_listing_element = (
+            scraper.find_element(selector=XPATH.selling_listing_container(title),
+                                 by=By.XPATH,
+                                 exit_on_missing_element=False,
+                                 probe=True)
+            or find_listing_by_title(scraper=scraper,
+                                     title=title)
+    )
+    if not published_listing_element:
+        return None
 
-        # Remove the listing if it needed
-        if is_not_present or is_expired:
-            remove_published_listing(scraper=scraper, published_listing=published_listing)
+    return get_published_listing(scraper=scraper,
+                                 published_listing_element=published_listing_element,
+                                 extended_info=True)
 
 
+@on_page_type(PAGE_TYPE_SELLING)
 def find_all_published_listing_elements(scraper: Scraper) -> list[WebElement]:
     # Check the page and if it wrong page try go to correct page
     container_element_selector = "//div[translate(@aria-label, 'ABCDEFGHIJKLMNOPQRSTUVWXYZ', 'abcdefghijklmnopqrstuvwxyz') = 'collection of your marketplace items']"
@@ -167,6 +624,7 @@ def get_all_published_listings(scraper: Scraper,
     return result
 
 
+@on_page_type(PAGE_TYPE_SELLING)
 def get_published_listing(
         scraper: Scraper,
         published_listing_element: WebElement,
@@ -269,7 +727,8 @@ def get_published_listing(
                 description_see_more_element = scraper.find_element(
                     selector=f'{xpath_element_with_info}{xpath_element_description_see_more}',
                     by=By.XPATH,
-                    exit_on_missing_element=False
+                    exit_on_missing_element=False,
+                    probe=True
                 )
                 if description_see_more_element:
                     description_see_more_element.click()
@@ -338,6 +797,7 @@ def get_published_listing(
     return listing
 
 
+@on_page_type(PAGE_TYPE_SELLING)
 def remove_published_listing(
         scraper: Scraper,
         published_listing: PublishedListing
@@ -390,7 +850,10 @@ def remove_published_listing(
     scraper.element_wait_to_be_invisible('div[aria-label="Your Listing"]')
 
 
-def publish_listing(data: Listing, scraper: Scraper):
+@on_page_type(PAGE_TYPE_CREATE_FORM)
+def publish_listing(data: Listing, scraper: Scraper, publish_queue: PublishQueue | None = None):
+    # Steps are traced one after another, the last one ends with the span of publishing
+    tracer.step('open form')
     # Find and click listing create button
     create_listing_button_selector = 'div[aria-label="Marketplace sidebar"] a[aria-label="Create new listing"]'
     create_listing_button = scraper.find_element(selector=create_listing_button_selector,
@@ -411,11 +874,28 @@ def publish_listing(data: Listing, scraper: Scraper):
     else:
         scraper.go_to_page(PAGES['create_new_listing_vehicle'])
 
+    tracer.step('upload photos', photos=len(data.photos_names))
     # Create string that contains all the image paths separated by \n
     images_path = generate_multiple_images_path(data.photos_folder, data.photos_names)
     # Add images to the listing
+    thumbnails_before = len(scraper.find_elements(selector=PHOTO_THUMBNAIL_SELECTOR))
     scraper.input_file_add_files('input[accept="image/*,image/heif,image/heic"]', images_path)
 
+    # Fill the form after the photos are uploaded, ongoing uploads intercept clicks and keep "Next" disabled
+    upload = scraper.wait_for_uploads(files=data.photos_names,
+                                      thumbnail_selector=PHOTO_THUMBNAIL_SELECTOR,
+                                      progress_selector=PHOTO_UPLOAD_PROGRESS_SELECTOR,
+                                      baseline=thumbnails_before)
+    if not upload.accepted:
+        # The form may show previews differently, the form is filled anyway
+        system_logger.warning(f'Listing: {data.title}({data.vin}) Uploads of photos are not detected')
+    elif upload.rejected:
+        user_logger.warning(f'Listing {data.title} (stock #{data.stockno}): '
+                            f'photos are not uploaded: {", ".join(upload.rejected)}')
+    if publish_queue:
+        publish_queue.set_state(data, PublishState.PHOTOS_UPLOADED)
+
+    tracer.step('fill vehicle type')
     if data.vehicle_type:
         element_selector = '//span[text()="Vehicle type"]'
         element = scraper.find_element(selector=element_selector, by=By.XPATH, exit_on_missing_element=False)
@@ -426,6 +906,7 @@ def publish_listing(data: Listing, scraper: Scraper):
             scraper.element_click(selector=f'//span[text()="{str(data.vehicle_type)}"]', by=By.XPATH,
                                   exit_on_missing_element=False, use_cursor=True)
 
+    tracer.step('fill year')
     if data.year:
         scraper.scroll_to_element_by_xpath('//span[text()="Year"]')
         scraper.element_click(selector='//span[text()="Year"]', by=By.XPATH, exit_on_missing_element=False,
@@ -433,6 +914,7 @@ def publish_listing(data: Listing, scraper: Scraper):
         scraper.element_click(selector=f'//span[text()="{str(data.year)}"]', by=By.XPATH, exit_on_missing_element=False,
                               use_cursor=True)
 
+    tracer.step('fill make')
     if data.make:
         scraper.scroll_to_element_by_xpath('//span[text()="Make"]')
         scraper.element_click(selector='//span[text()="Make"]', by=By.XPATH, exit_on_missing_element=False,
@@ -441,6 +923,7 @@ def publish_listing(data: Listing, scraper: Scraper):
             selector=f"//span[contains(translate(text(), 'ABCDEFGHIJKLMNOPQRSTUVWXYZ', 'abcdefghijklmnopqrstuvwxyz'), '{data.make.lower()}')]",
             by=By.XPATH, exit_on_missing_element=False, use_cursor=True)
 
+    tracer.step('fill model')
     if data.model:
         scraper.scroll_to_element_by_xpath('//span[text()="Model"]/following-sibling::input[1]')
         scraper.element_send_keys(selector='//span[text()="Model"]/following-sibling::input[1]',
@@ -448,6 +931,7 @@ def publish_listing(data: Listing, scraper: Scraper):
                                   exit_on_missing_element=False,
                                   text=data.model)
 
+    tracer.step('fill mileage')
     if data.mileage:
         scraper.scroll_to_element_by_xpath('//span[text()="Mileage"]/following-sibling::input[1]')
         scraper.element_send_keys(selector='//span[text()="Mileage"]/following-sibling::input[1]',
@@ -455,6 +939,7 @@ def publish_listing(data: Listing, scraper: Scraper):
                                   exit_on_missing_element=False,
                                   text=str(data.mileage))
 
+    tracer.step('fill body type')
     if data.body_type:
         scraper.scroll_to_element_by_xpath('//span[text()="Body style"]')
         scraper.element_click(selector='//span[text()="Body style"]', by=By.XPATH, exit_on_missing_element=False,
@@ -463,6 +948,7 @@ def publish_listing(data: Listing, scraper: Scraper):
                               exit_on_missing_element=False,
                               use_cursor=True)
 
+    tracer.step('fill exterior color')
     if data.exterior_color:
         scraper.scroll_to_element_by_xpath('//span[text()="Exterior color"]')
         scraper.element_click(selector='//span[text()="Exterior color"]', by=By.XPATH, exit_on_missing_element=False,
@@ -471,6 +957,7 @@ def publish_listing(data: Listing, scraper: Scraper):
                               exit_on_missing_element=False,
                               use_cursor=True)
 
+    tracer.step('fill interior color')
     if data.interior_color:
         scraper.scroll_to_element_by_xpath('//span[text()="Interior color"]')
         scraper.element_click(selector='//span[text()="Interior color"]', by=By.XPATH, exit_on_missing_element=False,
@@ -479,6 +966,7 @@ def publish_listing(data: Listing, scraper: Scraper):
                               exit_on_missing_element=False,
                               use_cursor=True)
 
+    tracer.step('fill vehicle condition')
     if data.vehicle_condition:
         scraper.scroll_to_element_by_xpath('//span[text()="Vehicle condition"]')
         scraper.element_click(selector='//span[text()="Vehicle condition"]', by=By.XPATH, exit_on_missing_element=False,
@@ -487,6 +975,7 @@ def publish_listing(data: Listing, scraper: Scraper):
                               exit_on_missing_element=False,
                               use_cursor=True)
 
+    tracer.step('fill fuel type')
     if data.fuel_type:
         scraper.scroll_to_element_by_xpath('//span[text()="Fuel type"]')
         scraper.element_click(selector='//span[text()="Fuel type"]', by=By.XPATH, exit_on_missing_element=False,
@@ -495,6 +984,7 @@ def publish_listing(data: Listing, scraper: Scraper):
                               exit_on_missing_element=False,
                               use_cursor=True)
 
+    tracer.step('fill transmission')
     if data.transmission:
         scraper.scroll_to_element_by_xpath('//span[text()="Transmission"]')
         scraper.element_click(selector='//span[text()="Transmission"]', by=By.XPATH, exit_on_missing_element=False,
@@ -503,6 +993,7 @@ def publish_listing(data: Listing, scraper: Scraper):
                               exit_on_missing_element=False,
                               use_cursor=True)
 
+    tracer.step('fill price')
     if data.price:
         scraper.scroll_to_element_by_xpath('//span[text()="Price"]/following-sibling::input[1]')
         scraper.element_send_keys(selector='//span[text()="Price"]/following-sibling::input[1]',
@@ -510,6 +1001,7 @@ def publish_listing(data: Listing, scraper: Scraper):
                                   exit_on_missing_element=False,
                                   text=str(int(data.price)))
 
+    tracer.step('fill description')
     if data.description:
         description = data.description
         old_value = CONFIG['listing']['description']['replace']['old_value'] or ''
@@ -520,11 +1012,12 @@ def publish_listing(data: Listing, scraper: Scraper):
             description = f"{description}{new_value}"
 
         scraper.scroll_to_element_by_xpath(xpath='//span[text()="Description"]/following-sibling::div/textarea')
-        scraper.element_send_keys(selector='//span[text()="Description"]/following-sibling::div/textarea',
-                                  by=By.XPATH,
-                                  exit_on_missing_element=False,
-                                  text=description)
+        scraper.element_insert_text(selector='//span[text()="Description"]/following-sibling::div/textarea',
+                                    by=By.XPATH,
+                                    exit_on_missing_element=False,
+                                    text=description)
 
+    tracer.step('fill location')
     if data.location:
         scraper.scroll_to_element_by_xpath('//span[text()="Location"]/following-sibling::input[1]')
         scraper.element_send_keys(selector='//span[text()="Location"]/following-sibling::input[1]',
@@ -534,10 +1027,12 @@ def publish_listing(data: Listing, scraper: Scraper):
         scraper.element_click('ul[role="listbox"] li:first-child > div', exit_on_missing_element=False,
                               use_cursor=False)
 
+    tracer.step('next')
     next_button_selector = 'div [aria-label="Next"] > div'
     next_button = scraper.find_element(selector=next_button_selector,
                                        exit_on_missing_element=False,
-                                       wait_element_time=3)
+                                       wait_element_time=3,
+                                       probe=True)
     if next_button:
         scraper.element_click(selector=next_button_selector,
                               by=By.CSS_SELECTOR,
@@ -545,11 +1040,14 @@ def publish_listing(data: Listing, scraper: Scraper):
                               use_cursor=True)
         add_listing_to_multiple_groups(data, scraper)
 
+    tracer.step('check publishing error')
     close_button_selector = '//span[text()="Close"]'
+    # The dialog is only shown if publishing failed
     close_button = scraper.find_element(selector=close_button_selector,
                                         by=By.XPATH,
                                         exit_on_missing_element=False,
-                                        wait_element_time=10)
+                                        wait_element_time=10,
+                                        probe=True)
     if close_button:
         scraper.element_click(selector=close_button_selector,
                               by=By.XPATH,
@@ -559,6 +1057,7 @@ def publish_listing(data: Listing, scraper: Scraper):
         return False
 
     # Publish the listing
+    tracer.step('publish')
     publish_button_selector = 'div[aria-label="Publish"]:not([aria-disabled])'
     publish_button = scraper.find_element(selector=publish_button_selector,
                                           by=By.CSS_SELECTOR,
@@ -572,7 +1071,7 @@ def publish_listing(data: Listing, scraper: Scraper):
                           by=By.CSS_SELECTOR,
                           exit_on_missing_element=False,
                           use_cursor=True)
-    scraper.go_to_page(PAGES['selling'])
+    scraper.go_to_page(PAGES['selling'], skip_if_current=True)
     return True
 
 
@@ -602,22 +1101,22 @@ def generate_multiple_images_path(path, images):
 
 
 def add_listing_to_multiple_groups(data: Listing, scraper: Scraper) -> None:
-    # Create an array for group names by splitting the string by this symbol ";"
-    group_names = define_groups_for_posting(data)
+    group_names = [group_name for group_name in define_groups_for_posting(data) if group_name]
     if not group_names:
         return
 
+    # Wait till any of the groups is shown, then read entries of all groups by one query
+    # and match every group among them
+    group_elements_selector = f'//span[{" or ".join(XPATH.translate_cont_expr(g, "text()") for g in group_names)}]'
+    if not scraper.find_element(selector=group_elements_selector, by=By.XPATH, exit_on_missing_element=False):
+        return
+    group_elements = scraper.find_elements(selector=group_elements_selector, by=By.XPATH)
+
     # Post in different groups
     for group_name in group_names:
-        if not group_name:
-            continue
-        group_element_selector = f'//span[{XPATH.translate_cont_expr(group_name, "text()")}]'
-        group_element = scraper.find_element(selector=group_element_selector,
-                                             by=By.XPATH,
-                                             exit_on_missing_element=False)
+        group_element = match_group_element(group_name, group_elements)
         if group_element:
-            scraper.element_click(selector=group_element_selector,
-                                  by=By.XPATH,
+            scraper.element_click(selector=group_element,
                                   exit_on_missing_element=False,
                                   use_cursor=True)
 
@@ -639,9 +1138,12 @@ def post_listing_to_groups(listing: Listing, scraper: Scraper) -> None:
 
     # Post in different groups
     for group_name in group_names:
-        post_listing_to_group(listing, scraper, group_name)
+        with tracer.span('share to group', group=group_name) as span:
+            if not post_listing_to_group(listing, scraper, group_name):
+                span.outcome = 'failed'
 
 
+@on_page_type(PAGE_TYPE_SHARE_DIALOG)
 def post_listing_to_group(listing: Listing, scraper: Scraper, group_name: str) -> bool:
     system_logger.info(f'Listing: {listing.title}({listing.vin}) '
                        f'Start posting listing to group - "{group_name}".')
@@ -663,30 +1165,46 @@ def post_listing_to_group(listing: Listing, scraper: Scraper, group_name: str) -
     if not share_group_button:
         return False
 
-    # Remove current text from this input
-    search_input_selector = f'//*[{XPATH.translate_eq_expr("search for groups", "@aria-label")}]'
-    scraper.element_delete_text(selector=search_input_selector,
-                                by=By.XPATH,
-                                exit_on_missing_element=False)
-
-    # Enter the title of the group in the input for search
-    scraper.element_send_keys(selector=search_input_selector,
-                              by=By.XPATH,
-                              text=group_name[:51])
+    # Resolved group is usually in the list of the dialog, it is clicked without searching
+    resolved_group = group_cache.get(group_name)
+    group_element = None
+    if resolved_group:
+        group_element = scraper.find_element_and_click(selector=XPATH.group_entry(resolved_group.label),
+                                                       by=By.XPATH,
+                                                       exit_on_missing_element=False,
+                                                       wait_element_time=3,
+                                                       probe=True)
 
-    # Try to find group element for posting
-    group_element_selector = f'//span[{XPATH.translate_cont_expr(group_name, "text()")}]'
-    group_element = scraper.find_element_and_click(selector=group_element_selector,
-                                                   by=By.XPATH,
-                                                   exit_on_missing_element=False)
     if not group_element:
-        return False
+        # Remove current text from this input
+        search_input_selector = f'//*[{XPATH.translate_eq_expr("search for groups", "@aria-label")}]'
+        scraper.element_delete_text(selector=search_input_selector,
+                                    by=By.XPATH,
+                                    exit_on_missing_element=False)
+
+        # Enter the title of the group in the input for search
+        scraper.element_send_keys(selector=search_input_selector,
+                                  by=By.XPATH,
+                                  text=group_name[:51])
+
+        # Try to find group element for posting
+        group_element_selector = f'//span[{XPATH.translate_cont_expr(group_name, "text()")}]'
+        if not scraper.find_element(selector=group_element_selector,
+                                    by=By.XPATH,
+                                    exit_on_missing_element=False):
+            return False
+        group_element = match_group_element(group_name,
+                                            scraper.find_elements(selector=group_element_selector, by=By.XPATH))
+        if not group_element or not scraper.find_element_and_click(selector=group_element,
+                                                                   exit_on_missing_element=False):
+            return False
 
     # Enter text for posting
     post_text_field_element_selector = f'//*[{XPATH.translate_cont_expr("create a public post", "@aria-placeholder")}]'
     post_text_field_element = scraper.find_element(selector=post_text_field_element_selector,
                                                    by=By.XPATH,
-                                                   exit_on_missing_element=False)
+                                                   exit_on_missing_element=False,
+                                                   probe=True)
     if not post_text_field_element:
         post_text_field_element_selector = f'//*[{XPATH.translate_cont_expr("write something", "@aria-label")}]'
         post_text_field_element = scraper.find_element(selector=post_text_field_element_selector,
@@ -694,9 +1212,9 @@ def post_listing_to_group(listing: Listing, scraper: Scraper, group_name: str) -
                                                        exit_on_missing_element=False)
 
     if post_text_field_element:
-        scraper.element_send_keys(selector=post_text_field_element_selector,
-                                  by=By.XPATH,
-                                  text=listing.description)
+        scraper.element_insert_text(selector=post_text_field_element_selector,
+                                    by=By.XPATH,
+                                    text=listing.description)
 
     # Try to post listing in group
     post_button_selector = f'//*[{XPATH.translate_eq_expr("post", "@aria-label")} and not (@aria-disabled)]'
@@ -719,7 +1237,7 @@ def post_listing_to_group(listing: Listing, scraper: Scraper, group_name: str) -
         f'{XPATH.translate_eq_expr(success_result_element_text2, "text()")}]')
     success_result_element = scraper.find_element(selector=success_result_element_selector, by=By.XPATH,
                                                   condition=EC.visibility_of_element_located,
-                                                  exit_on_missing_element=False, wait_element_time=1)
+                                                  exit_on_missing_element=False, wait_element_time=1, probe=True)
     if success_result_element:
         if success_result_element_text1 in success_result_element.text.lower():
             system_logger.info(f'Listing: {listing.title}({listing.vin}) '
@@ -741,15 +1259,13 @@ def define_groups_for_posting(listing: Listing) -> list[str]:
     group_names = listing.groups.copy()
 
     # Define groups for posting from settings
-    # These groups are the same for all listings
-    group_names_from_config = CONFIG['listing']['public_groups']
-    if group_names_from_config:
-        group_names_from_config = [g.strip() for g in group_names_from_config.split(';')]
-        group_names.extend(group_names_from_config)
+    # These groups are the same for all listings, they are parsed once for the value of the setting
+    group_names.extend(parse_group_names(CONFIG['listing']['public_groups']))
 
     return group_names
 
 
+@on_page_type(PAGE_TYPE_SELLING)
 def click_listing_by_title(scraper: Scraper, title: str) -> bool:
     # Try to find listing container on page
     listing_container_selector = XPATH.selling_listing_container(title)
@@ -783,6 +1299,7 @@ def click_listing_by_title(scraper: Scraper, title: str) -> bool:
         return scraper.element_click(listing_container)
 
 
+@on_page_type(PAGE_TYPE_SELLING)
 def find_listing_by_title(scraper: Scraper, title: str) -> WebElement | None:
     # Find and check search input field
     search_input_selector = XPATH.selling_search_input()
@@ -808,7 +1325,8 @@ def find_listing_by_title(scraper: Scraper, title: str) -> WebElement | None:
         selector=XPATH.selling_listing_container(title),
         by=By.XPATH,
         exit_on_missing_element=False,
-        wait_element_time=10)
+        wait_element_time=10,
+        probe=True)
 
 
 def normalize_text_for_compare(text: str) -> str:
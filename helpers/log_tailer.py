@@ -0,0 +1,98 @@
+import os
+import threading
+from collections import deque
+
+
+class LogTailer:
+    """
+    Follows a log file and reads only the bytes appended since the previous poll.
+
+    The recent lines are kept in a bounded buffer. Every line gets a sequence number,
+    so each viewer can ask only for the lines it has not shown yet.
+    Truncation (e.g. "Clear Log") and rotation (the file is replaced by a new one) reset the buffer
+    and increase the generation, so viewers know that they should start from scratch.
+    """
+
+    def __init__(self, file_path: str, max_lines: int = 1000, initial_read_bytes: int = 256 * 1024):
+        self.file_path = file_path
+        self.max_lines = max_lines
+        self.initial_read_bytes = initial_read_bytes
+
+        self.lines: deque[str] = deque(maxlen=max_lines)
+        self.sequence = 0
+        self.generation = 0
+
+        self._offset = 0
+        self._inode = None
+        self._partial_line = ''
+        self._skip_first_line = False
+        self._lock = threading.Lock()
+
+    def poll(self) -> None:
+        """
+        Read appended bytes of the file, if there are any.
+        """
+        with self._lock:
+            try:
+                stat = os.stat(self.file_path)
+            except FileNotFoundError:
+                if self._inode is not None:
+                    self._reset(inode=None)
+                return
+
+            # The file was rotated or truncated
+            if stat.st_ino != self._inode or stat.st_size < self._offset:
+                is_first_read = self._inode is None and self.generation == 0
+                self._reset(inode=stat.st_ino)
+                # Big log is not read from the beginning at the first time, only its tail
+                if is_first_read and stat.st_size > self.initial_read_bytes:
+                    self._offset = stat.st_size - self.initial_read_bytes
+                    self._skip_first_line = True
+
+            if stat.st_size == self._offset:
+                return
+
+            with open(self.file_path, 'rb') as f:
+                f.seek(self._offset)
+                data = f.read(stat.st_size - self._offset)
+            self._offset += len(data)
+
+            text = self._partial_line + data.decode('utf-8', errors='replace')
+            lines = text.split('\n')
+            self._partial_line = lines.pop()
+
+            # The tail of the file may start in the middle of a line
+            if self._skip_first_line and lines:
+                lines.pop(0)
+                self._skip_first_line = False
+
+            for line in lines:
+                self.lines.append(line.rstrip('\r'))
+            self.sequence += len(lines)
+
+    def get_lines_since(self, generation: int, sequence: int) -> tuple[int, int, list[str], bool]:
+        """
+        Return lines which were appended after the given position of a viewer.
+
+        :param generation: Generation which the viewer has seen
+        :param sequence: Sequence number of the last line which the viewer has seen
+        :return: (generation, sequence, lines, reset) - the new position of the viewer, the lines to show
+                 and flag if the viewer should clear already shown lines before
+        """
+        with self._lock:
+            reset = generation != self.generation
+            if reset:
+                sequence = self.sequence - len(self.lines)
+
+            new_lines_count = min(self.sequence - sequence, len(self.lines))
+            lines = list(self.lines)[len(self.lines) - new_lines_count:] if new_lines_count > 0 else []
+
+            return self.generation, self.sequence, lines, reset
+
+    def _reset(self, inode: int | None) -> None:
+        self.lines.clear()
+        self.generation += 1
+        self._inode = inode
+        self._offset = 0
+        self._partial_line = ''
+        self._skip_first_line = False
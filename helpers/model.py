@@ -139,16 +139,16 @@ class Transmission(BaseEnum):
 class Listing:
     photos_folder: str = ''
     photos_names: list[str] = None
-    vehicle_type: VehicleType = VehicleType.default_value
-    vehicle_condition: VehicleCondition | None = VehicleCondition.default_value
-    body_type: BodyType = BodyType.default_value
+    vehicle_type: VehicleType = VehicleType._default_value
+    vehicle_condition: VehicleCondition | None = VehicleCondition._default_value
+    body_type: BodyType = BodyType._default_value
     year: int | None = None
     make: str = ''
     model: str = ''
-    exterior_color: BaseColor = BaseColor.default_value
-    interior_color: BaseColor = BaseColor.default_value
+    exterior_color: BaseColor = BaseColor._default_value
+    interior_color: BaseColor = BaseColor._default_value
     mileage: int = 0
-    fuel_type: FuelType = FuelType.default_value
+    fuel_type: FuelType = FuelType._default_value
     transmission: Transmission | None = None
     price: float = 0.0
     title: str = ''
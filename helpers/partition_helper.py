@@ -0,0 +1,68 @@
+import datetime
+import zlib
+from typing import Awaitable, Callable
+
+from helpers.ledger_helper import PublicationLedger
+from helpers.model import Listing
+from logger import system_logger
+
+
+def get_partition_run(ledger: PublicationLedger) -> int:
+    # Count of the completed scheduled cycles, the partition of the run is taken by it
+    return int(ledger.get_state('partition_run', '0'))
+
+
+async def run_scheduled_cycle(ledger: PublicationLedger, feed_hash: str,
+                              cycle: Callable[[], Awaitable[bool]]) -> bool:
+    """
+    Run the cycle of the scheduled run. Only a completed cycle saves the hash of the feed
+    and moves the rolling refresh to the next partition, a failed or stopped cycle is repeated by the next run.
+
+    :param cycle: Returns True if the cycle is completed
+    :return: True if the cycle is completed
+    """
+    if not await cycle():
+        system_logger.info('Scheduled cycle is not completed, its partition is checked by the next run')
+        return False
+
+    ledger.set_state('feed_hash', feed_hash)
+    ledger.set_state('partition_run', str(get_partition_run(ledger) + 1))
+    return True
+
+
+def get_partition(listing: Listing, partitions: int) -> int:
+    # crc32 is stable between runs, unlike hash() of str
+    key = listing.stockno or listing.title
+    return zlib.crc32(key.encode('utf-8')) % partitions
+
+
+class PartitionFilter:
+    """
+    Selects listings for one run of the rolling refresh: listings of the run's partition
+    and urgent listings of any partition (due by the ledger or with a changed price).
+    All listings are refreshed once per `partitions` runs.
+    """
+
+    def __init__(self, ledger: PublicationLedger, partitions: int, partition: int,
+                 lifetime_days: float, retry_interval: datetime.timedelta):
+        self.ledger = ledger
+        self.partitions = partitions
+        self.partition = partition
+        self.lifetime_days = lifetime_days
+        self.retry_interval = retry_interval
+
+    def __call__(self, listing: Listing) -> bool:
+        if get_partition(listing, self.partitions) == self.partition:
+            return True
+
+        due_at, reason = self.ledger.get_due(listing.title, self.lifetime_days, self.retry_interval)
+        if due_at <= datetime.datetime.now():
+            system_logger.debug('Listing %s is urgent: %s', listing.title, reason)
+            return True
+
+        published_price = self.ledger.get_price(listing.title)
+        if published_price is not None and round(published_price) != round(listing.price):
+            system_logger.debug('Listing %s is urgent: price is changed', listing.title)
+            return True
+
+        return False
@@ -0,0 +1,62 @@
+import datetime
+
+from helpers.ledger_helper import PublicationLedger
+from helpers.model import Listing
+from logger import system_logger
+
+# Scores of the signals, a listing with the higher score is published first
+SCORE_PRICE_CHANGED = 100
+SCORE_MILEAGE_CHANGED = 80
+SCORE_EXPIRED = 60
+# Long expired listing still goes after a listing with changed price or mileage
+SCORE_EXPIRED_MAX = SCORE_MILEAGE_CHANGED - 1
+SCORE_NOT_PUBLISHED = 50
+SCORE_RETRY = 40
+SCORE_RECENTLY_FAILED = -50
+
+
+class ListingPriority:
+    """
+    Scores listings by the signals of the ledger, so a limited run spends its slots on the listings
+    which need attention: changed price or mileage, expired, never published listings.
+    Listings which failed recently are published last, they would most likely fail again.
+    """
+
+    def __init__(self, ledger: PublicationLedger, lifetime_days: float, retry_interval: datetime.timedelta):
+        self.ledger = ledger
+        self.lifetime_days = lifetime_days
+        self.retry_interval = retry_interval
+
+    def get_score(self, listing: Listing) -> float:
+        record = self.ledger.get_record(listing.title)
+        if record is None:
+            return SCORE_NOT_PUBLISHED
+
+        now = datetime.datetime.now()
+        due_at, _ = self.ledger.get_due(listing.title, self.lifetime_days, self.retry_interval)
+
+        if record['published_date']:
+            if record['price'] is not None and round(record['price']) != round(listing.price or 0):
+                return SCORE_PRICE_CHANGED
+            if record['mileage'] is not None and record['mileage'] != listing.mileage:
+                return SCORE_MILEAGE_CHANGED
+            if due_at <= now:
+                # The longer the listing is expired, the earlier it is published
+                return min(SCORE_EXPIRED + (now - due_at) / datetime.timedelta(days=1), SCORE_EXPIRED_MAX)
+            # Listing which expires sooner is checked earlier
+            return -(due_at - now) / datetime.timedelta(days=1)
+
+        if record['failed_at']:
+            return SCORE_RETRY if due_at <= now else SCORE_RECENTLY_FAILED
+        return SCORE_NOT_PUBLISHED
+
+    def sort(self, listings: list[Listing]) -> list[Listing]:
+        """
+        :return: Listings by priority, listings with the same score keep their order
+        """
+        scores = {id(listing): self.get_score(listing) for listing in listings}
+        result = sorted(listings, key=lambda listing: -scores[id(listing)])
+        if result:
+            system_logger.debug('Listings by priority: %s',
+                                ', '.join(f'{listing.title} ({scores[id(listing)]:.1f})' for listing in result[:10]))
+        return result
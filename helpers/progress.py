@@ -0,0 +1,60 @@
+import dataclasses
+import time
+from typing import Callable
+
+
+@dataclasses.dataclass
+class RunProgress:
+    """
+    Progress of one run (e.g. publishing of listings).
+    Listeners get a copy of the progress on every change, so they can use it in another thread.
+    """
+
+    name: str = ''
+    total: int = 0
+    done: int = 0
+    published: int = 0
+    failed: int = 0
+    current: str = ''
+    finished: bool = False
+    started_at: float = dataclasses.field(default_factory=time.time)
+
+    listeners: list[Callable[['RunProgress'], None]] = dataclasses.field(default_factory=list, repr=False)
+
+    @property
+    def value(self) -> float:
+        return self.done / self.total if self.total else 0.0
+
+    @property
+    def text(self) -> str:
+        text = f'{self.name}: {self.done}/{self.total}, published {self.published}'
+        if self.failed:
+            text += f', failed {self.failed}'
+        if self.current and not self.finished:
+            text += f' - {self.current}'
+        return text
+
+    def start(self, total: int) -> None:
+        self.total = total
+        self.started_at = time.time()
+        self.notify()
+
+    def set_current(self, current: str) -> None:
+        self.current = current
+        self.notify()
+
+    def advance(self, published: bool = False, failed: bool = False) -> None:
+        self.done += 1
+        self.published += int(published)
+        self.failed += int(failed)
+        self.notify()
+
+    def finish(self) -> None:
+        self.finished = True
+        self.current = ''
+        self.notify()
+
+    def notify(self) -> None:
+        snapshot = dataclasses.replace(self, listeners=[])
+        for listener in self.listeners:
+            listener(snapshot)
@@ -0,0 +1,125 @@
+import datetime
+import os
+import sqlite3
+import threading
+from enum import StrEnum
+from typing import Iterable
+
+from config import CONFIG
+from helpers.ledger_helper import PublicationLedger
+from helpers.model import Listing
+from logger import system_logger
+
+PUBLISH_QUEUE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    title_key TEXT PRIMARY KEY,
+    title TEXT NOT NULL,
+    stockno TEXT,
+    state TEXT NOT NULL,
+    reason TEXT,
+    updated_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS run (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+
+class PublishState(StrEnum):
+    PENDING = 'pending'
+    # The listing form is filled, the listing may be published or not
+    PHOTOS_UPLOADED = 'photos-uploaded'
+    PUBLISHED = 'published'
+    SHARED = 'shared'
+    FAILED = 'failed'
+
+
+class PublishQueue:
+    """
+    Durable state of every listing of the publishing run, it survives crashes of the program and the browser.
+
+    A run which is not finished is resumed by the next run: listings which are done are skipped,
+    a listing which is published but not shared to groups is only shared, and a listing which was interrupted
+    after its form was filled is searched on the selling page first, so nothing is published twice.
+    """
+
+    FINAL_STATES = (PublishState.SHARED, PublishState.FAILED)
+
+    def __init__(self, file_path: str = CONFIG['publish_queue']['path']):
+        self.file_path = file_path
+        if os.path.dirname(file_path):
+            os.makedirs(os.path.dirname(file_path), exist_ok=True)
+
+        # The queue is used by the browser worker and the event loop
+        self._connection = sqlite3.connect(file_path, check_same_thread=False)
+        self._connection.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        with self._lock, self._connection:
+            self._connection.executescript(PUBLISH_QUEUE_SCHEMA)
+
+    def begin_run(self, listings: Iterable[Listing]) -> bool:
+        """
+        Start a new run or resume the unfinished one.
+
+        :param listings: All listings of the feed
+        :return: True if the unfinished run is resumed
+        """
+        is_resumed = self._get_run_value('status') == 'running'
+        with self._lock, self._connection:
+            if not is_resumed:
+                self._connection.execute('DELETE FROM jobs')
+            self._connection.executemany(
+                'INSERT INTO jobs (title_key, title, stockno, state, updated_at) VALUES (?, ?, ?, ?, ?) '
+                'ON CONFLICT(title_key) DO NOTHING',
+                [(PublicationLedger.title_key(listing.title), listing.title, listing.stockno,
+                  PublishState.PENDING.value, self._now()) for listing in listings])
+            self._connection.execute("INSERT INTO run (key, value) VALUES ('status', 'running') "
+                                     "ON CONFLICT(key) DO UPDATE SET value = excluded.value")
+
+        if is_resumed:
+            counts = self.get_counts()
+            system_logger.info(f'Resume the unfinished publishing run: {counts}')
+        return is_resumed
+
+    def finish_run(self) -> None:
+        self._execute("UPDATE run SET value = 'finished' WHERE key = 'status'")
+
+    def get_state(self, title: str) -> PublishState | None:
+        rows = self._query('SELECT state FROM jobs WHERE title_key = ?', (PublicationLedger.title_key(title),))
+        return PublishState(rows[0]['state']) if rows else None
+
+    def set_state(self, listing: Listing, state: PublishState, reason: str | None = None) -> None:
+        self._execute(
+            'INSERT INTO jobs (title_key, title, stockno, state, reason, updated_at) VALUES (?, ?, ?, ?, ?, ?) '
+            'ON CONFLICT(title_key) DO UPDATE SET state = excluded.state, reason = excluded.reason, '
+            'updated_at = excluded.updated_at',
+            (PublicationLedger.title_key(listing.title), listing.title, listing.stockno, state.value, reason,
+             self._now()))
+
+    def reset(self, title: str) -> None:
+        """
+        Publish the listing again, e.g. when its published version is removed.
+        """
+        self._execute('UPDATE jobs SET state = ?, reason = NULL, updated_at = ? WHERE title_key = ?',
+                      (PublishState.PENDING.value, self._now(), PublicationLedger.title_key(title)))
+
+    def get_counts(self) -> dict[str, int]:
+        rows = self._query('SELECT state, COUNT(*) AS count FROM jobs GROUP BY state')
+        return {row['state']: row['count'] for row in rows}
+
+    def _get_run_value(self, key: str) -> str | None:
+        rows = self._query('SELECT value FROM run WHERE key = ?', (key,))
+        return rows[0]['value'] if rows else None
+
+    def _execute(self, sql: str, parameters: tuple = ()) -> None:
+        with self._lock, self._connection:
+            self._connection.execute(sql, parameters)
+
+    def _query(self, sql: str, parameters: tuple = ()) -> list[sqlite3.Row]:
+        with self._lock:
+            return self._connection.execute(sql, parameters).fetchall()
+
+    @staticmethod
+    def _now() -> str:
+        return datetime.datetime.now().isoformat(timespec='seconds')
@@ -1,8 +1,13 @@
+import dataclasses
 import os
 import pickle
 import random
+import threading
 import time
+from contextlib import contextmanager
+from urllib.parse import urlsplit
 
+import psutil
 from selenium import webdriver
 from selenium.common import NoSuchWindowException
 from selenium.common.exceptions import ElementClickInterceptedException, TimeoutException, WebDriverException
@@ -16,10 +21,126 @@ from selenium.webdriver.remote.webdriver import WebDriver
 from selenium.webdriver.remote.webelement import WebElement
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.support.ui import WebDriverWait
-from webdriver_manager.chrome import ChromeDriverManager
 
 import logger
 from config import CONFIG
+from helpers.driver_helper import resolve_chromedriver_path
+from helpers.tracing import tracer
+
+
+class ScraperInterrupted(RuntimeError):
+    """
+    Base class for errors which interrupt the whole work of the scraper, they are never swallowed by its methods.
+    """
+    pass
+
+
+class DeadlineExceeded(ScraperInterrupted):
+    pass
+
+
+class JobCancelled(ScraperInterrupted):
+    pass
+
+
+class Deadline:
+    """
+    Time budget for a piece of work (e.g. one listing).
+    Every wait of the scraper uses min(its own timeout, remaining budget) while the deadline is active.
+    """
+
+    def __init__(self, seconds: float | None, name: str = ''):
+        self.seconds = seconds
+        self.name = name
+        self.started_at = time.monotonic()
+        self.expires_at = self.started_at + seconds if seconds else None
+
+    def remaining(self) -> float | None:
+        if self.expires_at is None:
+            return None
+        return max(self.expires_at - time.monotonic(), 0.0)
+
+    def is_expired(self) -> bool:
+        return self.expires_at is not None and time.monotonic() >= self.expires_at
+
+    def limit(self, timeout: float) -> float:
+        remaining = self.remaining()
+        if remaining is None:
+            return timeout
+        return min(timeout, remaining)
+
+    def check(self, step: str = '') -> None:
+        if self.is_expired():
+            raise DeadlineExceeded(f'Deadline {self.seconds}s of {self.name or "work"} exceeded'
+                                   f'{f" while {step}" if step else ""}')
+
+
+class CircuitBreakerOpen(RuntimeError):
+
+    def __init__(self, page_type: str, selectors: list[str], misses_count: int):
+        self.page_type = page_type
+        self.selectors = selectors
+        super().__init__(f'{misses_count} selector misses in a row on page "{page_type}", '
+                         f'probably the page markup was changed: {"; ".join(selectors)}')
+
+
+class SelectorCircuitBreaker:
+    """
+    Counts consecutive misses of selectors per page type and trips after the threshold,
+    so the run stops quickly when the markup of the site is changed instead of waiting for every selector.
+    Misses of elements which the flow depends on are counted, even if the caller tolerates them.
+    Only probes for elements which may rightly be missing (e.g. a listing which isn't published) are not counted.
+    Counts of the page type are reset by a found element, a page which is finished without errors and a trip.
+    """
+
+    def __init__(self, threshold: int | None = None):
+        self.threshold = threshold or CONFIG['scraper'].get('circuit_breaker', {}).get('threshold')
+        self.misses: dict[str, list[str]] = {}
+
+    def record_hit(self, page_type: str | None) -> None:
+        if page_type:
+            self.misses.pop(page_type, None)
+
+    def record_miss(self, page_type: str | None, selector: str) -> None:
+        if not page_type or not self.threshold:
+            return
+
+        selectors = self.misses.setdefault(page_type, [])
+        selectors.append(selector)
+
+        if len(selectors) >= self.threshold:
+            # The next run starts counting again
+            self.misses.pop(page_type)
+            raise CircuitBreakerOpen(page_type=page_type,
+                                     selectors=list(dict.fromkeys(selectors)),
+                                     misses_count=len(selectors))
+
+    def reset(self, page_type: str | None = None) -> None:
+        if page_type:
+            self.misses.pop(page_type, None)
+        else:
+            self.misses = {}
+
+
+@dataclasses.dataclass
+class UploadResult:
+    files: list[str]
+    # Seconds from attaching the files till the thumbnail of every accepted file is shown
+    upload_times: list[float] = dataclasses.field(default_factory=list)
+    total_time: float = 0.0
+    is_timed_out: bool = False
+
+    @property
+    def accepted(self) -> list[str]:
+        return self.files[:len(self.upload_times)]
+
+    @property
+    def rejected(self) -> list[str]:
+        return self.files[len(self.upload_times):]
+
+    @property
+    def is_complete(self) -> bool:
+        return not self.rejected
 
 
 class Scraper:
@@ -35,14 +156,24 @@ class Scraper:
     # In this folder we will save cookies from logged-in users
     cookies_folder = 'cookies' + os.path.sep
 
-    def __init__(self, url: str, driver: WebDriver | None = None):
+    def __init__(self, url: str, driver: WebDriver | None = None, cancel_event: threading.Event | None = None):
         self.url = url
 
+        self.is_driver_owner = not driver
         if not driver:
             self.setup_driver_options()
             self.setup_driver()
         else:
             self.driver = driver
+        tracer.trace_driver(self.driver)
+
+        self.deadline: Deadline | None = None
+        # When the event is set, all waits of the scraper are interrupted by JobCancelled
+        self.cancel_event = cancel_event
+
+        # Type of the current page (e.g. selling list, create form), misses of selectors are counted per page type
+        self.page_type: str | None = None
+        self.circuit_breaker = SelectorCircuitBreaker()
 
         self.go_to_page(url)
 
@@ -68,13 +199,22 @@ class Scraper:
 
     # Setup chrome driver with predefined options
     def setup_driver(self):
-        chrome_driver = ChromeService(ChromeDriverManager().install())
+        chrome_driver = ChromeService(resolve_chromedriver_path())
         self.driver = webdriver.Chrome(service=chrome_driver, options=self.driver_options)
         self.driver.maximize_window()
 
-    # Automatically close driver on destruction of the object
+    # Use another driver, e.g. after the shared browser was restarted
+    def reattach_driver(self, driver: WebDriver, reload_cookies: bool = False) -> None:
+        self.driver = driver
+        tracer.trace_driver(self.driver)
+        if reload_cookies and hasattr(self, 'cookies_file_path') and self.is_cookie_file():
+            self.load_cookies()
+
+    # Automatically close driver on destruction of the object, but only if the driver was created by this object.
+    # A driver that was passed from outside is shared (e.g. by ScraperDriverManager) and lives longer than the scraper
     def __del__(self):
-        self.driver.close()
+        if getattr(self, 'is_driver_owner', False):
+            self.driver.quit()
 
     # Add login functionality and load cookies if there are any with 'cookies_file_name'
     def add_login_functionality(self,
@@ -90,8 +230,7 @@ class Scraper:
         if self.is_cookie_file():
             # Load cookies
             self.load_cookies()
-            if self.driver.current_url != self.url:
-                self.go_to_page(self.url)
+            self.go_to_page(self.url, skip_if_current=True)
 
             # Check if user is logged in after adding the cookies
             is_logged_in = self.is_logged_in(5)
@@ -104,9 +243,9 @@ class Scraper:
             'Please login manually in the browser and after that you will be automatically logged in with cookies. Note that if you do not log in for five minutes, the program will turn off.')
         is_logged_in = self.is_logged_in(300)
 
-        # User is not logged in so exit from the program
+        # User is not logged in, so the job can't go on
         if not is_logged_in:
-            exit()
+            raise RuntimeError(f'User is not logged in at {self.login_url} in 5 minutes')
 
         # User is logged in so save the cookies
         self.save_cookies()
@@ -157,19 +296,97 @@ class Scraper:
 
         return self.find_element(selector=self.is_logged_in_selector,
                                  exit_on_missing_element=False,
-                                 wait_element_time=wait_element_time)
+                                 wait_element_time=wait_element_time,
+                                 probe=True)
 
     # Wait random amount of seconds before taking some action so the server won't be able to tell if you are a bot
     def wait_action_random_time(self) -> None:
         self.wait_random_time(self.action_wait_random_time_min, self.action_wait_random_time_max)
 
-    def wait_listing_random_time(self) -> None:
-        self.wait_random_time(self.listing_random_delay_min, self.listing_random_delay_max)
+    def wait_listing_random_time(self, elapsed: float = 0.0) -> None:
+        self.sleep(self.get_listing_random_delay(elapsed))
 
-    @classmethod
-    def wait_random_time(cls, min_delay: int, max_delay: int) -> None:
-        random_sleep_seconds = cls.get_random_delay(min_delay, max_delay)
-        time.sleep(random_sleep_seconds)
+    def get_listing_random_delay(self, elapsed: float = 0.0) -> float:
+        """
+        Return the rest of the random delay between listings.
+
+        :param elapsed: Seconds which have already passed since the previous listing
+        """
+        random_sleep_seconds = max(self.get_random_delay(self.listing_random_delay_min,
+                                                         self.listing_random_delay_max) - elapsed, 0)
+        return self.get_wait_time(random_sleep_seconds, 'waiting random time')
+
+    def wait_random_time(self, min_delay: int, max_delay: int, elapsed: float = 0.0) -> None:
+        """
+        :param elapsed: Seconds which have already passed since the previous action, they are a part of the delay
+        """
+        random_sleep_seconds = max(self.get_random_delay(min_delay, max_delay) - elapsed, 0)
+        self.sleep(self.get_wait_time(random_sleep_seconds, 'waiting random time'))
+
+    def sleep(self, seconds: float) -> None:
+        with tracer.wait('sleep', seconds=round(seconds, 3)):
+            if not self.cancel_event:
+                time.sleep(seconds)
+                return
+
+            if self.cancel_event.wait(seconds):
+                raise JobCancelled('Job is cancelled')
+
+    def check_cancelled(self) -> None:
+        if self.cancel_event and self.cancel_event.is_set():
+            raise JobCancelled('Job is cancelled')
+
+    def wait_until(self, wait_time: float, condition):
+        """
+        WebDriverWait.until which is interrupted by cancellation of the job on the next poll.
+        """
+
+        def cancellable_condition(driver):
+            self.check_cancelled()
+            return condition(driver)
+
+        with tracer.wait('wait until', timeout=round(wait_time, 3)):
+            return WebDriverWait(self.driver, wait_time).until(cancellable_condition)
+
+    @contextmanager
+    def deadline_scope(self, deadline: Deadline | None):
+        """
+        Limit all waits of the scraper inside the block by the deadline.
+        """
+        previous_deadline = self.deadline
+        self.deadline = deadline or previous_deadline
+        try:
+            yield self.deadline
+        finally:
+            self.deadline = previous_deadline
+
+    def get_wait_time(self, wait_time: float, step: str = '') -> float:
+        """
+        Return wait time limited by the remaining time of the current deadline.
+        Raises DeadlineExceeded if there is no time left and JobCancelled if the job is cancelled.
+        """
+        self.check_cancelled()
+
+        if not self.deadline:
+            return wait_time
+
+        self.deadline.check(step)
+        return self.deadline.limit(wait_time)
+
+    def check_deadline(self, step: str = '') -> None:
+        if self.deadline:
+            self.deadline.check(step)
+
+    @contextmanager
+    def page_type_scope(self, page_type: str):
+        previous_page_type = self.page_type
+        self.page_type = page_type
+        try:
+            yield
+            # Page is worked out, earlier misses on it were not a changed markup
+            self.circuit_breaker.reset(page_type)
+        finally:
+            self.page_type = previous_page_type
 
     def get_action_random_delay(self):
         return self.get_random_delay(self.action_wait_random_time_min, self.action_wait_random_time_max)
@@ -179,19 +396,42 @@ class Scraper:
         return int(round(random.uniform(min_delay, max_delay), 2))
 
     # Goes to a given page and waits random time before that to prevent detection as a bot
-    def go_to_page(self, page: str):
+    def go_to_page(self, page: str, skip_if_current: bool = False):
+        """
+        :param skip_if_current: Don't reload the page if the browser is already on it
+        """
+        if skip_if_current and self.is_on_page(page):
+            logger.system_logger.debug('Already on page %s, skip navigation', page)
+            return
+
         # Wait random time before refreshing the page to prevent the detection as a bot
         self.wait_action_random_time()
 
         # Refresh the site url with the loaded cookies so the user will be logged in
+        self.check_deadline(f'going to page {page}')
         self.driver.get(page)
 
+    def is_on_page(self, page: str) -> bool:
+        try:
+            current_url = self.driver.current_url
+        except WebDriverException:
+            return False
+        return self.normalize_url(current_url) == self.normalize_url(page)
+
+    @staticmethod
+    def normalize_url(url: str) -> str:
+        # facebook.com and www.facebook.com are the same page, query and fragment don't change the page
+        parts = urlsplit(url)
+        host = parts.netloc.lower().removeprefix('www.')
+        return f'{host}{parts.path.rstrip("/")}'
+
     def find_element(self,
                      selector: str | WebElement,
                      by: str = By.CSS_SELECTOR,
                      condition=EC.element_to_be_clickable,
                      exit_on_missing_element: bool = True,
-                     wait_element_time: int | None = None) -> WebElement | None:
+                     wait_element_time: int | None = None,
+                     probe: bool = False) -> WebElement | None:
         """
         Locate an element using Selenium with a waiting condition.
 
@@ -200,19 +440,33 @@ class Scraper:
         :param condition: Expected condition to wait for (default: element_to_be_clickable)
         :param wait_element_time: Time to wait for the element (if None, uses self.wait_element_time)
         :param exit_on_missing_element: If True, raises RuntimeError when the element is not found
+        :param probe: The element may rightly be missing, so its miss isn't counted by the circuit breaker
         :return: WebElement if found, otherwise None (or raises if exit_on_missing_element=True)
         """
 
         if isinstance(selector, WebElement):
             return selector
 
-        wait_element_time = wait_element_time or self.wait_element_time
-        logger.system_logger.debug(f'Trying to find element: {by}="{selector}", timeout={wait_element_time}s')
+        wait_element_time = self.get_wait_time(wait_element_time or self.wait_element_time,
+                                               f'finding element {by}="{selector}"')
+        logger.system_logger.debug('Trying to find element: %s="%s", timeout=%ss', by, selector, wait_element_time)
 
         try:
-            return WebDriverWait(self.driver, wait_element_time).until(condition((by, selector)))
+            element = self.wait_until(wait_element_time, condition((by, selector)))
+            self.circuit_breaker.record_hit(self.page_type)
+            return element
+        except ScraperInterrupted:
+            raise
         except TimeoutException:
-            logger.system_logger.error(f'Timeout: Element not found: {by}="{selector}"', exc_info=True)
+            # The wait was cut by the deadline, so give up the whole work instead of the element only
+            self.check_deadline(f'finding element {by}="{selector}"')
+            if exit_on_missing_element:
+                logger.system_logger.error('Timeout: Element not found: %s="%s"', by, selector, exc_info=True)
+            else:
+                # Missing element is expected by the caller, so the traceback is useless here
+                logger.system_logger.info('Element not found in %ss: %s="%s"', wait_element_time, by, selector)
+            if not probe:
+                self.circuit_breaker.record_miss(self.page_type, selector)
         except WebDriverException as e:
             logger.system_logger.error(f'WebDriver error: {e}', exc_info=True)
         except Exception as e:
@@ -230,12 +484,14 @@ class Scraper:
                                exit_on_missing_element: bool = True,
                                wait_element_time: int | None = None,
                                use_cursor: bool = True,
-                               scroll_to: bool = True) -> WebElement | None:
+                               scroll_to: bool = True,
+                               probe: bool = False) -> WebElement | None:
         element = self.find_element(selector=selector,
                                     by=by,
                                     condition=condition,
                                     exit_on_missing_element=exit_on_missing_element,
-                                    wait_element_time=wait_element_time)
+                                    wait_element_time=wait_element_time,
+                                    probe=probe)
         if not element:
             return None
 
@@ -248,12 +504,16 @@ class Scraper:
 
         return element
 
+    def find_elements(self, selector: str, by: str = By.CSS_SELECTOR) -> list[WebElement]:
+        # Elements which are on the page now, without waiting
+        self.check_deadline(f'finding elements {selector}')
+        return self.driver.find_elements(by=by, value=selector)
+
     def find_elements_with_scrolling(self, selector: str, by: str, wait_elements_time: int | None = 10) -> list[
         WebElement]:
         if wait_elements_time is None:
             wait_elements_time = self.wait_element_time
 
-        wait = WebDriverWait(self.driver, wait_elements_time)
         scroll_element = self.driver.find_element(By.TAG_NAME, 'body')
 
         while True:
@@ -262,8 +522,12 @@ class Scraper:
 
             scroll_element.send_keys(Keys.END)
 
+            wait_time = self.get_wait_time(wait_elements_time, 'scrolling elements')
             try:
-                wait.until(lambda d: len(d.find_elements(by=by, value=selector)) > current_elements_count)
+                self.wait_until(wait_time,
+                                lambda d: len(d.find_elements(by=by, value=selector)) > current_elements_count)
+            except ScraperInterrupted:
+                raise
             except:
                 break
 
@@ -293,22 +557,27 @@ class Scraper:
         if not element:
             return False
 
-        logger.system_logger.debug(f'Trying to click element: {by}="{selector}", use_cursor={use_cursor}')
+        logger.system_logger.debug('Trying to click element: %s="%s", use_cursor=%s', by, selector, use_cursor)
 
         try:
             if use_cursor:
                 actions = ActionChains(self.driver)
                 actions.move_to_element(element)
-                if delay:
-                    actions.pause(self.get_action_random_delay())
+                pause = self.get_action_random_delay() if delay else 0
+                if pause:
+                    actions.pause(pause)
                 actions.click().perform()
-                logger.system_logger.info(f'Clicked element using cursor: {by}="{selector}"')
+                # The pause is done by the browser inside the action
+                tracer.add_wait(pause)
+                logger.system_logger.info('Clicked element using cursor: %s="%s"', by, selector)
             else:
                 if delay:
                     self.wait_action_random_time()
                 element.click()
-                logger.system_logger.info(f'Clicked element: {by}="{selector}"')
+                logger.system_logger.info('Clicked element: %s="%s"', by, selector)
             return True
+        except ScraperInterrupted:
+            raise
         except ElementClickInterceptedException:
             logger.system_logger.warning(f'ElementClickInterceptedException: fallback to JS click: {by}="{selector}"')
             try:
@@ -347,25 +616,136 @@ class Scraper:
 
         element.send_keys(text)
 
+    # Wait random time before inserting the text to the element
+    def element_insert_text(self,
+                            text: str,
+                            selector: str,
+                            by: str = By.CSS_SELECTOR,
+                            delay: bool = True,
+                            exit_on_missing_element: bool = True) -> bool:
+        """
+        Insert the whole text at once, like pasting it. The browser fires the input events, so React forms see
+        the value. It is much faster than send_keys for long texts and keeps emoji which send_keys can't type.
+        If the value of the element is different after inserting, the text is typed by send_keys.
+
+        :return: True if the element has the text
+        """
+        if delay:
+            self.wait_action_random_time()
+
+        element = self.find_element(selector=selector,
+                                    exit_on_missing_element=exit_on_missing_element,
+                                    by=by)
+        if not element:
+            return False
+
+        try:
+            element.click()
+        except ElementClickInterceptedException:
+            self.driver.execute_script("arguments[0].click();", element)
+
+        self.check_deadline(f'inserting text to {selector}')
+        try:
+            self.driver.execute_cdp_cmd('Input.insertText', {'text': text})
+        except (WebDriverException, AttributeError) as e:
+            logger.system_logger.info(f'Text can\'t be inserted, it is typed: {e}')
+            element.send_keys(text)
+            return self.is_element_text_equal(element, text)
+
+        if self.is_element_text_equal(element, text):
+            return True
+
+        logger.system_logger.warning(f'Inserted text is different in the element {selector}, it is typed again')
+        self.clear_element_text(element)
+        element.send_keys(text)
+        is_equal = self.is_element_text_equal(element, text)
+        if not is_equal:
+            logger.system_logger.error(f'Text of the element {selector} is different from the entered text')
+        return is_equal
+
+    def clear_element_text(self, element: WebElement) -> None:
+        # Ctrl+A doesn't select the text on macOS, the value of inputs and text of contenteditable elements is reset
+        element.clear()
+        self.driver.execute_script(
+            'if (arguments[0].value !== undefined) { arguments[0].value = ""; } else { arguments[0].innerText = ""; }',
+            element)
+
+    def is_element_text_equal(self, element: WebElement, text: str) -> bool:
+        # Value of inputs and textareas, text of contenteditable elements
+        value = self.driver.execute_script(
+            'return arguments[0].value !== undefined ? arguments[0].value : arguments[0].innerText;', element)
+        # Editors may change line breaks and spaces
+        return ' '.join((value or '').split()) == ' '.join(text.split())
+
     def input_file_add_files(self, selector, files):
         # Initialize the condition to wait
         wait_until = EC.presence_of_element_located((By.CSS_SELECTOR, selector))
 
         try:
             # Wait for input_file to load
-            input_file = WebDriverWait(self.driver, self.wait_element_time).until(wait_until)
-        except:
-            print('ERROR: Timed out waiting for the input_file with selector "' + selector + '" to load')
-            # End the program execution because we cannot find the input_file
-            exit()
+            input_file = self.wait_until(self.get_wait_time(self.wait_element_time, f'finding file input {selector}'),
+                                         wait_until)
+        except TimeoutException:
+            # The wait was cut by the deadline, so give up the whole work instead of the input only
+            self.check_deadline(f'finding file input {selector}')
+            raise RuntimeError(f'Timed out waiting for the file input with selector "{selector}" to load')
 
         self.wait_action_random_time()
 
         try:
             input_file.send_keys(files)
-        except InvalidArgumentException:
-            print('ERROR: Exiting from the program! Please check if these file paths are correct:\n' + files)
-            exit()
+        except InvalidArgumentException as e:
+            raise RuntimeError(f'Files can\'t be added, check if these file paths are correct:\n{files}') from e
+
+    def wait_for_uploads(self,
+                         files: list[str],
+                         thumbnail_selector: str,
+                         progress_selector: str,
+                         by: str = By.CSS_SELECTOR,
+                         baseline: int = 0,
+                         timeout: float = CONFIG['scraper']['photo_upload']['timeout'],
+                         settle_time: float = CONFIG['scraper']['photo_upload']['settle_time'],
+                         poll_interval: float = 0.5) -> UploadResult:
+        """
+        Wait till the attached files are uploaded: a thumbnail is shown for every file and no progress indicator
+        is left. Files are matched to thumbnails by order, like the form shows them.
+        If the count of thumbnails doesn't grow for the settle time without progress indicators,
+        the rest of the files are rejected.
+
+        :param baseline: Count of the thumbnails which were shown before attaching the files
+        """
+        result = UploadResult(files=list(files))
+        started_at = time.monotonic()
+        changed_at = started_at
+        while True:
+            self.check_deadline('waiting for uploads')
+            now = time.monotonic()
+            thumbnails_count = len(self.driver.find_elements(by=by, value=thumbnail_selector)) - baseline
+            thumbnails_count = max(min(thumbnails_count, len(files)), 0)
+            in_progress_count = len(self.driver.find_elements(by=by, value=progress_selector))
+
+            while len(result.upload_times) < thumbnails_count:
+                result.upload_times.append(now - started_at)
+                changed_at = now
+            if in_progress_count:
+                changed_at = now
+
+            if thumbnails_count >= len(files) and not in_progress_count:
+                break
+            if now - changed_at >= settle_time:
+                break
+            if now - started_at >= timeout:
+                result.is_timed_out = True
+                break
+            self.sleep(poll_interval)
+
+        result.total_time = time.monotonic() - started_at
+        logger.system_logger.info(
+            f'Uploaded {len(result.accepted)} of {len(files)} files in {result.total_time:.1f}s'
+            + (f', per file: {", ".join(f"{t:.1f}s" for t in result.upload_times)}' if result.upload_times else '')
+            + (f', rejected: {", ".join(result.rejected)}' if result.rejected else '')
+            + (', timed out' if result.is_timed_out else ''))
+        return result
 
     # Wait random time before clearing the element
     def element_clear(self, selector: str, delay: bool = True, exit_on_missing_element: bool = True):
@@ -402,15 +782,18 @@ class Scraper:
             :param by: Type of selector (By.XPATH, By.CSS_SELECTOR, etc.)
             :param condition: Expected condition to wait for (default: invisibility_of_element_located)
             """
-        logger.system_logger.debug(f"Waiting for element to be invisible: {by}='{selector}'")
+        logger.system_logger.debug("Waiting for element to be invisible: %s='%s'", by, selector)
 
+        wait_element_time = self.get_wait_time(self.wait_element_time, f"waiting invisibility {by}='{selector}'")
         try:
             wait_until = condition((by, selector))
-            WebDriverWait(self.driver, self.wait_element_time).until(wait_until)
-            logger.system_logger.debug(f"Element is now invisible: {by}='{selector}'")
+            self.wait_until(wait_element_time, wait_until)
+            logger.system_logger.debug("Element is now invisible: %s='%s'", by, selector)
+        except ScraperInterrupted:
+            raise
         except TimeoutException:
             logger.system_logger.warning(
-                f"Timeout: Element still visible after {self.wait_element_time}s: {by}='{selector}'")
+                f"Timeout: Element still visible after {wait_element_time}s: {by}='{selector}'")
         except WebDriverException as e:
             logger.system_logger.error(f"WebDriver error while waiting invisibility: {e}", exc_info=True)
         except Exception as e:
@@ -435,7 +818,7 @@ class Scraper:
         if not element:
             return
 
-        logger.system_logger.debug(f"Try scrolling to element: {by}='{selector}'")
+        logger.system_logger.debug("Try scrolling to element: %s='%s'", by, selector)
 
         # Try ActionChains first (user-like scroll)
         try:
@@ -448,7 +831,7 @@ class Scraper:
         # Fallback: JS scrollIntoView
         try:
             scroll_config = '{behavior: "auto", block: "start", inline: "nearest"}'
-            logger.system_logger.debug(f'Falling back to JS scrollIntoView with {scroll_config}')
+            logger.system_logger.debug('Falling back to JS scrollIntoView with %s', scroll_config)
             self.driver.execute_script(f'arguments[0].scrollIntoView({scroll_config});', element)
         except Exception as e:
             logger.system_logger.error(f"Both scroll methods failed: {e}", exc_info=True)
@@ -471,6 +854,7 @@ class ScraperDriverManager:
         self.driver_options = driver_options
         self.driver = driver
         self.tabs = tabs
+        self.startup_timings: dict[str, float] = {}
 
         if not self.driver_options:
             self.setup_driver_options()
@@ -489,9 +873,14 @@ class ScraperDriverManager:
                                                     {'profile.default_content_setting_values.notifications': 2})
 
     def setup_driver(self) -> None:
-        chrome_driver = ChromeService(ChromeDriverManager().install())
+        started_at = time.perf_counter()
+        chrome_driver = ChromeService(resolve_chromedriver_path())
+        self.startup_timings['driver_resolve'] = time.perf_counter() - started_at
+
+        started_at = time.perf_counter()
         self.driver = webdriver.Chrome(service=chrome_driver, options=self.driver_options)
         self.driver.maximize_window()
+        self.startup_timings['chrome_launch'] = time.perf_counter() - started_at
 
     def setup_tabs(self) -> None:
         self.tabs = {}
@@ -512,7 +901,7 @@ class ScraperDriverManager:
             tab_alias = f'tab_{len(self.tabs)}'
 
         if tab_alias in self.tabs.keys() and self.tabs[tab_alias] in self.driver.window_handles:
-            self.switch_to_tab(self.tabs[tab_alias])
+            self.switch_to_tab(tab_alias)
             return
 
         try:
@@ -534,6 +923,39 @@ class ScraperDriverManager:
     def switch_to_tab(self, tab_alias: str) -> None:
         self.driver.switch_to.window(self.tabs[tab_alias])
 
+    def close_tab(self, tab_alias: str) -> None:
+        handle = self.tabs.pop(tab_alias, None)
+        if not handle:
+            return
+
+        try:
+            self.driver.switch_to.window(handle)
+            self.driver.close()
+        except WebDriverException:
+            pass
+
+    def is_tab_alive(self, tab_alias: str) -> bool:
+        handle = self.tabs.get(tab_alias)
+        if not handle:
+            return False
+
+        try:
+            if handle not in self.driver.window_handles:
+                return False
+            self.driver.switch_to.window(handle)
+            self.driver.execute_script("return 1;")
+            return True
+        except WebDriverException:
+            return False
+
+    def quit(self) -> None:
+        try:
+            self.driver.quit()
+        except Exception as e:
+            logger.system_logger.warning(f'Error while quitting driver: {e}')
+        self.driver = None
+        self.setup_tabs()
+
     def _get_first_alive_tab(self) -> str | None:
         for alias, handle in self.tabs.items():
             try:
@@ -543,3 +965,191 @@ class ScraperDriverManager:
             except:
                 continue
         return None
+
+
+class ScraperSessionSupervisor:
+    """
+    Keeps the long-lived browser session of ScraperDriverManager usable between jobs.
+
+    Before each job the driver is pinged and the registered tabs are checked. A dead tab is reopened,
+    and if the browser itself doesn't respond, Chrome is restarted and all registered tabs are restored.
+    """
+
+    def __init__(self, driver_manager: ScraperDriverManager, tabs_urls: dict[str, str] | None = None):
+        self.driver_manager = driver_manager
+        self.tabs_urls = tabs_urls or {}
+
+    def register_tab(self, tab_alias: str, url: str) -> None:
+        self.tabs_urls[tab_alias] = url
+
+    def is_driver_alive(self) -> bool:
+        if not self.driver_manager.driver:
+            return False
+
+        try:
+            return bool(self.driver_manager.driver.window_handles)
+        except Exception as e:
+            logger.system_logger.warning(f'Browser does not respond: {e}')
+            return False
+
+    def ensure_session(self, active_tab_alias: str | None = None) -> bool:
+        """
+        Check the browser and its tabs and recover them if something is wrong.
+
+        :param active_tab_alias: Tab which should be active after the check
+        :return: True if the browser was restarted, otherwise False
+        """
+
+        restarted = False
+
+        if not self.is_driver_alive():
+            self.restart_browser()
+            restarted = True
+        else:
+            for tab_alias in self.tabs_urls:
+                if self.driver_manager.is_tab_alive(tab_alias):
+                    continue
+
+                logger.system_logger.warning(f'Tab "{tab_alias}" is not alive, reopen it')
+                self.driver_manager.close_tab(tab_alias)
+                if not self.driver_manager._get_first_alive_tab():
+                    self.restart_browser()
+                    restarted = True
+                    break
+                self.restore_tab(tab_alias)
+
+        if active_tab_alias and active_tab_alias in self.driver_manager.tabs:
+            self.driver_manager.switch_to_tab(active_tab_alias)
+
+        return restarted
+
+    def restart_browser(self) -> None:
+        logger.system_logger.warning('Restart browser')
+
+        started_at = time.perf_counter()
+        self.driver_manager.quit()
+        self.driver_manager.setup_driver()
+        for tab_alias in self.tabs_urls:
+            self.restore_tab(tab_alias)
+
+        logger.system_logger.info(f'Browser restarted in {time.perf_counter() - started_at:.2f}s')
+
+    def restore_tab(self, tab_alias: str) -> None:
+        self.driver_manager.create_tab(tab_alias)
+        url = self.tabs_urls.get(tab_alias)
+        if url:
+            self.driver_manager.driver.get(url)
+
+    def recycle_tab(self, tab_alias: str) -> None:
+        """
+        Close the tab and open it again, so the renderer with all memory of the page is released.
+        """
+        logger.system_logger.info(f'Recycle tab "{tab_alias}"')
+
+        # Open the new tab before closing the old one, so the browser always has a window
+        old_handle = self.driver_manager.tabs.pop(tab_alias, None)
+        self.restore_tab(tab_alias)
+        if old_handle:
+            try:
+                self.driver_manager.driver.switch_to.window(old_handle)
+                self.driver_manager.driver.close()
+            except WebDriverException:
+                pass
+        self.driver_manager.switch_to_tab(tab_alias)
+
+
+class ScraperMemoryWatchdog:
+    """
+    Samples memory of the browser between listings and recycles the tab or the whole browser
+    when the thresholds are crossed.
+
+    - JS heap of the tab (CDP Performance.getMetrics) over js_heap_limit_mb - the tab is recycled
+    - RSS of all Chrome processes over rss_limit_mb - the browser is restarted
+    """
+
+    def __init__(self,
+                 session_supervisor: ScraperSessionSupervisor,
+                 tab_alias: str = 'facebook',
+                 js_heap_limit_mb: float | None = None,
+                 rss_limit_mb: float | None = None):
+        self.session_supervisor = session_supervisor
+        self.tab_alias = tab_alias
+
+        watchdog_config = CONFIG['scraper'].get('memory_watchdog', {})
+        self.js_heap_limit_mb = js_heap_limit_mb or watchdog_config.get('js_heap_limit_mb')
+        self.rss_limit_mb = rss_limit_mb or watchdog_config.get('rss_limit_mb')
+
+    @property
+    def driver(self) -> webdriver.Chrome:
+        return self.session_supervisor.driver_manager.driver
+
+    def get_chrome_rss_mb(self) -> float | None:
+        try:
+            chromedriver_process = psutil.Process(self.driver.service.process.pid)
+            processes = chromedriver_process.children(recursive=True)
+        except (AttributeError, psutil.Error) as e:
+            logger.system_logger.warning(f'Cant get Chrome processes: {e}')
+            return None
+
+        rss = 0
+        for process in processes:
+            try:
+                rss += process.memory_info().rss
+            except psutil.Error:
+                continue
+        return rss / 1024 / 1024
+
+    def get_js_heap_mb(self) -> tuple[float | None, float | None]:
+        try:
+            self.driver.execute_cdp_cmd('Performance.enable', {})
+            metrics = self.driver.execute_cdp_cmd('Performance.getMetrics', {}).get('metrics', [])
+        except WebDriverException as e:
+            logger.system_logger.warning(f'Cant get performance metrics: {e}')
+            return None, None
+
+        metrics = {metric['name']: metric['value'] for metric in metrics}
+        used = metrics.get('JSHeapUsedSize')
+        total = metrics.get('JSHeapTotalSize')
+        return (used / 1024 / 1024 if used is not None else None,
+                total / 1024 / 1024 if total is not None else None)
+
+    def sample(self) -> dict[str, float | None]:
+        js_heap_used_mb, js_heap_total_mb = self.get_js_heap_mb()
+        sample = {
+            'chrome_rss_mb': self.get_chrome_rss_mb(),
+            'js_heap_used_mb': js_heap_used_mb,
+            'js_heap_total_mb': js_heap_total_mb,
+        }
+        logger.system_logger.info('Memory sample: ' + ', '.join(
+            f'{k}={v:.1f}' if v is not None else f'{k}=n/a' for k, v in sample.items()))
+        return sample
+
+    def check(self, scraper: Scraper | None = None) -> str | None:
+        """
+        Sample memory and recycle tab or browser if it is needed.
+
+        :param scraper: Scraper which works in the watched tab, it gets the new driver after browser restart
+        :return: 'browser' or 'tab' if something was recycled, otherwise None
+        """
+
+        sample = self.sample()
+
+        action = None
+        if self.rss_limit_mb and (sample['chrome_rss_mb'] or 0) > self.rss_limit_mb:
+            logger.system_logger.warning(f'Chrome RSS {sample["chrome_rss_mb"]:.1f}MB is over the limit '
+                                         f'{self.rss_limit_mb}MB, restart browser')
+            self.session_supervisor.restart_browser()
+            action = 'browser'
+        elif self.js_heap_limit_mb and (sample['js_heap_used_mb'] or 0) > self.js_heap_limit_mb:
+            logger.system_logger.warning(f'JS heap {sample["js_heap_used_mb"]:.1f}MB is over the limit '
+                                         f'{self.js_heap_limit_mb}MB, recycle tab "{self.tab_alias}"')
+            self.session_supervisor.recycle_tab(self.tab_alias)
+            action = 'tab'
+
+        if action:
+            self.session_supervisor.driver_manager.switch_to_tab(self.tab_alias)
+            if scraper:
+                scraper.reattach_driver(self.driver, reload_cookies=action == 'browser')
+            self.sample()
+
+        return action
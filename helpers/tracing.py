@@ -0,0 +1,305 @@
+import dataclasses
+import datetime
+import functools
+import glob
+import itertools
+import json
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+
+from config import CONFIG
+from logger import system_logger
+
+SPAN_RUN = 'run'
+SPAN_LISTING = 'listing'
+SPAN_STEP = 'step'
+SPAN_WAIT = 'wait'
+SPAN_WEBDRIVER = 'webdriver'
+
+
+@dataclasses.dataclass
+class Span:
+    span_id: int
+    parent_id: int | None
+    name: str
+    kind: str = SPAN_STEP
+    # Seconds since the start of the run
+    started_at: float = 0.0
+    duration: float = 0.0
+    # Part of the duration spent in sleeps and waits for elements, the rest is spent in actions
+    wait_time: float = 0.0
+    outcome: str = 'ok'
+    error: str | None = None
+    attributes: dict = dataclasses.field(default_factory=dict)
+    # Span is opened by Tracer.step and closed by the next step or the end of its parent
+    is_step: bool = dataclasses.field(default=False, repr=False)
+
+    @property
+    def action_time(self) -> float:
+        return max(self.duration - self.wait_time, 0.0)
+
+    def to_json(self) -> dict:
+        data = dataclasses.asdict(self)
+        data.pop('is_step')
+        data['action_time'] = self.action_time
+        return data
+
+
+@dataclasses.dataclass
+class SpanSummary:
+    name: str
+    kind: str
+    count: int = 0
+    total_time: float = 0.0
+    wait_time: float = 0.0
+    action_time: float = 0.0
+    max_time: float = 0.0
+    errors: int = 0
+
+    @property
+    def average_time(self) -> float:
+        return self.total_time / self.count if self.count else 0.0
+
+
+class Tracer:
+    """
+    Spans of one run: listings, high level steps and WebDriver commands, with wall, wait and action time.
+    Finished spans are written to a JSONL file of the run. Spans are only recorded in the thread which
+    started the run, other threads and calls out of a run cost nothing.
+
+    WebDriver commands inside a wait (e.g. polls of WebDriverWait) are counted on the wait, not written one by one.
+    """
+
+    def __init__(self, folder: str, enabled: bool = True, keep_runs: int = 20):
+        self.folder = folder
+        self.enabled = enabled
+        self.keep_runs = keep_runs
+        self.file_path: str | None = None
+        self._file = None
+        self._thread_id: int | None = None
+        self._stack: list[Span] = []
+        self._ids = itertools.count(1)
+        self._started_at = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def is_active(self) -> bool:
+        return self._file is not None and threading.get_ident() == self._thread_id
+
+    def start_run(self, name: str, **attributes) -> str | None:
+        """
+        :return: Path of the file of the run, None if tracing is disabled
+        """
+        if not self.enabled:
+            return None
+        if self._file is not None:
+            self.finish_run(outcome='interrupted')
+
+        os.makedirs(self.folder, exist_ok=True)
+        started_at = datetime.datetime.now()
+        file_name = re.sub(r'\W+', '_', name)
+        self.file_path = os.path.join(self.folder, f'{started_at:%Y%m%d_%H%M%S}_{file_name}.jsonl')
+        self._file = open(self.file_path, 'w', encoding='utf-8')
+        self._thread_id = threading.get_ident()
+        self._ids = itertools.count(1)
+        self._started_at = time.perf_counter()
+        self._stack = [Span(span_id=next(self._ids), parent_id=None, name=name, kind=SPAN_RUN,
+                            attributes={'started_at': started_at.isoformat(timespec='seconds'), **attributes})]
+        self._remove_old_runs()
+        return self.file_path
+
+    def finish_run(self, outcome: str = 'ok', error: str | None = None) -> None:
+        if self._file is None:
+            return
+        while self._stack:
+            span = self._stack[-1]
+            self._close(span, outcome=outcome, error=error)
+        with self._lock:
+            self._file.close()
+            self._file = None
+            self._thread_id = None
+        system_logger.info(f'Trace of the run is saved to {self.file_path}')
+
+    @contextmanager
+    def span(self, name: str, kind: str = SPAN_STEP, **attributes):
+        """
+        Span of the block. Yields the span, its outcome can be set in the block.
+        An exception out of the block is recorded as the error outcome.
+        """
+        if not self.is_active:
+            yield Span(span_id=0, parent_id=None, name=name, kind=kind, attributes=attributes)
+            return
+
+        span = self._open(name, kind, attributes)
+        try:
+            yield span
+        except BaseException as e:
+            self._close(span, outcome='error', error=f'{type(e).__name__}: {e}')
+            raise
+        else:
+            self._close(span)
+
+    def step(self, name: str, **attributes) -> Span | None:
+        """
+        Start the next step of the current span: the previous step is finished.
+        The last step is finished with its parent span.
+        """
+        if not self.is_active:
+            return None
+        if self._stack[-1].is_step:
+            self._close(self._stack[-1])
+        span = self._open(name, SPAN_STEP, attributes)
+        span.is_step = True
+        return span
+
+    @contextmanager
+    def wait(self, name: str, **attributes):
+        # The whole time of the block is wait time of the span and its parents
+        with self.span(name, kind=SPAN_WAIT, **attributes) as span:
+            yield span
+
+    def add_wait(self, seconds: float) -> None:
+        # Wait which is a part of an action, e.g. a pause in the cursor movement
+        if not self.is_active:
+            return
+        for span in self._get_open_spans_till_wait():
+            span.wait_time += seconds
+
+    def record_command(self, command: str, started_at: float, params: dict | None = None,
+                       error: BaseException | None = None) -> None:
+        if not self.is_active:
+            return
+        duration = time.perf_counter() - started_at
+        parent = self._stack[-1]
+        if parent.kind == SPAN_WAIT:
+            parent.attributes['commands'] = parent.attributes.get('commands', 0) + 1
+            return
+
+        span = Span(span_id=next(self._ids), parent_id=parent.span_id, name=command, kind=SPAN_WEBDRIVER,
+                    started_at=started_at - self._started_at, duration=duration)
+        if params and 'using' in params and 'value' in params:
+            span.attributes['selector'] = str(params['value'])[:200]
+        if error:
+            span.outcome = 'error'
+            span.error = f'{type(error).__name__}: {str(error).splitlines()[0] if str(error) else ""}'
+        self._write(span)
+
+    def trace_driver(self, driver) -> None:
+        """
+        Record every command of the driver and its elements, they all go through driver.execute.
+        """
+        if not self.enabled or getattr(driver, '_is_traced', False):
+            return
+        execute = driver.execute
+
+        @functools.wraps(execute)
+        def traced_execute(driver_command, params=None):
+            if not self.is_active:
+                return execute(driver_command, params)
+            started_at = time.perf_counter()
+            try:
+                result = execute(driver_command, params)
+            except BaseException as e:
+                self.record_command(driver_command, started_at, params, error=e)
+                raise
+            self.record_command(driver_command, started_at, params)
+            return result
+
+        driver.execute = traced_execute
+        driver._is_traced = True
+
+    def _open(self, name: str, kind: str, attributes: dict) -> Span:
+        span = Span(span_id=next(self._ids), parent_id=self._stack[-1].span_id, name=name, kind=kind,
+                    started_at=time.perf_counter() - self._started_at, attributes=attributes)
+        self._stack.append(span)
+        return span
+
+    def _close(self, span: Span, outcome: str | None = None, error: str | None = None) -> None:
+        # Span is already closed by the end of the run
+        if not any(open_span is span for open_span in self._stack):
+            return
+        # Steps opened inside the span end with it
+        while self._stack[-1] is not span:
+            self._close(self._stack[-1], outcome=outcome, error=error)
+
+        span.duration = time.perf_counter() - self._started_at - span.started_at
+        if outcome and span.outcome == 'ok':
+            span.outcome = outcome
+        if error and not span.error:
+            span.error = error
+        if span.kind == SPAN_WAIT:
+            span.wait_time = span.duration
+        self._stack.pop()
+        if span.kind == SPAN_WAIT:
+            for parent in self._get_open_spans_till_wait():
+                parent.wait_time += span.duration
+        self._write(span)
+
+    def _get_open_spans_till_wait(self) -> list[Span]:
+        # Wait of a nested wait is already counted by the outer wait
+        spans = []
+        for span in reversed(self._stack):
+            if span.kind == SPAN_WAIT:
+                break
+            spans.append(span)
+        return spans
+
+    def _write(self, span: Span) -> None:
+        with self._lock:
+            if self._file is not None:
+                self._file.write(json.dumps(span.to_json(), ensure_ascii=False, default=str) + '\n')
+
+    def _remove_old_runs(self) -> None:
+        for file_path in get_run_files(self.folder)[self.keep_runs:]:
+            try:
+                os.remove(file_path)
+            except OSError as e:
+                system_logger.warning(f'Cant remove old trace {file_path}: {e}')
+
+
+def get_run_files(folder: str) -> list[str]:
+    """
+    :return: Trace files of the runs, the latest first
+    """
+    return sorted(glob.glob(os.path.join(folder, '*.jsonl')), reverse=True)
+
+
+def load_spans(file_path: str) -> list[Span]:
+    spans = []
+    with open(file_path, encoding='utf-8') as f:
+        for line in f:
+            try:
+                data = json.loads(line)
+            except ValueError:
+                # The last line of the run which is in progress may be partly written
+                continue
+            data.pop('action_time', None)
+            spans.append(Span(**data))
+    return spans
+
+
+def summarize_spans(spans: list[Span], kinds: tuple[str, ...] = (SPAN_LISTING, SPAN_STEP, SPAN_WAIT,
+                                                                   SPAN_WEBDRIVER)) -> list[SpanSummary]:
+    """
+    :return: Time of the spans by name, the longest first
+    """
+    summaries: dict[tuple[str, str], SpanSummary] = {}
+    for span in spans:
+        if span.kind not in kinds:
+            continue
+        summary = summaries.setdefault((span.kind, span.name), SpanSummary(name=span.name, kind=span.kind))
+        summary.count += 1
+        summary.total_time += span.duration
+        summary.wait_time += span.wait_time
+        summary.action_time += span.action_time
+        summary.max_time = max(summary.max_time, span.duration)
+        summary.errors += span.outcome == 'error'
+    return sorted(summaries.values(), key=lambda summary: -summary.total_time)
+
+
+tracer = Tracer(folder=CONFIG['tracing']['folder'],
+                enabled=CONFIG['tracing']['enabled'],
+                keep_runs=CONFIG['tracing']['keep_runs'])
@@ -1,29 +1,118 @@
+import atexit
 import logging
+import queue
+import time
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
 
-from config import CONFIG_LOG_USER_FILE_PATH, CONFIG_LOG_SYSTEM_FILE_PATH
+from config import CONFIG, CONFIG_LOG_USER_FILE_PATH, CONFIG_LOG_SYSTEM_FILE_PATH
+
+LOG_MAX_BYTES = 10 * 1024 * 1024
+LOG_BACKUP_COUNT = 5
+
+
+class MeasuredQueueHandler(QueueHandler):
+    """
+    Puts records to the queue without formatting them, so the message, the traceback and the disk I/O
+    are handled by the background listener and the calling thread only pays for putting the record to the queue.
+    Time spent by callers is measured.
+    """
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.emit_time = 0.0
+        self.emit_count = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Records don't leave the process, so they don't need to be formatted and pickle-safe here
+        return record
+
+    def emit(self, record: logging.LogRecord) -> None:
+        started_at = time.perf_counter()
+        super().emit(record)
+        self.emit_time += time.perf_counter() - started_at
+        self.emit_count += 1
+
+
+class MeasuredQueueListener(QueueListener):
+    """
+    Writes records from the queue by the handlers in the background thread and measures the time of it.
+    """
+
+    def __init__(self, log_queue: queue.Queue, *handlers: logging.Handler):
+        super().__init__(log_queue, *handlers, respect_handler_level=True)
+        self.handle_time = 0.0
+
+    def handle(self, record: logging.LogRecord) -> None:
+        started_at = time.perf_counter()
+        super().handle(record)
+        self.handle_time += time.perf_counter() - started_at
 
-# --- USER Logger ---
-user_logger = logging.getLogger("user")
-user_logger.setLevel(logging.INFO)
 
-user_handler = logging.FileHandler(CONFIG_LOG_USER_FILE_PATH, encoding="utf-8")
-user_handler.setLevel(logging.INFO)
-user_handler.setFormatter(logging.Formatter(fmt='[%(asctime)s] %(message)s', datefmt='%H:%M:%S'))
+def setup_logger(name: str, level: int, file_path: str, formatter: logging.Formatter,
+                 log_config: dict) -> tuple[logging.Logger, MeasuredQueueHandler | None, MeasuredQueueListener | None]:
+    result_logger = logging.getLogger(name)
+    result_logger.setLevel(level)
 
-if not user_logger.hasHandlers():
-    user_logger.addHandler(user_handler)
-    user_logger.propagate = False  # чтобы не улетало в root
+    if result_logger.hasHandlers():
+        return result_logger, None, None
+
+    file_handler = RotatingFileHandler(file_path,
+                                       maxBytes=log_config.get('max_bytes', LOG_MAX_BYTES),
+                                       backupCount=log_config.get('backup_count', LOG_BACKUP_COUNT),
+                                       encoding='utf-8')
+    file_handler.setLevel(level)
+    file_handler.setFormatter(formatter)
+
+    log_queue = queue.Queue()
+    queue_handler = MeasuredQueueHandler(log_queue)
+    queue_listener = MeasuredQueueListener(log_queue, file_handler)
+    queue_listener.start()
+    atexit.register(queue_listener.stop)
+
+    result_logger.addHandler(queue_handler)
+    result_logger.propagate = False  # чтобы не улетало в root
+
+    return result_logger, queue_handler, queue_listener
+
+
+# --- USER Logger ---
+user_logger, user_queue_handler, user_queue_listener = setup_logger(
+    name='user',
+    level=logging.INFO,
+    file_path=CONFIG_LOG_USER_FILE_PATH,
+    formatter=logging.Formatter(fmt='[%(asctime)s] %(message)s', datefmt='%H:%M:%S'),
+    log_config=CONFIG['log']['user'])
 
 # --- SYSTEM Logger ---
-system_logger = logging.getLogger("system")
-system_logger.setLevel(logging.DEBUG)
-
-system_handler = logging.FileHandler(CONFIG_LOG_SYSTEM_FILE_PATH, encoding="utf-8")
-system_handler.setLevel(logging.DEBUG)
-system_handler.setFormatter(
-    logging.Formatter(fmt='[%(asctime)s] %(levelname)s in %(funcName)s (%(filename)s:%(lineno)d): %(message)s',
-                      datefmt='%Y-%m-%d %H:%M:%S'))
-
-if not system_logger.hasHandlers():
-    system_logger.addHandler(system_handler)
-    system_logger.propagate = False
+system_logger, system_queue_handler, system_queue_listener = setup_logger(
+    name='system',
+    level=logging.DEBUG,
+    file_path=CONFIG_LOG_SYSTEM_FILE_PATH,
+    formatter=logging.Formatter(
+        fmt='[%(asctime)s] %(levelname)s in %(funcName)s (%(filename)s:%(lineno)d): %(message)s',
+        datefmt='%Y-%m-%d %H:%M:%S'),
+    log_config=CONFIG['log']['system'])
+
+
+def get_logging_stats() -> dict[str, float]:
+    """
+    Return time spent on logging since the previous reset:
+    by the calling threads (putting records to the queue) and by the background writers (formatting and disk I/O).
+    """
+    queue_handlers = [h for h in (user_queue_handler, system_queue_handler) if h]
+    queue_listeners = [l for l in (user_queue_listener, system_queue_listener) if l]
+    return {
+        'records': sum(h.emit_count for h in queue_handlers),
+        'caller_time': sum(h.emit_time for h in queue_handlers),
+        'writer_time': sum(l.handle_time for l in queue_listeners),
+    }
+
+
+def reset_logging_stats() -> None:
+    for queue_handler in (user_queue_handler, system_queue_handler):
+        if queue_handler:
+            queue_handler.emit_time = 0.0
+            queue_handler.emit_count = 0
+    for queue_listener in (user_queue_listener, system_queue_listener):
+        if queue_listener:
+            queue_listener.handle_time = 0.0
@@ -1,29 +1,87 @@
+import time
+
+STARTUP_STARTED_AT = time.perf_counter()
+
 import asyncio
 import datetime
 import os
 import threading
-from queue import SimpleQueue, Empty
-from typing import Any
+from typing import Any, Callable
 
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.triggers.cron import CronTrigger
 from nicegui import ui, app, Client
 from nicegui.events import ValueChangeEventArguments
 
-from config import CONFIG_LOG_USER_FILE_PATH, CONFIG_LOG_SYSTEM_FILE_PATH, CONFIG_DATA_PATH, CONFIG, save_config
+from config import CONFIG_LOG_USER_FILE_PATH, CONFIG_LOG_SYSTEM_FILE_PATH, CONFIG_DATA_PATH, CONFIG, save_config, \
+    CONFIG_DEALER_LICENSE_ID
+from helpers.browser_worker import BrowserWorker, BrowserJob, JobState
 from helpers.csv_helper import get_data_from_csv
-from helpers.data_helper import import_data_to_csv
+from helpers.data_helper import import_data_to_csv, get_feed_summary
+from helpers.idle_tasks import IdleTaskScheduler
+from helpers.job_coordinator import JobCoordinator, ListingPipeline
+from helpers.ledger_helper import PublicationLedger
 from helpers.listing_helper import check_and_update_listings, check_and_remove_listings
-from helpers.scraper import Scraper, ScraperDriverManager
-from logger import system_logger
+from helpers.log_tailer import LogTailer
+from helpers.model import Listing
+from helpers.partition_helper import PartitionFilter, get_partition_run, run_scheduled_cycle
+from helpers.priority_helper import ListingPriority
+from helpers.progress import RunProgress
+from helpers.publish_queue import PublishQueue
+from helpers.scraper import Scraper, ScraperDriverManager, ScraperSessionSupervisor, ScraperMemoryWatchdog, \
+    CircuitBreakerOpen, JobCancelled
+from helpers.tracing import tracer, get_run_files, load_spans, summarize_spans, SPAN_LISTING
+from logger import system_logger, get_logging_stats, reset_logging_stats
+
+GUI_URL = 'http://localhost:8080'
+FACEBOOK_SELLING_URL = 'https://facebook.com/marketplace/you/selling'
+LOG_VIEW_MAX_LINES = 1000
+PUBLISH_JOB_NAME = 'publish'
+DUE_ITEMS_SHOWN = 5
+TRACE_SUMMARY_ROWS = 30
+TRACE_SUMMARY_COLUMNS = ['kind', 'name', 'count', 'total, s', 'wait, s', 'action, s', 'max, s', 'errors']
+TRACE_LISTINGS_COLUMNS = ['listing', 'started, s', 'total, s', 'wait, s', 'action, s', 'outcome']
 
 scraper_driver_manager: ScraperDriverManager | None = None
+scraper_session_supervisor: ScraperSessionSupervisor | None = None
+scraper_memory_watchdog: ScraperMemoryWatchdog | None = None
 scraper: Scraper | None = None
 scheduler: AsyncIOScheduler | None = None
+browser_worker: BrowserWorker | None = None
+publication_ledger: PublicationLedger | None = None
+publish_queue: PublishQueue | None = None
+job_coordinator = JobCoordinator()
+
+gui_server_started = threading.Event()
+
+
+class StartupTimer:
+    _timings: dict[str, float] = {}
+    _last_mark_at: float = STARTUP_STARTED_AT
+
+    @classmethod
+    def mark(cls, stage: str, duration: float | None = None) -> None:
+        now = time.perf_counter()
+        cls._timings[stage] = duration if duration is not None else now - cls._last_mark_at
+        cls._last_mark_at = now
+
+    @classmethod
+    def log(cls) -> None:
+        breakdown = ', '.join(f'{stage} {duration:.2f}s' for stage, duration in cls._timings.items())
+        total = time.perf_counter() - STARTUP_STARTED_AT
+        system_logger.info(f'Startup time breakdown: {breakdown} (total {total:.2f}s)')
 
 
 class NotifyBin:
-    _queue: SimpleQueue[dict[str, Any]] = SimpleQueue()
+    """
+    Delivers notifications from worker threads to all connected clients.
+    Callbacks are handed to the event loop with call_soon_threadsafe, so they are executed immediately.
+    Callbacks which are added before the event loop is started are executed on startup.
+    """
+
+    _loop: asyncio.AbstractEventLoop | None = None
+    _pending: list[tuple[Callable, tuple]] = []
+    _lock = threading.Lock()
 
     _defaults: dict[str, Any] = {
         'type': 'info',
@@ -32,23 +90,35 @@ class NotifyBin:
     }
 
     @classmethod
-    def add(cls, **kwargs):
-        cls._queue.put({**cls._defaults, **kwargs})
+    def attach_loop(cls) -> None:
+        with cls._lock:
+            cls._loop = asyncio.get_running_loop()
+            pending, cls._pending = cls._pending, []
 
-    @classmethod
-    def get(cls) -> dict[str, Any]:
-        return cls._queue.get()
+        for callback, args in pending:
+            cls._loop.call_soon(callback, *args)
 
     @classmethod
-    def empty(cls) -> bool:
-        return cls._queue.empty()
+    def call_soon(cls, callback: Callable, *args) -> None:
+        with cls._lock:
+            if cls._loop is None:
+                cls._pending.append((callback, args))
+                return
+            loop = cls._loop
+
+        loop.call_soon_threadsafe(callback, *args)
 
     @classmethod
-    def get_nowait(cls) -> dict[str, Any]:
-        try:
-            return cls._queue.get_nowait()
-        except Empty:
-            return {}
+    def add(cls, **kwargs):
+        cls.call_soon(cls._notify_clients, {**cls._defaults, **kwargs})
+
+    @staticmethod
+    def _notify_clients(kwargs: dict[str, Any]) -> None:
+        for client in Client.instances.values():
+            if not client.has_socket_connection:
+                continue
+            with client:
+                ui.notify(**kwargs)
 
 
 def launch_schedule() -> None:
@@ -58,82 +128,327 @@ def launch_schedule() -> None:
     scheduler.start()
 
 
-def launch_browser_and_open_gui() -> None:
-    global scraper, scraper_driver_manager
+async def run_browser_job(name: str, func: Callable[..., Any], *args, **kwargs) -> Any:
+    """
+    Submit the job to the browser worker and wait for its result without blocking the event loop.
+    Raises JobCancelled if the job is cancelled.
+    """
+    job = browser_worker.submit(name, func, *args, **kwargs)
+    try:
+        return await asyncio.wrap_future(job.future)
+    except asyncio.CancelledError:
+        browser_worker.cancel(job)
+        raise
 
-    launch_facebook_marketplace_bot()
+
+def get_due_items() -> tuple[str, list[tuple[str, datetime.datetime, str]]]:
+    """
+    Check the feed without downloading photos and find listings which need a run, by the publication ledger.
+
+    :return: Hash of the feed data and (title, due time, reason) of the listings, the earliest first
+    """
+    feed_hash, titles = get_feed_summary(CONFIG_DEALER_LICENSE_ID, CONFIG['data']['upload_limit'])
+    due_items = publication_ledger.get_due_items(
+        titles=titles,
+        lifetime_days=CONFIG['listing']['lifetime'],
+        retry_interval=datetime.timedelta(hours=CONFIG['ledger']['retry_interval_hours']))
+    return feed_hash, due_items
+
+
+def get_listing_priority() -> ListingPriority:
+    # Listings which need attention are imported and published first, so limited runs don't waste their slots
+    return ListingPriority(ledger=publication_ledger,
+                           lifetime_days=CONFIG['listing']['lifetime'],
+                           retry_interval=datetime.timedelta(hours=CONFIG['ledger']['retry_interval_hours']))
+
+
+def launch_browser_and_open_gui(job: BrowserJob) -> None:
+    global scraper, scraper_driver_manager, scraper_session_supervisor, scraper_memory_watchdog
 
     system_logger.info('Run browser with program UI')
 
+    # Chrome is launched at the same time with building UI and NiceGUI startup
     scraper_driver_manager = ScraperDriverManager()
+    scraper_session_supervisor = ScraperSessionSupervisor(driver_manager=scraper_driver_manager,
+                                                          tabs_urls={'gui': GUI_URL})
+    scraper_memory_watchdog = ScraperMemoryWatchdog(session_supervisor=scraper_session_supervisor,
+                                                    tab_alias='facebook')
+    for stage in ('driver_resolve', 'chrome_launch'):
+        StartupTimer.mark(stage, scraper_driver_manager.startup_timings.get(stage, 0.0))
+
+    gui_server_started.wait()
+
+    started_at = time.perf_counter()
     scraper_driver_manager.create_tab('gui')
-    scraper_driver_manager.driver.get('http://localhost:8080')
+    scraper_driver_manager.driver.get(GUI_URL)
+    StartupTimer.mark('first_page_ready', time.perf_counter() - started_at)
+    StartupTimer.log()
 
 
 def launch_facebook_marketplace_bot() -> None:
     current_log_file = CONFIG_LOG_USER_FILE_PATH
+    log_tailers = {
+        CONFIG_LOG_USER_FILE_PATH: LogTailer(CONFIG_LOG_USER_FILE_PATH, max_lines=LOG_VIEW_MAX_LINES),
+        CONFIG_LOG_SYSTEM_FILE_PATH: LogTailer(CONFIG_LOG_SYSTEM_FILE_PATH, max_lines=LOG_VIEW_MAX_LINES),
+    }
+    # Generation and sequence of the last line of the log file which is shown in the log view
+    log_view_position = (-1, 0)
 
     button_stop = None
     button_start_with_schedule = None
+    # Scheduled run, it is cancelled by "Stop" while data is being uploaded
+    upload_task: asyncio.Task | None = None
 
     async def upload_data_and_start_marketplace_bot():
+        nonlocal upload_task
+        upload_task = asyncio.current_task()
 
-        # Upload listings
-        NotifyBin.add(message='Uploading data...')
-        result = await asyncio.to_thread(import_data_to_csv, CONFIG['data']['path'], CONFIG['data']['upload_limit'])
-        if result:
+        # Cheap check of the feed and the ledger, the full cycle is run only if something is due
+        feed_hash, due_items = await asyncio.to_thread(get_due_items)
+        show_due_items(due_items)
+
+        now = datetime.datetime.now()
+        is_feed_changed = feed_hash != publication_ledger.get_state('feed_hash')
+        due_now_count = sum(1 for _, due_at, _ in due_items if due_at <= now)
+        if not is_feed_changed and not due_now_count:
+            next_due_at = due_items[0][1].strftime('%Y-%m-%d %H:%M') if due_items else 'the feed is changed'
+            system_logger.info(f'Scheduled run is skipped, feed is not changed and nothing is due till {next_due_at}')
+            return
+
+        system_logger.info(f'Scheduled run is started, feed is changed: {is_feed_changed}, '
+                           f'due listings: {due_now_count}')
+
+        # Rolling refresh: every run checks one partition of the inventory and urgent listings
+        partitions = int(CONFIG['listing'].get('partitions') or 1)
+        partition_run = get_partition_run(publication_ledger)
+        listing_filter = None
+        if partitions > 1:
+            listing_filter = PartitionFilter(
+                ledger=publication_ledger,
+                partitions=partitions,
+                partition=partition_run % partitions,
+                lifetime_days=CONFIG['listing']['lifetime'],
+                retry_interval=datetime.timedelta(hours=CONFIG['ledger']['retry_interval_hours']))
+            system_logger.info(f'Scheduled run checks partition {listing_filter.partition + 1}/{partitions}')
+
+        await run_scheduled_cycle(ledger=publication_ledger, feed_hash=feed_hash,
+                                  cycle=lambda: run_publishing_cycle(listing_filter=listing_filter))
+
+        _, due_items = await asyncio.to_thread(get_due_items)
+        show_due_items(due_items)
+
+    async def run_publishing_cycle(listing_filter: Callable[[Listing], bool] | None = None) -> bool:
+        """
+        Upload data and publish listings.
+
+        :param listing_filter: If set, only selected listings are checked and published
+        :return: True if the cycle is finished without errors
+        """
+
+        # Import or publishing is already started by the buttons, join them one by one
+        if job_coordinator.is_running('import') or job_coordinator.is_running('publish'):
+            NotifyBin.add(message='Uploading data...')
+            imported = await job_coordinator.run_import(import_data_to_csv, CONFIG['data']['path'],
+                                                        CONFIG['data']['upload_limit'])
+            notify_import_result(imported)
+            if not imported:
+                return False
+
+            NotifyBin.add(message='Publishing listings...')
+            try:
+                published = await publish_listings(listings_limit=1, listing_filter=listing_filter)
+            except (JobCancelled, CircuitBreakerOpen) as e:
+                published = e
+            notify_publish_result(published)
+            return not isinstance(published, BaseException)
+
+        # Listings are published as soon as they are imported, the browser doesn't wait for the whole import
+        NotifyBin.add(message='Uploading data and publishing listings...')
+        pipeline = ListingPipeline(order=get_listing_priority().sort)
+
+        async def publish_and_release_pipeline() -> list:
+            try:
+                return await publish_listings(listings_limit=1, pipeline=pipeline, listing_filter=listing_filter)
+            finally:
+                pipeline.release()
+
+        imported, published = await asyncio.gather(
+            job_coordinator.run_import(import_data_to_csv, CONFIG['data']['path'],
+                                       CONFIG['data']['upload_limit'], pipeline),
+            publish_and_release_pipeline(),
+            return_exceptions=True)
+        notify_import_result(imported)
+        notify_publish_result(published)
+        return not isinstance(imported, BaseException) and not isinstance(published, BaseException)
+
+    def notify_import_result(result: int | None | BaseException) -> None:
+        if isinstance(result, BaseException):
+            system_logger.error(f'Uploading data failed: {result}', exc_info=result)
+            NotifyBin.add(message=f'Uploading data failed: {result}', type='negative')
+        elif result:
             NotifyBin.add(message=f'Successfully uploaded and saved {result} listings', type='positive')
         else:
             NotifyBin.add(message='No data to upload and save', type='negative')
-            return
-
-        # Posting listings
-        NotifyBin.add(message='Publishing listings...')
 
-        result = []
-        await asyncio.to_thread(run_marketplace_bot, listings_limit=1, result=result)
-        if result:
-            for listing in result:
-                NotifyBin.add(message=f'Successfully published listing: {listing.title}', type='positive')
+    def notify_publish_result(result: list | BaseException) -> None:
+        if isinstance(result, JobCancelled):
+            NotifyBin.add(message='Publishing is stopped', type='warning')
+        elif isinstance(result, CircuitBreakerOpen):
+            # Changed page is already shown by publishing
+            pass
+        elif isinstance(result, BaseException):
+            system_logger.error(f'Publishing failed: {result}', exc_info=result)
+            NotifyBin.add(message=f'Publishing failed: {result}', type='negative')
+        elif result:
+            NotifyBin.add(message=f'Successfully published {len(result)} listings', type='positive')
         else:
             NotifyBin.add(message='No listings have been published.', type='negative')
-            return
 
-    def run_marketplace_bot(listings_limit: int | None = None, result: list | None = None):
-        global scraper, scraper_driver_manager
+    async def publish_listings(listings_limit: int | None = None, pipeline: ListingPipeline | None = None,
+                               listing_filter: Callable[[Listing], bool] | None = None) -> list:
+        """
+        Publish listings by the browser worker. If publishing is already in progress, join it.
+
+        :param pipeline: Pipeline of the import in progress, otherwise listings are read from the csv file
+        :param listing_filter: If set, only selected listings are checked and published
+        """
 
+        async def run() -> list:
+            result = []
+            await run_browser_job(PUBLISH_JOB_NAME, run_marketplace_bot,
+                                  listings_limit=listings_limit, result=result, pipeline=pipeline,
+                                  listing_filter=listing_filter)
+            return result
+
+        return await job_coordinator.run_publish(run, wait_for_import=pipeline is None)
+
+    def run_marketplace_bot(job: BrowserJob, listings_limit: int | None = None, result: list | None = None,
+                            pipeline: ListingPipeline | None = None,
+                            listing_filter: Callable[[Listing], bool] | None = None):
         system_logger.info("Start bot")
+        reset_logging_stats()
+        started_at = time.perf_counter()
+
+        if pipeline is None:
+            # Get data for vehicle type listings from csvs/vehicles.csv
+            pipeline = ListingPipeline.from_listings(get_data_from_csv(CONFIG_DATA_PATH),
+                                                     order=get_listing_priority().sort)
+
+        # Photos of the listings are not removed by import which is started during publishing,
+        # till the pipeline is released
+        tracer.start_run('publish', listings_limit=listings_limit)
+        try:
+            publish_vehicle_listings(job, pipeline, listings_limit, result, listing_filter)
+        except BaseException as e:
+            tracer.finish_run(outcome='error', error=f'{type(e).__name__}: {e}')
+            raise
+        finally:
+            pipeline.release()
+            tracer.finish_run()
+
+        logging_stats = get_logging_stats()
+        system_logger.info(f'Bot run finished in {time.perf_counter() - started_at:.1f}s, '
+                           f'logging: {logging_stats["records"]} records, '
+                           f'{logging_stats["caller_time"]:.3f}s in bot thread, '
+                           f'{logging_stats["writer_time"]:.3f}s in background writer')
+
+    def publish_vehicle_listings(job: BrowserJob, pipeline: ListingPipeline,
+                                 listings_limit: int | None = None, result: list | None = None,
+                                 listing_filter: Callable[[Listing], bool] | None = None):
+        global scraper, scraper_driver_manager
+
+        # Check that browser and its tabs are alive, otherwise restart the browser and restore the tabs
+        scraper_session_supervisor.register_tab('facebook', FACEBOOK_SELLING_URL)
+        scraper_session_supervisor.ensure_session(active_tab_alias='facebook')
 
         scraper_driver_manager.create_tab('facebook')
-        scraper = Scraper(driver=scraper_driver_manager.driver, url='https://facebook.com/')
+        scraper = Scraper(driver=scraper_driver_manager.driver, url='https://facebook.com/',
+                          cancel_event=job.cancel_event)
         scraper.add_login_functionality(login_url='https://facebook.com/',
                                         is_logged_in_selector='svg[aria-label="Your profile"]',
                                         cookies_file_name='facebook')
-        scraper.go_to_page('https://facebook.com/marketplace/you/selling')
+        scraper.go_to_page(FACEBOOK_SELLING_URL, skip_if_current=True)
+
+        # All listings of the feed are known before their photos are downloaded
+        feed_listings = pipeline.get_feed(cancel_event=job.cancel_event)
 
-        # Get data for vehicle type listings from csvs/vehicles.csv
-        vehicle_listings = get_data_from_csv(CONFIG_DATA_PATH)
+        # Removal works on the whole feed, it only needs the selling page which is scanned anyway.
+        # Update works on the selected listings.
+        listings = pipeline.iter_listings(cancel_event=job.cancel_event)
+        listings_total = len(feed_listings)
+        if listing_filter:
+            selected_titles = {listing.title for listing in feed_listings if listing_filter(listing)}
+            listings = (listing for listing in listings if listing.title in selected_titles)
+            listings_total = len(selected_titles)
+            system_logger.info(f'{listings_total} of {len(feed_listings)} listings are selected for the run')
 
         # Publish all the vehicles into the facebook marketplace
-        check_and_remove_listings(
-            listings=vehicle_listings,
-            scraper=scraper
-        )
-        check_and_update_listings(
-            listings=vehicle_listings,
-            scraper=scraper,
-            listings_limit=listings_limit,
-            result=result
-        )
+        failures = {}
+        progress = RunProgress(name='Publishing listings',
+                               listeners=[lambda p: NotifyBin.call_soon(show_progress, p)])
+        try:
+            # The run which was interrupted by a crash or a stop is resumed
+            publish_queue.begin_run(feed_listings)
+
+            # All removals are done while the selling page is loaded, then only missing listings are created
+            plan = check_and_remove_listings(
+                listings=feed_listings,
+                scraper=scraper,
+                ledger=publication_ledger,
+                listing_filter=listing_filter,
+                publish_queue=publish_queue,
+                listings_limit=listings_limit
+            )
+            check_and_update_listings(
+                listings=listings,
+                plan=plan,
+                total=listings_total,
+                scraper=scraper,
+                listings_limit=listings_limit,
+                result=result,
+                memory_watchdog=scraper_memory_watchdog,
+                listing_time_budget=CONFIG['listing'].get('time_budget'),
+                failures=failures,
+                progress=progress,
+                idle_tasks=(IdleTaskScheduler(min_task_time=CONFIG['scraper']['idle_tasks']['min_task_time'])
+                            if CONFIG['scraper']['idle_tasks']['enabled'] else None),
+                ledger=publication_ledger,
+                publish_queue=publish_queue
+            )
+            publish_queue.finish_run()
+        except CircuitBreakerOpen as e:
+            system_logger.error(f'Run aborted: {e}')
+            NotifyBin.add(message=f'Run aborted, Facebook page "{e.page_type}" was probably changed. '
+                                  f'Not found selectors: {"; ".join(e.selectors)}',
+                          type='negative',
+                          timeout=0,
+                          multi_line=True)
+            # The run isn't completed, so the scheduled cycle doesn't save its state
+            raise
+        finally:
+            progress.finish()
+            for title, reason in failures.items():
+                NotifyBin.add(message=f'Listing {title} skipped: {reason}', type='warning')
 
     async def on_start_button_click(listings_limit: int | None = None) -> None:
-        ui.notify("Publishing listings...", type='info', close_button=True)
+        if job_coordinator.is_running('publish'):
+            ui.notify('Publishing is already running, waiting for its result', type='info', close_button=True)
+        else:
+            ui.notify("Publishing listings...", type='info', close_button=True)
+        if button_stop:
+            button_stop.enable()
 
-        result = []
-        await asyncio.to_thread(run_marketplace_bot, listings_limit=listings_limit, result=result)
+        try:
+            result = await publish_listings(listings_limit=listings_limit)
+        except (JobCancelled, asyncio.CancelledError):
+            # "Stop" cancels the task of the coordinator, the handler gets CancelledError
+            ui.notify('Publishing is stopped', type='warning')
+            return
+        except CircuitBreakerOpen:
+            # Changed page is already shown by publishing
+            return
         if result:
-            for listing in result:
-                ui.notify(f'Successfully published listing: {listing.title}', type='positive')
+            ui.notify(f'Successfully published {len(result)} listings', type='positive')
         else:
             ui.notify('No listings have been published.', type='negative')
 
@@ -174,9 +489,19 @@ def launch_facebook_marketplace_bot() -> None:
         if scheduler.get_job(job_id):
             scheduler.remove_job(job_id)
 
+        # Stop the current run too: waits of the scraper are interrupted by the cancel event
+        if upload_task and not upload_task.done():
+            upload_task.cancel()
+        job_coordinator.cancel('publish')
+        browser_worker.cancel_all(name=PUBLISH_JOB_NAME)
+
     async def on_upload_data_button_click() -> None:
-        ui.notify("Uploading data...", type='info', close_button=True)
-        result = await asyncio.to_thread(import_data_to_csv, CONFIG['data']['path'], CONFIG['data']['upload_limit'])
+        if job_coordinator.is_running('import'):
+            ui.notify('Uploading is already running, waiting for its result', type='info', close_button=True)
+        else:
+            ui.notify("Uploading data...", type='info', close_button=True)
+        result = await job_coordinator.run_import(import_data_to_csv, CONFIG['data']['path'],
+                                                  CONFIG['data']['upload_limit'])
         if result:
             ui.notify(f'Successfully uploaded and saved {result} listings', type='positive')
         else:
@@ -189,6 +514,8 @@ def launch_facebook_marketplace_bot() -> None:
         CONFIG['scraper']['listing_random_delay']['max'] = config_field_listing_random_delay_max.value
         CONFIG['scraper']['schedule']['crontab'] = config_field_scraper_schedule_crontab.value
         CONFIG['listing']['lifetime'] = config_field_listing_lifetime.value
+        CONFIG['listing']['time_budget'] = config_field_listing_time_budget.value
+        CONFIG['listing']['partitions'] = config_field_listing_partitions.value
         CONFIG['listing']['description']['replace']['old_value'] = config_listing_description_replace_old_value.value
         CONFIG['listing']['description']['replace']['new_value'] = config_listing_description_replace_new_value.value
         CONFIG['listing']['public_groups'] = config_listing_public_groups.value
@@ -200,14 +527,23 @@ def launch_facebook_marketplace_bot() -> None:
     def on_clear_log_button_click() -> None:
         if os.path.exists(current_log_file):
             open(current_log_file, "w").close()
+        log_area.clear()
 
     def update_log_view() -> None:
-        if os.path.exists(current_log_file):
-            with open(current_log_file, 'r', encoding='utf-8') as f:
-                log_area.value = f.read()
+        nonlocal log_view_position
+
+        # Only appended lines are read from the file and pushed to the clients
+        log_tailer = log_tailers[current_log_file]
+        log_tailer.poll()
+        generation, sequence, lines, reset = log_tailer.get_lines_since(*log_view_position)
+        if reset:
+            log_area.clear()
+        if lines:
+            log_area.push('\n'.join(lines))
+        log_view_position = (generation, sequence)
 
     def on_log_type_change(selected: ValueChangeEventArguments) -> None:
-        nonlocal current_log_file
+        nonlocal current_log_file, log_view_position
 
         log_file_map = {
             'User log': CONFIG_LOG_USER_FILE_PATH,
@@ -215,21 +551,63 @@ def launch_facebook_marketplace_bot() -> None:
         }
 
         current_log_file = log_file_map.get(selected.value, CONFIG_LOG_USER_FILE_PATH)
+        log_view_position = (-1, 0)
 
     system_logger.info('Build program UI - start')
 
     ui.timer(0.5, update_log_view)
 
-    def notify():
-        while not NotifyBin.empty():
-            kwargs = NotifyBin.get_nowait()
-            for client in Client.instances.values():
-                if not client.has_socket_connection:
-                    continue
-                with client:
-                    ui.notify(**kwargs)
-
-    ui.timer(1, notify)
+    def show_progress(progress: RunProgress) -> None:
+        progress_row.set_visibility(True)
+        progress_label.set_text(progress.text)
+        progress_bar.set_value(progress.value)
+
+    def show_due_items(due_items: list[tuple[str, datetime.datetime, str]]) -> None:
+        due_items_column.clear()
+        with due_items_column:
+            if not due_items:
+                ui.label('Nothing is due')
+            for title, due_at, reason in due_items[:DUE_ITEMS_SHOWN]:
+                ui.label(f'{due_at:%Y-%m-%d %H:%M} - {title} ({reason})')
+
+    def show_latest_trace() -> None:
+        trace_column.clear()
+        with trace_column:
+            run_files = get_run_files(CONFIG['tracing']['folder'])
+            if not run_files:
+                ui.label('Will be shown after the next run')
+                return
+            spans = load_spans(run_files[0])
+            ui.label(f'{os.path.basename(run_files[0])}: {len(spans)} spans')
+
+            # Steps which take most of the time of the run are on top
+            ui.table(columns=[{'name': name, 'label': name, 'field': name, 'align': 'left'}
+                              for name in TRACE_SUMMARY_COLUMNS],
+                     rows=[{'kind': summary.kind,
+                            'name': summary.name,
+                            'count': summary.count,
+                            'total, s': round(summary.total_time, 2),
+                            'wait, s': round(summary.wait_time, 2),
+                            'action, s': round(summary.action_time, 2),
+                            'max, s': round(summary.max_time, 2),
+                            'errors': summary.errors}
+                           for summary in summarize_spans(spans)[:TRACE_SUMMARY_ROWS]
+                           if summary.kind != SPAN_LISTING]).classes('w-full').props('dense')
+
+            ui.table(columns=[{'name': name, 'label': name, 'field': name, 'align': 'left'}
+                              for name in TRACE_LISTINGS_COLUMNS],
+                     rows=[{'listing': span.name,
+                            'started, s': round(span.started_at, 1),
+                            'total, s': round(span.duration, 2),
+                            'wait, s': round(span.wait_time, 2),
+                            'action, s': round(span.action_time, 2),
+                            'outcome': span.outcome}
+                           for span in spans if span.kind == SPAN_LISTING]).classes('w-full').props('dense')
+
+    def show_job_state(job_name: str, job_state: JobState) -> None:
+        job_state_label.set_text(f'Job "{job_name}": {job_state}')
+
+    browser_worker.on_state_change = lambda job: NotifyBin.call_soon(show_job_state, job.name, job.state)
 
     with ((ui.column().classes('w-full items-center'))):
         ui.markdown('# **Facebook Marketplace Auto Dealership Bot**')
@@ -241,7 +619,7 @@ def launch_facebook_marketplace_bot() -> None:
                 ui.tooltip('Start process periodically with schedule. Upload data and publish listings')
 
             with ui.button(text='Stop', on_click=on_stop_button, color='negative') as button_stop:
-                ui.tooltip('Start process.')
+                ui.tooltip('Stop schedule and current publishing.')
 
             ui.button(text="Upload data", on_click=on_upload_data_button_click, color='secondary') \
                 .tooltip('Upload and/or update data to inner database from external resources')
@@ -249,6 +627,24 @@ def launch_facebook_marketplace_bot() -> None:
             with ui.button(text="Start", on_click=on_start_button_click):
                 ui.tooltip('Start publish listings')
 
+            job_state_label = ui.label().classes('self-center')
+
+        with ui.column().classes('w-full') as progress_row:
+            progress_label = ui.label()
+            progress_bar = ui.linear_progress(value=0, show_value=False)
+        progress_row.set_visibility(False)
+
+        with ui.expansion('Next due listings').classes('w-full'):
+            due_items_column = ui.column().classes('w-full')
+            with due_items_column:
+                ui.label('Will be shown after the next scheduled check')
+
+        with ui.expansion('Latest run trace').classes('w-full'):
+            ui.button(text='Refresh', on_click=show_latest_trace) \
+                .tooltip('Time of the steps of the latest run: waits and actions in the browser')
+            trace_column = ui.column().classes('w-full')
+            show_latest_trace()
+
         with ui.expansion('Config').classes('w-full'):
             with ui.row():
                 ui.button(text="Save", on_click=on_save_config_button_click) \
@@ -298,6 +694,17 @@ def launch_facebook_marketplace_bot() -> None:
                                 ui.number(label='Lifetime (days)', value=CONFIG['listing']['lifetime'])
                                 .props('step=1 min=1')
                                 .tooltip(text='After this time, the listing will be removed and republished.'))
+                            config_field_listing_time_budget = (
+                                ui.number(label='Time budget (seconds)', value=CONFIG['listing'].get('time_budget'))
+                                .props('step=60 min=60 clearable')
+                                .tooltip(text='Max time for processing one listing. '
+                                              'After this time, the listing will be skipped till the next run.'))
+                            config_field_listing_partitions = (
+                                ui.number(label='Partitions', value=CONFIG['listing'].get('partitions', 1))
+                                .props('step=1 min=1')
+                                .tooltip(text='Scheduled run checks only one partition of listings and urgent '
+                                              'listings (expired, not published or with changed price). '
+                                              'All listings are checked once per this number of runs.'))
                             config_field_scraper_schedule_crontab = (
                                 ui.input(label='Schedule (crontab)', value=CONFIG['scraper']['schedule']['crontab'])
                                 .props('clearable')
@@ -346,19 +753,30 @@ def launch_facebook_marketplace_bot() -> None:
                     on_change=on_log_type_change
                 ).props('outlined dense')
 
-            log_area = (ui.textarea(label='Log Output', value='')
-                        .props('readonly')
-                        .style('width: 100%; height: 100%;'))
+            log_area = (ui.log(max_lines=LOG_VIEW_MAX_LINES)
+                        .classes('w-full h-96'))
 
     system_logger.info('Build program UI - end')
 
 
 # if __name__ in {"__main__", "__mp_main__"}:
 if __name__ == "__main__":
+    StartupTimer.mark('import')
     system_logger.info('Start program')
-    threading.Thread(target=launch_browser_and_open_gui).start()
 
+    publication_ledger = PublicationLedger(CONFIG['ledger']['path'])
+    publish_queue = PublishQueue(CONFIG['publish_queue']['path'])
+
+    # All work with the browser is done by one worker thread, so jobs never drive the browser at the same time
+    browser_worker = BrowserWorker()
+    browser_worker.start()
+    browser_worker.submit('browser startup', launch_browser_and_open_gui)
+
+    launch_facebook_marketplace_bot()
+
+    app.on_startup(NotifyBin.attach_loop)
     app.on_startup(launch_schedule)
+    app.on_startup(gui_server_started.set)
 
     ui.run(title="Facebook Bot Control",
            port=8080,
@@ -0,0 +1,31 @@
+import logging
+import os
+import sys
+
+import pytest
+
+# config.yaml and the paths in it are relative to the project folder
+PROJECT_FOLDER = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+os.chdir(PROJECT_FOLDER)
+sys.path.insert(0, PROJECT_FOLDER)
+
+# Records of the tested code would go to the log files of the bot
+logging.disable(logging.CRITICAL)
+
+from helpers.ledger_helper import PublicationLedger  # noqa: E402
+from helpers.model import Listing  # noqa: E402
+
+
+@pytest.fixture
+def ledger(tmp_path):
+    return PublicationLedger(str(tmp_path / 'ledger.sqlite'))
+
+
+@pytest.fixture
+def get_listings():
+    # Factory of the feed listings, every listing has its own title, stock number, price and photos
+    def get_listings(count: int) -> list[Listing]:
+        return [Listing(title=f'Listing {i}', stockno=f'S{i}', price=1000 + i, photos_folder=f'photos/{i}')
+                for i in range(count)]
+
+    return get_listings
@@ -0,0 +1,54 @@
+import threading
+
+import pytest
+
+from helpers.browser_worker import BrowserWorker, JobState
+from helpers.scraper import JobCancelled
+
+
+@pytest.fixture
+def worker():
+    worker = BrowserWorker()
+    worker.start()
+    yield worker
+    worker.stop()
+    worker.join(timeout=5)
+
+
+def test_jobs_are_run_one_by_one(worker):
+    first = worker.submit('first', lambda job, value: value, 1)
+    second = worker.submit('second', lambda job, value: value, 2)
+
+    assert first.future.result(timeout=5) == 1
+    assert second.future.result(timeout=5) == 2
+    assert first.state == second.state == JobState.DONE
+
+
+def test_exit_of_job_does_not_stop_the_worker(worker):
+    def exit_job(job):
+        exit()
+
+    failed = worker.submit('exit', exit_job)
+    next_job = worker.submit('next', lambda job: 'done')
+
+    with pytest.raises(SystemExit):
+        failed.future.result(timeout=5)
+    assert failed.state == JobState.FAILED
+    assert next_job.future.result(timeout=5) == 'done'
+
+
+def test_job_is_cancelled_by_its_event(worker):
+    started = threading.Event()
+
+    def wait_for_cancel(job):
+        started.set()
+        if job.cancel_event.wait(5):
+            raise JobCancelled('Job is cancelled')
+
+    job = worker.submit('cancelled', wait_for_cancel)
+    started.wait(5)
+    worker.cancel(job)
+
+    with pytest.raises(JobCancelled):
+        job.future.result(timeout=5)
+    assert job.state == JobState.CANCELLED
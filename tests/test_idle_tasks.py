@@ -0,0 +1,110 @@
+from contextlib import contextmanager
+
+import pytest
+
+from helpers.idle_tasks import IdleTaskScheduler
+from helpers.scraper import CircuitBreakerOpen, DeadlineExceeded, JobCancelled
+
+
+class FakeScraper:
+    def __init__(self):
+        self.deadline = None
+        self.slept = []
+
+    @contextmanager
+    def deadline_scope(self, deadline):
+        previous_deadline = self.deadline
+        self.deadline = deadline
+        try:
+            yield deadline
+        finally:
+            self.deadline = previous_deadline
+
+    def sleep(self, seconds: float) -> None:
+        self.slept.append(seconds)
+
+
+def test_tasks_are_run_by_priority_and_the_rest_of_pause_is_slept():
+    scraper = FakeScraper()
+    done = []
+    idle_tasks = IdleTaskScheduler(min_task_time=1)
+    idle_tasks.add('second', done.append, 'second', priority=10)
+    idle_tasks.add('first', done.append, 'first', priority=0)
+
+    idle_tasks.run(scraper=scraper, seconds=100)
+
+    assert done == ['first', 'second']
+    assert len(scraper.slept) == 1 and 99 < scraper.slept[0] <= 100
+
+
+def test_task_is_not_started_without_enough_time():
+    done = []
+    idle_tasks = IdleTaskScheduler(min_task_time=30)
+    idle_tasks.add('task', done.append, 'task')
+
+    idle_tasks.run(scraper=FakeScraper(), seconds=10)
+
+    assert done == []
+
+
+def test_failed_task_does_not_stop_the_pause():
+    scraper = FakeScraper()
+    done = []
+    idle_tasks = IdleTaskScheduler(min_task_time=1)
+    idle_tasks.add('failed', lambda: 1 / 0, priority=0)
+    idle_tasks.add('next', done.append, 'next', priority=1)
+
+    idle_tasks.run(scraper=scraper, seconds=100)
+
+    assert done == ['next']
+    assert len(scraper.slept) == 1
+
+
+@pytest.mark.parametrize('error', [
+    CircuitBreakerOpen(page_type='selling', selectors=['//span'], misses_count=10),
+    JobCancelled('Job is cancelled'),
+])
+def test_run_stopping_errors_are_raised(error):
+    def task():
+        raise error
+
+    idle_tasks = IdleTaskScheduler(min_task_time=1)
+    idle_tasks.add('task', task)
+
+    with pytest.raises(type(error)):
+        idle_tasks.run(scraper=FakeScraper(), seconds=100)
+
+
+def test_on_interrupt_runs_in_the_reserved_time_of_pause():
+    scraper = FakeScraper()
+    deadlines = {}
+
+    def task():
+        deadlines['task'] = scraper.deadline.remaining()
+        raise DeadlineExceeded('Deadline exceeded')
+
+    def on_interrupt():
+        deadlines['on_interrupt'] = scraper.deadline.remaining()
+
+    idle_tasks = IdleTaskScheduler(min_task_time=1, interrupt_time=15)
+    idle_tasks.add('task', task, on_interrupt=on_interrupt)
+
+    idle_tasks.run(scraper=scraper, seconds=100)
+
+    assert 84 < deadlines['task'] <= 85
+    # The task was cut short by the test, so the rest of the pause is left for on_interrupt
+    assert 99 < deadlines['on_interrupt'] <= 100
+    assert scraper.deadline is None
+
+
+def test_slow_on_interrupt_does_not_fail_the_pause():
+    def task():
+        raise DeadlineExceeded('Deadline exceeded')
+
+    def on_interrupt():
+        raise DeadlineExceeded('Deadline exceeded')
+
+    idle_tasks = IdleTaskScheduler(min_task_time=1)
+    idle_tasks.add('task', task, on_interrupt=on_interrupt)
+
+    idle_tasks.run(scraper=FakeScraper(), seconds=100)
@@ -0,0 +1,92 @@
+import asyncio
+import threading
+
+import pytest
+
+from helpers.job_coordinator import JobCoordinator, ListingPipeline, PhotoFolderLeases
+from helpers.scraper import JobCancelled
+
+
+def test_import_does_not_wait_for_publishing(get_listings):
+    pipeline = ListingPipeline()
+    listings = pipeline.set_feed(get_listings(100))
+
+    # Nothing consumes the queue, the import still puts all listings
+    assert all(pipeline.put(listing) for listing in listings)
+    pipeline.close()
+
+    assert list(pipeline.iter_listings()) == listings
+    pipeline.release()
+
+
+def test_feed_is_ordered_and_listings_are_given_while_imported(get_listings):
+    pipeline = ListingPipeline(order=lambda listings: sorted(listings, key=lambda listing: -listing.price))
+
+    def run_import():
+        for listing in pipeline.set_feed(get_listings(3)):
+            pipeline.put(listing)
+        pipeline.close()
+
+    thread = threading.Thread(target=run_import)
+    thread.start()
+
+    assert [listing.title for listing in pipeline.get_feed()] == ['Listing 2', 'Listing 1', 'Listing 0']
+    assert [listing.title for listing in pipeline.iter_listings()] == ['Listing 2', 'Listing 1', 'Listing 0']
+    thread.join()
+    pipeline.release()
+
+
+def test_put_after_release_is_rejected(get_listings):
+    pipeline = ListingPipeline()
+    listings = pipeline.set_feed(get_listings(2))
+    pipeline.release()
+
+    assert not pipeline.put(listings[0])
+
+
+def test_photo_folders_are_leased_till_release(get_listings):
+    pipeline = ListingPipeline.from_listings(get_listings(2))
+
+    assert PhotoFolderLeases.is_leased('photos/0')
+    pipeline.release()
+    assert not PhotoFolderLeases.is_leased('photos/0')
+
+
+def test_leases_are_counted():
+    with PhotoFolderLeases.lease('photos/a'):
+        with PhotoFolderLeases.lease('photos/a'):
+            pass
+        assert PhotoFolderLeases.is_leased('photos/a')
+    assert not PhotoFolderLeases.is_leased('photos/a')
+
+
+def test_iter_listings_is_cancelled():
+    pipeline = ListingPipeline()
+    cancel_event = threading.Event()
+    cancel_event.set()
+
+    with pytest.raises(JobCancelled):
+        next(pipeline.iter_listings(cancel_event=cancel_event))
+
+
+def test_import_without_data_fails_get_feed():
+    pipeline = ListingPipeline()
+    pipeline.close()
+
+    with pytest.raises(RuntimeError):
+        pipeline.get_feed()
+
+
+def test_overlapping_requests_join_the_running_job():
+    calls = []
+
+    def run_import(value):
+        calls.append(value)
+        return value
+
+    async def run():
+        coordinator = JobCoordinator()
+        return await asyncio.gather(coordinator.run_import(run_import, 1), coordinator.run_import(run_import, 2))
+
+    assert asyncio.run(run()) == [1, 1]
+    assert calls == [1]
@@ -0,0 +1,70 @@
+import datetime
+
+from helpers.ledger_helper import PublicationLedger
+
+LIFETIME_DAYS = 7
+RETRY_INTERVAL = datetime.timedelta(hours=12)
+
+
+def test_titles_are_compared_as_on_the_selling_page(ledger):
+    ledger.record_published('2019 Honda  Civic', price=15000)
+
+    assert ledger.get_price('2019 HONDA\xa0CIVIC') == 15000
+    assert PublicationLedger.title_key('2019 Honda Civic') == PublicationLedger.title_key(' 2019 honda\ncivic ')
+
+
+def test_published_listing_is_due_when_it_expires(ledger):
+    published_date = datetime.date.today() - datetime.timedelta(days=2)
+    ledger.record_published('Car', price=1000, published_date=published_date)
+
+    due_at, reason = ledger.get_due('Car', LIFETIME_DAYS, RETRY_INTERVAL)
+    assert due_at == datetime.datetime.combine(published_date, datetime.time()) + datetime.timedelta(days=7)
+    assert reason == 'expires'
+
+
+def test_failed_listing_is_due_after_retry_interval(ledger):
+    ledger.record_failed('Car', reason='no valid photos')
+
+    due_at, reason = ledger.get_due('Car', LIFETIME_DAYS, RETRY_INTERVAL)
+    assert due_at > datetime.datetime.now() + RETRY_INTERVAL - datetime.timedelta(minutes=1)
+    assert reason == 'retry after failure: no valid photos'
+
+
+def test_publishing_clears_the_failure(ledger):
+    ledger.record_failed('Car', reason='publishing failed')
+    ledger.record_published('Car', price=1000)
+
+    record = ledger.get_record('Car')
+    assert record['failed_at'] is None
+    assert record['published_date'] == datetime.date.today().isoformat()
+
+
+def test_due_items_of_the_feed(ledger):
+    ledger.record_published('Actual', price=1000, published_date=datetime.date.today())
+    ledger.record_published('Sold', price=1000, published_date=datetime.date.today())
+    ledger.record_failed('Failed', reason='publishing failed')
+
+    due_items = ledger.get_due_items(['Actual', 'New', 'Failed'], LIFETIME_DAYS, RETRY_INTERVAL)
+
+    assert [(title, reason) for title, _, reason in due_items] == [
+        ('New', 'not published'),
+        ('Sold', 'not in feed'),
+        ('Failed', 'retry after failure: publishing failed'),
+        ('Actual', 'expires'),
+    ]
+
+
+def test_removed_listing_is_not_published(ledger):
+    ledger.record_published('Car', price=1000)
+    ledger.record_removed('Car')
+
+    assert ledger.get_price('Car') is None
+    assert ledger.get_due_items([], LIFETIME_DAYS, RETRY_INTERVAL) == []
+
+
+def test_state_is_saved(tmp_path):
+    file_path = str(tmp_path / 'ledger.sqlite')
+    PublicationLedger(file_path).set_state('feed_hash', 'abc')
+
+    assert PublicationLedger(file_path).get_state('feed_hash') == 'abc'
+    assert PublicationLedger(file_path).get_state('missing', 'default') == 'default'
@@ -0,0 +1,146 @@
+from contextlib import contextmanager
+
+import pytest
+
+from helpers import listing_helper
+from helpers.model import Listing, PublishedListing
+
+
+class FakeScraper:
+    def __init__(self):
+        self.slept = []
+
+    def get_listing_random_delay(self, elapsed: float = 0.0) -> float:
+        return 60.0
+
+    def sleep(self, seconds: float) -> None:
+        self.slept.append(seconds)
+
+    @contextmanager
+    def deadline_scope(self, deadline):
+        yield deadline
+
+    @contextmanager
+    def page_type_scope(self, page_type):
+        yield
+
+
+@pytest.fixture
+def published(monkeypatch):
+    published = []
+
+    def check_and_publish_listing(scraper, listing, **kwargs):
+        published.append(listing.title)
+        return True
+
+    monkeypatch.setattr(listing_helper, 'check_and_publish_listing', check_and_publish_listing)
+    monkeypatch.setattr(listing_helper, 'preflight_listing', lambda listing: [])
+    return published
+
+
+def test_listings_limit_stops_the_run(published, get_listings):
+    scraper = FakeScraper()
+    result = []
+    listings_iterator = iter(get_listings(5))
+
+    listing_helper.check_and_update_listings(scraper=scraper, listings=listings_iterator, total=5,
+                                             listings_limit=2, result=result)
+
+    assert published == ['Listing 0', 'Listing 1']
+    assert [listing.title for listing in result] == published
+    # No pause after the last allowed listing
+    assert scraper.slept == [60.0]
+    # The rest of the listings are left unconsumed
+    assert next(listings_iterator).title == 'Listing 2'
+
+
+def test_run_without_limit_publishes_all_listings(published, get_listings):
+    listing_helper.check_and_update_listings(scraper=FakeScraper(), listings=get_listings(3))
+
+    assert published == ['Listing 0', 'Listing 1', 'Listing 2']
+
+
+def test_failed_listings_are_not_counted_by_limit(monkeypatch, published, get_listings):
+    results = iter([False, False, False, True])
+
+    def check_and_publish_listing(scraper, listing, **kwargs):
+        published.append(listing.title)
+        return next(results)
+
+    monkeypatch.setattr(listing_helper, 'check_and_publish_listing', check_and_publish_listing)
+
+    listing_helper.check_and_update_listings(scraper=FakeScraper(), listings=get_listings(3), listings_limit=1)
+
+    # The first listing is retried twice, then the next one is published
+    assert published == ['Listing 0', 'Listing 0', 'Listing 0', 'Listing 1']
+
+
+def test_rejected_listing_is_skipped_without_pause(monkeypatch, published, get_listings):
+    monkeypatch.setattr(listing_helper, 'preflight_listing',
+                        lambda listing: ['no valid photos'] if listing.title == 'Listing 1' else [])
+    scraper = FakeScraper()
+    failures = {}
+
+    listing_helper.check_and_update_listings(scraper=scraper, listings=get_listings(3), failures=failures)
+
+    assert published == ['Listing 0', 'Listing 2']
+    assert failures == {'Listing 1': 'no valid photos'}
+    assert scraper.slept == [60.0]
+
+
+@pytest.fixture
+def removed(monkeypatch):
+    removed = []
+    monkeypatch.setattr(listing_helper, 'remove_published_listing',
+                        lambda scraper, published_listing: removed.append(published_listing.title))
+    return removed
+
+
+def plan_removals(monkeypatch, titles: list[str]) -> None:
+    removals = [(PublishedListing(title=title), 'price changed') for title in titles]
+    monkeypatch.setattr(listing_helper, 'plan_listings',
+                        lambda **kwargs: listing_helper.ListingsPlan(removals=list(removals)))
+
+
+def test_limited_run_removes_listings_right_before_publishing_them(monkeypatch, published, removed, get_listings):
+    listings = get_listings(3)
+    plan_removals(monkeypatch, ['Listing 0', 'Listing 2', 'Sold'])
+
+    plan = listing_helper.check_and_remove_listings(scraper=FakeScraper(), listings=listings, published_listings=[],
+                                                    listings_limit=1)
+
+    # Listing which is not in the feed is removed anyway
+    assert removed == ['Sold']
+    assert set(plan.deferred_removals) == {'listing0', 'listing2'}
+
+    listing_helper.check_and_update_listings(scraper=FakeScraper(), listings=listings, plan=plan, listings_limit=1)
+
+    assert removed == ['Sold', 'Listing 0']
+    assert published == ['Listing 0']
+
+
+def test_run_without_limit_removes_all_outdated_listings(monkeypatch, removed, get_listings):
+    plan_removals(monkeypatch, ['Listing 0', 'Listing 2', 'Sold'])
+
+    plan = listing_helper.check_and_remove_listings(scraper=FakeScraper(), listings=get_listings(3),
+                                                    published_listings=[])
+
+    assert removed == ['Listing 0', 'Listing 2', 'Sold']
+    assert plan.deferred_removals == {}
+
+
+def test_listing_without_photos_is_rejected_by_preflight():
+    listing = Listing(title='Listing', price=1000, year=2019, make='Honda', model='Civic')
+
+    assert listing_helper.preflight_listing(listing) == ['no valid photos']
+    assert listing.photos_names == []
+
+
+def test_preflight_keeps_only_images(tmp_path):
+    (tmp_path / 'photo.png').write_bytes(b'\x89PNG\r\n\x1a\n' + b'0' * 10)
+    (tmp_path / 'page.png').write_bytes(b'<html></html>')
+    listing = Listing(title='Listing', price=1000, year=2019, make='Honda', model='',
+                      photos_folder=str(tmp_path), photos_names=['photo.png', 'page.png', 'missing.png', ' '])
+
+    assert listing_helper.preflight_listing(listing) == ['model is empty']
+    assert listing.photos_names == ['photo.png']
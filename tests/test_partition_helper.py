@@ -0,0 +1,61 @@
+import asyncio
+import datetime
+
+from helpers.ledger_helper import PublicationLedger
+from helpers.model import Listing
+from helpers.partition_helper import PartitionFilter, get_partition, get_partition_run, run_scheduled_cycle
+
+PARTITIONS = 4
+
+
+def get_filter(ledger: PublicationLedger, partition: int) -> PartitionFilter:
+    return PartitionFilter(ledger=ledger, partitions=PARTITIONS, partition=partition, lifetime_days=7,
+                           retry_interval=datetime.timedelta(hours=12))
+
+
+def test_partition_is_stable_and_uses_stockno():
+    listing = Listing(title='Car', stockno='A123')
+
+    assert get_partition(listing, PARTITIONS) == get_partition(Listing(title='Other', stockno='A123'), PARTITIONS)
+    assert 0 <= get_partition(listing, PARTITIONS) < PARTITIONS
+
+
+def test_every_actual_listing_is_selected_once_per_cycle(ledger, get_listings):
+    listings = get_listings(50)
+    for listing in listings:
+        ledger.record_published(listing.title, price=listing.price)
+
+    selected = [[listing.title for listing in listings if get_filter(ledger, partition)(listing)]
+                for partition in range(PARTITIONS)]
+
+    assert sorted(sum(selected, [])) == sorted(listing.title for listing in listings)
+    assert all(selected)
+
+
+def test_urgent_listings_are_selected_by_every_partition(ledger, get_listings):
+    not_published, changed_price = get_listings(2)
+    ledger.record_published(changed_price.title, price=900)
+
+    for partition in range(PARTITIONS):
+        partition_filter = get_filter(ledger, partition)
+        assert partition_filter(not_published)
+        assert partition_filter(changed_price)
+
+
+def test_failed_cycle_keeps_partition_and_feed_hash(ledger):
+    async def cycle() -> bool:
+        return False
+
+    assert not asyncio.run(run_scheduled_cycle(ledger, feed_hash='new', cycle=cycle))
+    assert get_partition_run(ledger) == 0
+    assert ledger.get_state('feed_hash') is None
+
+
+def test_completed_cycle_advances_partition(ledger):
+    async def cycle() -> bool:
+        return True
+
+    assert asyncio.run(run_scheduled_cycle(ledger, feed_hash='new', cycle=cycle))
+    assert asyncio.run(run_scheduled_cycle(ledger, feed_hash='newer', cycle=cycle))
+    assert get_partition_run(ledger) == 2
+    assert ledger.get_state('feed_hash') == 'newer'
@@ -0,0 +1,65 @@
+import datetime
+
+import pytest
+
+from helpers.model import Listing
+from helpers.priority_helper import ListingPriority, SCORE_PRICE_CHANGED, SCORE_MILEAGE_CHANGED, SCORE_EXPIRED, \
+    SCORE_EXPIRED_MAX, SCORE_NOT_PUBLISHED, SCORE_RETRY, SCORE_RECENTLY_FAILED
+
+LIFETIME_DAYS = 7
+
+
+@pytest.fixture
+def priority(ledger):
+    return ListingPriority(ledger, lifetime_days=LIFETIME_DAYS, retry_interval=datetime.timedelta(hours=12))
+
+
+def days_ago(days: int) -> datetime.date:
+    return datetime.date.today() - datetime.timedelta(days=days)
+
+
+def test_not_published_listing(priority):
+    assert priority.get_score(Listing(title='New', price=1000)) == SCORE_NOT_PUBLISHED
+
+
+def test_changed_price_and_mileage(ledger, priority):
+    ledger.record_published('Car', price=1000, mileage=5000, published_date=days_ago(1))
+
+    assert priority.get_score(Listing(title='Car', price=900, mileage=5000)) == SCORE_PRICE_CHANGED
+    assert priority.get_score(Listing(title='Car', price=1000, mileage=6000)) == SCORE_MILEAGE_CHANGED
+
+
+def test_expired_listing_grows_with_overdue_days(ledger, priority):
+    ledger.record_published('Car', price=1000, mileage=5000, published_date=days_ago(LIFETIME_DAYS + 3))
+
+    score = priority.get_score(Listing(title='Car', price=1000, mileage=5000))
+    assert SCORE_EXPIRED + 2 < score < SCORE_EXPIRED + 4
+
+
+def test_long_expired_listing_goes_after_changed_listings(ledger, priority):
+    ledger.record_published('Expired', price=1000, mileage=5000, published_date=days_ago(LIFETIME_DAYS + 100))
+    ledger.record_published('Changed', price=1000, mileage=5000, published_date=days_ago(1))
+    expired = Listing(title='Expired', price=1000, mileage=5000)
+    changed = Listing(title='Changed', price=1000, mileage=6000)
+
+    assert priority.get_score(expired) == SCORE_EXPIRED_MAX
+    assert priority.sort([expired, changed]) == [changed, expired]
+
+
+def test_failed_listings(ledger, priority):
+    ledger.record_failed('Failed', reason='publishing failed')
+
+    assert priority.get_score(Listing(title='Failed', price=1000)) == SCORE_RECENTLY_FAILED
+
+    retry_priority = ListingPriority(ledger, lifetime_days=LIFETIME_DAYS, retry_interval=datetime.timedelta(0))
+    assert retry_priority.get_score(Listing(title='Failed', price=1000)) == SCORE_RETRY
+
+
+def test_actual_listing_which_expires_sooner_goes_first(ledger, priority):
+    ledger.record_published('Old', price=1000, mileage=0, published_date=days_ago(5))
+    ledger.record_published('Fresh', price=1000, mileage=0, published_date=days_ago(1))
+    old = Listing(title='Old', price=1000)
+    fresh = Listing(title='Fresh', price=1000)
+
+    assert priority.sort([fresh, old]) == [old, fresh]
+    assert SCORE_RECENTLY_FAILED < priority.get_score(fresh) < 0
@@ -0,0 +1,53 @@
+import pytest
+
+from helpers.publish_queue import PublishQueue, PublishState
+
+
+@pytest.fixture
+def file_path(tmp_path):
+    return str(tmp_path / 'publish_queue.sqlite')
+
+
+def test_new_run_starts_with_pending_listings(file_path, get_listings):
+    publish_queue = PublishQueue(file_path)
+
+    assert not publish_queue.begin_run(get_listings(3))
+    assert publish_queue.get_counts() == {'pending': 3}
+    assert publish_queue.get_state('listing 0') == PublishState.PENDING
+    assert publish_queue.get_state('Unknown') is None
+
+
+def test_unfinished_run_is_resumed_with_its_states(file_path, get_listings):
+    listings = get_listings(3)
+    publish_queue = PublishQueue(file_path)
+    publish_queue.begin_run(listings)
+    publish_queue.set_state(listings[0], PublishState.SHARED)
+    publish_queue.set_state(listings[1], PublishState.PUBLISHED)
+
+    # The program is restarted
+    publish_queue = PublishQueue(file_path)
+    assert publish_queue.begin_run(listings + get_listings(4)[3:])
+    assert publish_queue.get_state('Listing 0') == PublishState.SHARED
+    assert publish_queue.get_state('Listing 1') == PublishState.PUBLISHED
+    assert publish_queue.get_state('Listing 3') == PublishState.PENDING
+
+
+def test_finished_run_is_not_resumed(file_path, get_listings):
+    listings = get_listings(2)
+    publish_queue = PublishQueue(file_path)
+    publish_queue.begin_run(listings)
+    publish_queue.set_state(listings[0], PublishState.SHARED)
+    publish_queue.finish_run()
+
+    assert not publish_queue.begin_run(listings)
+    assert publish_queue.get_state('Listing 0') == PublishState.PENDING
+
+
+def test_reset_publishes_listing_again(file_path, get_listings):
+    listing, = get_listings(1)
+    publish_queue = PublishQueue(file_path)
+    publish_queue.begin_run([listing])
+    publish_queue.set_state(listing, PublishState.FAILED, reason='publishing failed')
+    publish_queue.reset(listing.title)
+
+    assert publish_queue.get_state(listing.title) == PublishState.PENDING
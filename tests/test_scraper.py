@@ -0,0 +1,181 @@
+import time
+
+import pytest
+from selenium.common import TimeoutException
+
+from helpers.scraper import Scraper, SelectorCircuitBreaker, CircuitBreakerOpen, Deadline, DeadlineExceeded
+
+
+def test_breaker_trips_after_threshold_of_misses_and_starts_again():
+    breaker = SelectorCircuitBreaker(threshold=3)
+    breaker.record_miss('selling list', 'a')
+    breaker.record_miss('selling list', 'b')
+
+    with pytest.raises(CircuitBreakerOpen) as e:
+        breaker.record_miss('selling list', 'a')
+    assert e.value.page_type == 'selling list'
+    assert e.value.selectors == ['a', 'b']
+
+    # Counts are reset by the trip
+    breaker.record_miss('selling list', 'a')
+    breaker.record_miss('selling list', 'a')
+
+
+def test_breaker_counts_page_types_separately_and_resets_on_hit():
+    breaker = SelectorCircuitBreaker(threshold=2)
+    breaker.record_miss('selling list', 'a')
+    breaker.record_miss('create form', 'b')
+    breaker.record_hit('selling list')
+    breaker.record_miss('selling list', 'a')
+
+    with pytest.raises(CircuitBreakerOpen):
+        breaker.record_miss('create form', 'b')
+
+
+def test_breaker_ignores_misses_without_page_type():
+    breaker = SelectorCircuitBreaker(threshold=1)
+    breaker.record_miss(None, 'a')
+
+
+class FakeScraper(Scraper):
+    # Scraper without a browser, every wait for an element times out
+    def __init__(self, threshold: int = 2):
+        self.deadline = None
+        self.cancel_event = None
+        self.page_type = None
+        self.circuit_breaker = SelectorCircuitBreaker(threshold=threshold)
+
+    def wait_until(self, wait_time, condition):
+        raise TimeoutException()
+
+
+def test_tolerated_misses_trip_the_breaker():
+    # Markup is changed: the flow goes on without the elements, but the run is stopped
+    scraper = FakeScraper(threshold=2)
+    with scraper.page_type_scope('create form'):
+        assert scraper.find_element('div.field', exit_on_missing_element=False, wait_element_time=1) is None
+        with pytest.raises(CircuitBreakerOpen):
+            scraper.find_element('div.other', exit_on_missing_element=False, wait_element_time=1)
+
+
+def test_missing_probe_is_not_counted():
+    scraper = FakeScraper(threshold=1)
+    with scraper.page_type_scope('selling list'):
+        assert scraper.find_element('div.listing', exit_on_missing_element=False, wait_element_time=1,
+                                    probe=True) is None
+        assert scraper.circuit_breaker.misses == {}
+
+
+def test_missing_mandatory_elements_trip_the_breaker():
+    scraper = FakeScraper(threshold=2)
+    for _ in range(2):
+        with pytest.raises((RuntimeError, CircuitBreakerOpen)):
+            with scraper.page_type_scope('create form'):
+                scraper.find_element('div.mandatory', wait_element_time=1)
+
+    assert scraper.circuit_breaker.misses == {}
+
+
+def test_finished_page_resets_misses():
+    scraper = FakeScraper(threshold=2)
+    with pytest.raises(RuntimeError):
+        with scraper.page_type_scope('create form'):
+            scraper.find_element('div.mandatory', wait_element_time=1)
+    assert scraper.circuit_breaker.misses == {'create form': ['div.mandatory']}
+
+    with scraper.page_type_scope('create form'):
+        pass
+    assert scraper.circuit_breaker.misses == {}
+
+
+def test_deadline_limits_waits():
+    deadline = Deadline(10, name='listing')
+
+    assert 9 < deadline.limit(30) <= 10
+    assert deadline.limit(5) == 5
+    deadline.check()
+
+
+def test_expired_deadline_raises():
+    deadline = Deadline(0.01, name='listing')
+    time.sleep(0.02)
+
+    assert deadline.is_expired()
+    assert deadline.remaining() == 0
+    with pytest.raises(DeadlineExceeded, match='while finding element'):
+        deadline.check('finding element')
+
+
+def test_deadline_without_seconds_never_expires():
+    deadline = Deadline(None)
+
+    assert deadline.remaining() is None
+    assert deadline.limit(30) == 30
+    assert not deadline.is_expired()
+
+
+def test_deadline_scope_limits_wait_time():
+    scraper = FakeScraper()
+    with scraper.deadline_scope(Deadline(5)):
+        assert scraper.get_wait_time(30) <= 5
+    assert scraper.get_wait_time(30) == 30
+
+
+def test_file_input_wait_cut_by_deadline_abandons_the_listing(monkeypatch):
+    scraper = FakeScraper()
+
+    def wait_until(wait_time, condition):
+        time.sleep(wait_time)
+        raise TimeoutException()
+
+    monkeypatch.setattr(scraper, 'wait_until', wait_until)
+    with scraper.deadline_scope(Deadline(0.02)):
+        with pytest.raises(DeadlineExceeded, match='file input'):
+            scraper.input_file_add_files('input[type="file"]', 'photo.jpg')
+
+
+def test_missing_file_input_raises():
+    with pytest.raises(RuntimeError, match='file input'):
+        FakeScraper().input_file_add_files('input[type="file"]', 'photo.jpg')
+
+
+class FakeElement:
+    # Contenteditable element of a browser which changes the inserted text
+    def __init__(self):
+        self.text = ''
+        self.keys = []
+
+    def click(self):
+        pass
+
+    def clear(self):
+        self.text = ''
+
+    def send_keys(self, *keys):
+        self.keys.append(keys)
+        self.text += ''.join(keys)
+
+
+class FakeDriver:
+    def __init__(self, element: FakeElement):
+        self.element = element
+
+    def execute_cdp_cmd(self, cmd, args):
+        self.element.text += args['text'].replace('🚗', '')
+
+    def execute_script(self, script, element):
+        if script.startswith('return'):
+            return element.text
+        element.text = ''
+
+
+def test_different_inserted_text_is_cleared_and_typed_again():
+    element = FakeElement()
+    scraper = FakeScraper()
+    scraper.driver = FakeDriver(element)
+    scraper.find_element = lambda **kwargs: element
+
+    assert scraper.element_insert_text('Car 🚗', 'div.description', delay=False)
+    assert element.text == 'Car 🚗'
+    # Text is not selected by shortcuts, they differ between platforms
+    assert element.keys == [('Car 🚗',)]
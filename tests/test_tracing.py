@@ -0,0 +1,147 @@
+import threading
+import time
+
+import pytest
+
+from helpers.tracing import Tracer, get_run_files, load_spans, summarize_spans, SPAN_LISTING, SPAN_RUN, \
+    SPAN_WEBDRIVER
+
+
+class FakeDriver:
+    def execute(self, driver_command, params=None):
+        if driver_command == 'fail':
+            raise RuntimeError('no such element\nstacktrace')
+        return {'value': None}
+
+
+@pytest.fixture
+def tracer(tmp_path):
+    return Tracer(folder=str(tmp_path), keep_runs=2)
+
+
+def get_spans(tracer: Tracer) -> dict:
+    return {span.name: span for span in load_spans(tracer.file_path)}
+
+
+def test_spans_of_run_are_nested_and_written(tracer):
+    driver = FakeDriver()
+    tracer.trace_driver(driver)
+
+    tracer.start_run('publish')
+    with tracer.span('Car', kind=SPAN_LISTING) as span:
+        tracer.step('open form')
+        driver.execute('get', {'url': 'https://facebook.com'})
+        tracer.step('publish')
+        driver.execute('findElement', {'using': 'xpath', 'value': '//span'})
+        span.outcome = 'published'
+    tracer.finish_run()
+
+    spans = get_spans(tracer)
+    assert spans['publish'].kind == SPAN_RUN
+    assert spans['Car'].parent_id == spans['publish'].span_id
+    assert spans['Car'].outcome == 'published'
+    assert spans['open form'].parent_id == spans['Car'].span_id
+    # Steps are closed by the next step and by the end of the parent
+    assert spans['publish'].span_id != spans['open form'].span_id
+    assert spans['get'].parent_id == spans['open form'].span_id
+    assert spans['findElement'].kind == SPAN_WEBDRIVER
+    assert spans['findElement'].attributes == {'selector': '//span'}
+
+
+def test_wait_time_is_separated_from_action_time(tracer):
+    tracer.start_run('publish')
+    with tracer.span('step'):
+        with tracer.wait('sleep'):
+            time.sleep(0.02)
+        # Pause of the cursor in an action
+        time.sleep(0.01)
+        tracer.add_wait(0.01)
+    tracer.finish_run()
+
+    span = get_spans(tracer)['step']
+    assert span.wait_time >= 0.03
+    assert span.action_time == pytest.approx(span.duration - span.wait_time)
+
+
+def test_commands_inside_wait_are_counted(tracer):
+    driver = FakeDriver()
+    tracer.trace_driver(driver)
+
+    tracer.start_run('publish')
+    with tracer.wait('wait until'):
+        for _ in range(3):
+            driver.execute('findElement')
+    tracer.finish_run()
+
+    spans = get_spans(tracer)
+    assert spans['wait until'].attributes == {'commands': 3}
+    assert 'findElement' not in spans
+
+
+def test_errors_are_recorded(tracer):
+    driver = FakeDriver()
+    tracer.trace_driver(driver)
+
+    tracer.start_run('publish')
+    with pytest.raises(ValueError):
+        with tracer.span('Car', kind=SPAN_LISTING):
+            with pytest.raises(RuntimeError):
+                driver.execute('fail')
+            tracer.step('fill year')
+            raise ValueError('wrong year')
+    tracer.finish_run()
+
+    spans = get_spans(tracer)
+    assert spans['fail'].error == 'RuntimeError: no such element'
+    assert spans['Car'].outcome == 'error'
+    assert spans['Car'].error == 'ValueError: wrong year'
+    assert spans['fill year'].outcome == 'error'
+
+
+def test_calls_out_of_run_and_other_threads_are_not_traced(tracer):
+    driver = FakeDriver()
+    tracer.trace_driver(driver)
+    with tracer.span('out of run') as span:
+        assert span.span_id == 0
+
+    tracer.start_run('publish')
+    thread = threading.Thread(target=driver.execute, args=('get',))
+    thread.start()
+    thread.join()
+    tracer.finish_run()
+
+    assert list(get_spans(tracer)) == ['publish']
+
+
+def test_old_runs_are_removed(tracer):
+    for name in ('first', 'second', 'third'):
+        tracer.start_run(name)
+        tracer.finish_run()
+        # Files are named by the time of the run
+        time.sleep(1.01)
+
+    run_files = get_run_files(tracer.folder)
+    assert len(run_files) == 2
+    assert run_files[0].endswith('_third.jsonl')
+
+
+def test_summary_by_name(tracer):
+    tracer.start_run('publish')
+    for title in ('Car 1', 'Car 2'):
+        with tracer.span(title, kind=SPAN_LISTING):
+            tracer.step('open form')
+    tracer.finish_run()
+
+    summaries = {summary.name: summary for summary in summarize_spans(load_spans(tracer.file_path))}
+    assert summaries['open form'].count == 2
+    assert 'publish' not in summaries
+
+
+def test_disabled_tracer_does_nothing(tmp_path):
+    tracer = Tracer(folder=str(tmp_path / 'traces'), enabled=False)
+    driver = FakeDriver()
+    tracer.trace_driver(driver)
+
+    assert tracer.start_run('publish') is None
+    assert not hasattr(driver, '_is_traced')
+    assert not (tmp_path / 'traces').exists()